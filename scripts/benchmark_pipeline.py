@@ -0,0 +1,322 @@
+# scripts/benchmark_pipeline.py
+
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from line_matching import LineMatcher
+from metrics_engine import bootstrap_confidence_intervals, calculate_all_metrics
+from mock_ollama_server import MockConfig, MockOllamaServer
+from reclassify_llm_results import RAW_TO_DETECTED, reclassify
+from response_classifier import DEFAULT_CLASSIFIER
+from sast_ingest import FindingMapper, iter_report_findings
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_HISTORY = os.path.join(PROJECT_ROOT, 'results', 'benchmark_history.jsonl')
+TEMPLATE_DATASET = os.path.join(PROJECT_ROOT, 'dataset', 'juice_shop_15_files.csv')
+TEMPLATE_SNIPPETS = os.path.join(PROJECT_ROOT, 'dataset', 'code_snippets')
+
+
+def build_corpus(size, workdir, seed=42):
+    """
+    Gera um corpus sintético com `size` snippets a partir dos 15 snippets do dataset.
+
+    Cada snippet copia um modelo (com um cabeçalho único, para que prompts e
+    respostas não se repitam) e herda a vulnerabilidade e a faixa de linhas do
+    modelo. Retorna (caminho do CSV, pasta dos snippets, DataFrame).
+    """
+    rng = np.random.default_rng(seed)
+    templates = pd.read_csv(TEMPLATE_DATASET)
+    codes = {}
+    for snippet_id in templates['ID']:
+        with open(os.path.join(TEMPLATE_SNIPPETS, f"{snippet_id}.ts"), 'r', encoding='utf-8') as f:
+            codes[snippet_id] = f.read()
+
+    snippets_dir = os.path.join(workdir, 'code_snippets')
+    os.makedirs(snippets_dir, exist_ok=True)
+    rows = []
+    for i in range(size):
+        template = templates.iloc[i % len(templates)]
+        prefix = 'VULN' if bool(template['Is_Vulnerable']) else 'SAFE'
+        snippet_id = f"{prefix}-{i:06d}"
+        with open(os.path.join(snippets_dir, f"{snippet_id}.ts"), 'w', encoding='utf-8') as f:
+            f.write(f"// {snippet_id}\n{codes[template['ID']]}")
+        rows.append({
+            'ID': snippet_id,
+            'Vulnerability': template['Vulnerability'],
+            'File': f"synthetic/dir{i // 1000:03d}/file{i:06d}.ts",
+            'Line': template['Line'],
+            'Detected_Semgrep': bool(rng.random() < 0.4),
+            'Detected_Sonar': bool(rng.random() < 0.2),
+            'Detected_Deepseek': False,
+            'Detected_CodeLlama': False,
+            'Is_Vulnerable': bool(template['Is_Vulnerable']),
+        })
+    df = pd.DataFrame(rows)
+    dataset_path = os.path.join(workdir, 'ground_truth.csv')
+    df.to_csv(dataset_path, index=False)
+    return dataset_path, snippets_dir, df
+
+
+def synthetic_raw_results(df, snippets_dir, config):
+    """Respostas brutas como as do servidor simulado, sem passar por HTTP."""
+    raw = {}
+    for raw_col in RAW_TO_DETECTED:
+        responses = []
+        for snippet_id in df['ID']:
+            with open(os.path.join(snippets_dir, f"{snippet_id}.ts"), 'r', encoding='utf-8') as f:
+                code = f.read()
+            responses.append(config.response_for(f'{raw_col}\n"Arquivo": "{snippet_id}.ts"\nCode:\n{code}'))
+        raw[raw_col] = responses
+    return pd.DataFrame(dict(ID=df['ID'], **raw))
+
+
+def synthetic_semgrep_report(df, path, seed=42):
+    """Relatório JSON do Semgrep com um achado por linha marcada em Detected_Semgrep."""
+    rng = np.random.default_rng(seed)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{"results": [')
+        first = True
+        for file_path, flagged in zip(df['File'], df['Detected_Semgrep']):
+            if not flagged:
+                continue
+            line = int(rng.integers(1, 200))
+            f.write(('' if first else ',') + json.dumps({
+                'check_id': 'synthetic.rule', 'path': file_path,
+                'start': {'line': line}, 'end': {'line': line + 1},
+                'extra': {'message': 'x' * 200},
+            }))
+            first = False
+        f.write('], "errors": []}')
+
+
+def run_pipeline(dataset_path, snippets_dir, workdir, server_url, concurrency, stream, batch_size=1,
+                 prompt_layout='original'):
+    """Executa run_llm_analysis.py contra o servidor simulado; retorna (segundos, pico de RSS em MB, CSV gerado)."""
+    output = os.path.join(workdir, 'out', 'llm_detections_results.csv')
+    command = [
+        sys.executable, os.path.join(SCRIPTS_DIR, 'run_llm_analysis.py'),
+        '--dataset', dataset_path, '--snippets-dir', snippets_dir, '--output', output,
+        '--no-cache', '--default-concurrency', str(concurrency),
+        '--batch-size', str(batch_size), '--prompt-layout', prompt_layout,
+    ]
+    if stream:
+        command.append('--stream')
+    env = dict(os.environ, OLLAMA_HOST=server_url)
+    started = time.perf_counter()
+    with open(os.path.join(workdir, 'pipeline.log'), 'w', encoding='utf-8') as log:
+        process = subprocess.Popen(command, env=env, stdout=log, stderr=subprocess.STDOUT)
+        # wait4 devolve o uso de recursos apenas deste processo filho
+        _, status, usage = os.wait4(process.pid, 0)
+        process.returncode = os.waitstatus_to_exitcode(status)
+    elapsed = time.perf_counter() - started
+    if process.returncode != 0:
+        raise RuntimeError(f"run_llm_analysis.py falhou (código {process.returncode}); veja {log.name}")
+    return elapsed, usage.ru_maxrss / 1024, output
+
+
+def timed(stages, name, func, *args, **kwargs):
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    stages[name] = time.perf_counter() - started
+    return result
+
+
+def benchmark_size(size, args, config, server_url):
+    """Executa todas as etapas para um tamanho de corpus; retorna o registro de resultados."""
+    if args.workdir:
+        os.makedirs(args.workdir, exist_ok=True)
+    workdir = tempfile.mkdtemp(prefix=f"bench_{size}_", dir=args.workdir)
+    stages = {}
+    result = {'size': size, 'stages': stages}
+    try:
+        # Geração do corpus é preparação (dominada por E/S): fica fora das etapas comparadas
+        started = time.perf_counter()
+        dataset_path, snippets_dir, df = build_corpus(size, workdir)
+        result['corpus_seconds'] = time.perf_counter() - started
+
+        if size <= args.pipeline_max:
+            elapsed, peak_mb, output = run_pipeline(
+                dataset_path, snippets_dir, workdir, server_url, args.concurrency, args.stream,
+                batch_size=args.batch_size, prompt_layout=args.prompt_layout
+            )
+            stages['pipeline'] = elapsed
+            result['pipeline_jobs_per_second'] = 2 * size / elapsed
+            result['pipeline_peak_rss_mb'] = peak_mb
+            df_raw = pd.read_csv(output)
+        else:
+            df_raw = synthetic_raw_results(df, snippets_dir, config)
+
+        timed(stages, 'classify', reclassify, df_raw, DEFAULT_CLASSIFIER)
+        result['classify_responses_per_second'] = 2 * size / max(stages['classify'], 1e-9)
+
+        y_true = df['Is_Vulnerable'].astype(int)
+        tools = {
+            'Semgrep': df['Detected_Semgrep'].astype(int),
+            'SonarQube': df['Detected_Sonar'].astype(int),
+            'DeepSeek': df_raw['Detected_Deepseek'].astype(int),
+            'CodeLlama': df_raw['Detected_CodeLlama'].astype(int),
+        }
+        timed(stages, 'metrics', calculate_all_metrics, y_true, tools)
+        timed(stages, 'bootstrap', bootstrap_confidence_intervals,
+              y_true, np.column_stack(list(tools.values())), n_resamples=args.bootstrap, workers=1)
+
+        report_path = os.path.join(workdir, 'semgrep_results.json')
+        synthetic_semgrep_report(df, report_path)
+        mapper = timed(stages, 'sast_index', FindingMapper, df)
+        timed(stages, 'sast_ingest', mapper.detections, iter_report_findings(report_path))
+        matcher = LineMatcher(df)
+        timed(stages, 'localization', matcher.counts, iter_report_findings(report_path))
+    finally:
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_ROOT,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def find_regressions(entry, history, threshold):
+    """Compara cada etapa com a última execução de mesma configuração; retorna as que pioraram."""
+    previous = next((old for old in reversed(history) if old['config'] == entry['config']), None)
+    if previous is None:
+        return None, []
+    old_results = {result['size']: result for result in previous['results']}
+    regressions = []
+    for result in entry['results']:
+        old = old_results.get(result['size'])
+        if old is None:
+            continue
+        for stage, seconds in result['stages'].items():
+            old_seconds = old['stages'].get(stage)
+            # Etapas muito curtas são dominadas por ruído
+            if old_seconds and seconds > old_seconds * (1 + threshold) and seconds - old_seconds > 0.05:
+                regressions.append((result['size'], stage, old_seconds, seconds))
+    return previous, regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Benchmark do pipeline (LLM, classificação, métricas e ingestão SAST) com Ollama simulado"
+    )
+    parser.add_argument(
+        '--sizes', default='15,1000,10000,100000',
+        help="Tamanhos de corpus separados por vírgula (padrão: 15,1000,10000,100000)"
+    )
+    parser.add_argument(
+        '--pipeline-max', type=int, default=1000,
+        help="Maior corpus executado de ponta a ponta via HTTP (acima disso, só as etapas locais)"
+    )
+    parser.add_argument('--concurrency', type=int, default=4, help="Requisições simultâneas por modelo")
+    parser.add_argument('--stream', action='store_true', help="Executar o pipeline com --stream")
+    parser.add_argument('--batch-size', type=int, default=1, help="Snippets por prompt no pipeline")
+    parser.add_argument('--prompt-layout', default='original', help="Layout do prompt (original ou prefix)")
+    parser.add_argument('--latency', type=float, default=0.0, help="Latência simulada até o primeiro token")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Variação da latência simulada")
+    parser.add_argument('--tokens-per-second', type=float, default=0.0, help="Velocidade de geração simulada")
+    parser.add_argument('--prompt-tokens-per-second', type=float, default=0.0,
+                        help="Velocidade simulada de avaliação do prompt (com cache do prefixo)")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fração de gerações com erro HTTP")
+    parser.add_argument('--vulnerable-ratio', type=float, default=0.5, help="Fração de respostas com detecção")
+    parser.add_argument('--bootstrap', type=int, default=1000, help="Reamostragens na etapa de bootstrap")
+    parser.add_argument('--history', default=DEFAULT_HISTORY, help="JSONL com o histórico de execuções")
+    parser.add_argument(
+        '--regression-threshold', type=float, default=0.25,
+        help="Piora relativa que conta como regressão (padrão: 0.25 = 25%%)"
+    )
+    parser.add_argument('--fail-on-regression', action='store_true', help="Sair com código 1 se houver regressão")
+    parser.add_argument('--workdir', default=None, help="Pasta para os corpora temporários")
+    parser.add_argument('--keep', action='store_true', help="Manter os corpora gerados")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    config = MockConfig(
+        latency=args.latency, jitter=args.jitter, tokens_per_second=args.tokens_per_second,
+        prompt_tokens_per_second=args.prompt_tokens_per_second, error_rate=args.error_rate, vulnerable_ratio=args.vulnerable_ratio, seed=42
+    )
+    server = MockOllamaServer(config)
+    server_url = server.start()
+    print(f"🧪 Ollama simulado em {server_url}")
+
+    results = []
+    try:
+        for size in sizes:
+            print(f"⏱️ Corpus com {size} snippet(s)...")
+            result = benchmark_size(size, args, config, server_url)
+            results.append(result)
+            stages = ' | '.join(f"{stage} {seconds:.2f}s" for stage, seconds in result['stages'].items())
+            print(f"  {stages}")
+            if 'pipeline_jobs_per_second' in result:
+                print(f"  pipeline: {result['pipeline_jobs_per_second']:.1f} jobs/s "
+                      f"| pico de memória {result['pipeline_peak_rss_mb']:.0f} MB")
+    finally:
+        server.stop()
+
+    entry = {
+        'timestamp': time.time(),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'config': {
+            'sizes': sizes, 'pipeline_max': args.pipeline_max, 'concurrency': args.concurrency,
+            'stream': args.stream, 'batch_size': args.batch_size, 'prompt_layout': args.prompt_layout,
+            'prompt_tokens_per_second': args.prompt_tokens_per_second, 'latency': args.latency, 'jitter': args.jitter,
+            'tokens_per_second': args.tokens_per_second, 'error_rate': args.error_rate,
+            'vulnerable_ratio': args.vulnerable_ratio, 'bootstrap': args.bootstrap,
+        },
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'mock_requests': dict(server.stats),
+        'results': results,
+    }
+
+    history = load_history(args.history)
+    previous, regressions = find_regressions(entry, history, args.regression_threshold)
+    os.makedirs(os.path.dirname(os.path.abspath(args.history)), exist_ok=True)
+    with open(args.history, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+    print(f"\n📦 Pico de memória do benchmark: {entry['peak_rss_mb']:.0f} MB")
+    print(f"💾 Histórico atualizado em: {args.history}")
+    if previous is None:
+        print("ℹ️ Primeira execução com esta configuração: nada a comparar.")
+    elif regressions:
+        print(f"⚠️ Regressões em relação a {previous.get('commit') or 'execução anterior'}:")
+        for size, stage, old_seconds, seconds in regressions:
+            print(f"  [{size}] {stage}: {old_seconds:.2f}s → {seconds:.2f}s (+{seconds / old_seconds - 1:.0%})")
+        if args.fail_on_regression:
+            sys.exit(1)
+    else:
+        print(f"✅ Sem regressões em relação a {previous.get('commit') or 'execução anterior'}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,41 +1,145 @@
 # scripts/calculate_metrics.py
 
 import pandas as pd
-from sklearn.metrics import precision_score, recall_score, f1_score
 import os
 import json
-import sys
+import argparse
 
-# Função para calcular métricas (mantida igual)
+from line_matching import LineMatcher, iter_llm_findings, snippet_offsets
+from metrics_engine import (LOCALIZATION_COLUMNS, METRIC_COLUMNS, bootstrap_confidence_intervals,
+                            calculate_all_metrics, calculate_localization_metrics)
+from metrics_slices import (DEFAULT_SLICES_PATH, load_slices_config, merge_detections, save_slice_metrics,
+                            slice_metrics)
+from reclassify_llm_results import reclassify
+from response_classifier import DEFAULT_CLASSIFIER
+from results_store import ResultsStore
+from sast_ingest import FindingMapper, iter_report_findings
+from snippet_corpus import SnippetCorpus
+
+# Relatórios SAST procurados em results/ com --sast-from-reports (em ordem de preferência)
+DEFAULT_SAST_REPORTS = {
+    'Detected_Semgrep': ['semgrep_results.json', 'semgrep_results.sarif'],
+    'Detected_Sonar': ['sonarqube_issues.json'],
+}
+
+# Colunas de detecção dos LLMs usadas nas métricas
+LLM_DETECTED_COLUMNS = ['Detected_Deepseek', 'Detected_CodeLlama']
+
+# Respostas brutas dos LLMs usadas nas métricas com localização
+LLM_RAW_COLUMNS = {'DeepSeek': 'DeepSeek_Raw_Result', 'CodeLlama': 'CodeLlama_Raw_Result'}
+
+# Função para calcular métricas de uma ferramenta (mantida por compatibilidade)
 def calculate_metrics(tool_name, y_true, y_pred):
-    precision = precision_score(y_true, y_pred, zero_division=0)
-    recall = recall_score(y_true, y_pred, zero_division=0)
-    f1 = f1_score(y_true, y_pred, zero_division=0)
-
-    vp = sum(1 for yt, yp in zip(y_true, y_pred) if yt == 1 and yp == 1)
-    fp = sum(1 for yt, yp in zip(y_true, y_pred) if yt == 0 and yp == 1)
-    fn = sum(1 for yt, yp in zip(y_true, y_pred) if yt == 1 and yp == 0)
-
-    fp_rate = fp / (vp + fp) if (vp + fp) > 0 else 0
-
-    return {
-        'Ferramenta': tool_name,
-        'Precisão': precision,
-        'Recall': recall,
-        'F1-Score': f1,
-        'FP Rate': fp_rate,
-        'VP': vp,
-        'FP': fp,
-        'FN': fn
-    }
+    return calculate_all_metrics(y_true, {tool_name: y_pred})[0]
+
+def tools_columns(slices_config, df_combined):
+    """Ferramentas da configuração de recortes cujas colunas existem no DataFrame combinado."""
+    return {name: column for name, column in slices_config['tools'].items() if column in df_combined.columns}
+
+def localization_metrics(df_ground_truth, sast_reports, df_llm_raw, snippets_dir, source_root):
+    """Métricas com localização (por linhas) das ferramentas com achados localizáveis."""
+    offsets = snippet_offsets(df_ground_truth, snippets_dir, source_root)
+    matcher = LineMatcher(df_ground_truth, offsets)
+    counts = {}
+    for tool_name, column in (('Semgrep', 'Detected_Semgrep'), ('SonarQube', 'Detected_Sonar')):
+        if not sast_reports.get(column):
+            continue
+        findings = list(iter_report_findings(sast_reports[column]))
+        # Relatórios sobre os snippets (ex.: make test-sast) só valem para os snippets posicionados
+        on_snippets = any(matcher.on_snippet(finding) for finding in findings)
+        if on_snippets and not offsets:
+            print(f"⚠️ Achados do {tool_name} nos snippets, sem snippets posicionados no código original "
+                  f"(informe --source-root ou JUICE_SHOP_DIR): métricas por linhas do {tool_name} omitidas (N/A)")
+            continue
+        counts[tool_name] = matcher.counts(findings, evaluable=matcher.positioned if on_snippets else None)
+
+    snippets = SnippetCorpus(snippets_dir).load(df_llm_raw['ID'] if df_llm_raw is not None else [])
+    codes = {snippet_id: snippet.code for snippet_id, snippet in snippets.items()}
+    llm_columns = [(tool_name, raw_col) for tool_name, raw_col in LLM_RAW_COLUMNS.items()
+                   if df_llm_raw is not None and raw_col in df_llm_raw.columns]
+    if llm_columns and not offsets:
+        # Os LLMs só apontam linhas dos snippets: sem posicioná-los no original, não há métrica por linhas
+        print("⚠️ Nenhum snippet posicionado no código original (informe --source-root ou JUICE_SHOP_DIR): "
+              "métricas por linhas dos LLMs omitidas (N/A)")
+        llm_columns = []
+    for tool_name, raw_col in llm_columns:
+        findings = (
+            finding
+            for snippet_id, response in zip(df_llm_raw['ID'], df_llm_raw[raw_col])
+            if snippet_id in codes
+            for finding in iter_llm_findings(snippet_id, response, codes[snippet_id])
+        )
+        counts[tool_name] = matcher.counts(findings, evaluable=matcher.positioned)
+
+    print(f"📍 Métricas por linhas: {len(offsets)} snippet(s) posicionados no código original")
+    return calculate_localization_metrics(counts)
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Gera a Tabela 2 (métricas por ferramenta)",
+        usage="python scripts/calculate_metrics.py <caminho_para_ground_truth.csv> [opções]"
+    )
+    parser.add_argument('ground_truth', help="CSV do ground truth com as detecções SAST")
+    parser.add_argument(
+        '--reclassify', action='store_true',
+        help="Recalcular as detecções dos LLMs a partir das colunas *_Raw_Result"
+    )
+    parser.add_argument(
+        '--run', default=None, metavar='ID',
+        help="Ler os resultados dos LLMs de uma execução do histórico colunar (results/store) "
+             "em vez do CSV ('latest' = a mais recente)"
+    )
+    parser.add_argument(
+        '--semgrep-report', metavar='ARQUIVO',
+        help="Relatório do Semgrep (JSON ou SARIF) usado no lugar da coluna Detected_Semgrep"
+    )
+    parser.add_argument(
+        '--sonar-report', metavar='ARQUIVO',
+        help="Issues do SonarQube (JSON) usadas no lugar da coluna Detected_Sonar"
+    )
+    parser.add_argument(
+        '--sast-from-reports', action='store_true',
+        help="Usar automaticamente os relatórios SAST encontrados em results/"
+    )
+    parser.add_argument(
+        '--localization', action='store_true',
+        help="Calcular também precisão/recall por faixa de linhas (coluna Line)"
+    )
+    parser.add_argument(
+        '--snippets-dir', default=None,
+        help="Diretório dos snippets (padrão: dataset/code_snippets)"
+    )
+    parser.add_argument(
+        '--source-root', default=os.getenv('JUICE_SHOP_DIR'),
+        help="Checkout do Juice Shop, para posicionar os snippets nas linhas originais (padrão: $JUICE_SHOP_DIR)"
+    )
+    parser.add_argument(
+        '--slices', nargs='?', const=DEFAULT_SLICES_PATH, default=None, metavar='CONFIG',
+        help="Calcular também as métricas por recorte (categoria, contexto, pasta...) "
+             "definidos no JSON (padrão: dataset/metrics_slices.json)"
+    )
+    parser.add_argument(
+        '--bootstrap', type=int, default=0, metavar='N',
+        help="Número de reamostragens para intervalos de confiança (0 = desativado)"
+    )
+    parser.add_argument(
+        '--confidence', type=float, default=0.95,
+        help="Nível de confiança dos intervalos (padrão: 0.95)"
+    )
+    parser.add_argument(
+        '--seed', type=int, default=42,
+        help="Semente do bootstrap, para resultados reprodutíveis (padrão: 42)"
+    )
+    parser.add_argument(
+        '--workers', type=int, default=None,
+        help="Processos para o bootstrap (padrão: número de CPUs)"
+    )
+    return parser.parse_args()
 
 def main():
+    args = parse_args()
     # Obter o caminho do ground truth via argumento de linha de comando
-    if len(sys.argv) < 2:
-        print("Uso: python scripts/calculate_metrics.py <caminho_para_ground_truth.csv>")
-        sys.exit(1)
-    
-    ground_truth_input_path = sys.argv[1] # O primeiro argumento é o caminho do arquivo
+    ground_truth_input_path = args.ground_truth
 
     script_dir = os.path.dirname(os.path.abspath(__file__))
     project_root = os.path.dirname(script_dir)
@@ -52,41 +156,55 @@ def main():
     df_ground_truth = pd.read_csv(ground_truth_input_path)
     
     # Carregar os resultados das detecções dos LLMs
-    if not os.path.exists(llm_detections_path):
+    if args.run:
+        # Histórico colunar: as respostas brutas só são lidas quando necessárias
+        store = ResultsStore(os.path.join(results_dir, 'store'))
+        run_id = store.latest_run() if args.run == 'latest' else args.run
+        fields = ('detected', 'raw') if args.reclassify or args.localization else ('detected',)
+        df_llm_detections = store.frame(run_id, fields=fields)
+        print(f"🗂️ Resultados LLM da execução {run_id} ({', '.join(fields)})")
+        if args.reclassify:
+            reclassify(df_llm_detections, DEFAULT_CLASSIFIER)
+        df_llm_raw = df_llm_detections if 'raw' in fields else None
+        df_llm_detections = df_llm_detections[
+            ['ID'] + [column for column in LLM_DETECTED_COLUMNS if column in df_llm_detections.columns]
+        ]
+    elif not os.path.exists(llm_detections_path):
         print(f"AVISO: Arquivo de resultados LLM não encontrado em {llm_detections_path}.")
         print("Certifique-se de executar 'run_llm_analysis.py' primeiro para gerar os resultados dos LLMs.")
-        # Se o arquivo LLM não existir, criamos um DataFrame vazio para merge
-        # e as colunas serão preenchidas com NaN, que trataremos depois
-        df_llm_detections = pd.DataFrame({'ID': df_ground_truth['ID'].unique()}) # Garante que todos os IDs do GT estão presentes
-        df_llm_detections['Detected_Deepseek'] = pd.NA # Usa pd.NA para tipo Int64Dtype que suporta NA
-        df_llm_detections['Detected_CodeLlama'] = pd.NA
+        # Sem resultados, as colunas dos LLMs ficam zeradas (não detectado)
+        df_llm_detections = None
+        df_llm_raw = None
     else:
         df_llm_detections = pd.read_csv(llm_detections_path)
+        if args.reclassify:
+            # Reaplica o classificador em lote sobre as respostas brutas
+            reclassify(df_llm_detections, DEFAULT_CLASSIFIER)
+        df_llm_raw = df_llm_detections
         # Seleciona apenas as colunas de interesse para merge
-        df_llm_detections = df_llm_detections[['ID', 'Detected_Deepseek', 'Detected_CodeLlama']]
+        df_llm_detections = df_llm_detections[['ID'] + LLM_DETECTED_COLUMNS]
 
-    # Unir os DataFrames com base no ID do snippet
-    df_combined = pd.merge(df_ground_truth, df_llm_detections, on='ID', how='left')
+    # Alinhar as detecções dos LLMs ao ground truth por ID; elas substituem as colunas
+    # homônimas do ground truth e IDs sem resultado contam como não detectados
+    df_combined = merge_detections(df_ground_truth, df_llm_detections, LLM_DETECTED_COLUMNS)
 
-    # Renomear as colunas LLM para um nome consistente após o merge
-    # Se existirem sufixos como '_x' ou '_y' após o merge, você pode precisar ajustar aqui
-    # Assumimos que o merge não criou duplicação de nomes para as colunas de LLM.
-    # Se houver, a coluna de LLM virá como 'Detected_Deepseek' do df_llm_detections
-    # e a do ground_truth como 'Detected_Deepseek_x' se houver conflito de nomes.
-    # Vamos verificar e renomear se necessário, ou usar as colunas criadas no merge.
-    
-    # Preencher NaN nas colunas de detecção dos LLMs com 0 (zero)
-    # Isso é crucial antes de converter para int, representando "não detectado"
-    if 'Detected_Deepseek' in df_combined.columns: # Verifica se a coluna existe após o merge
-        df_combined['Detected_Deepseek'] = df_combined['Detected_Deepseek'].fillna(0)
-    else: # Se a coluna não existiu por algum motivo no merge, crie-a e preencha com 0
-        df_combined['Detected_Deepseek'] = 0
-        
-    if 'Detected_CodeLlama' in df_combined.columns: # Verifica se a coluna existe após o merge
-        df_combined['Detected_CodeLlama'] = df_combined['Detected_CodeLlama'].fillna(0)
-    else: # Se a coluna não existiu, crie-a e preencha com 0
-        df_combined['Detected_CodeLlama'] = 0
-        
+    # Detecções SAST a partir dos relatórios (em vez das colunas preenchidas à mão)
+    sast_reports = {'Detected_Semgrep': args.semgrep_report, 'Detected_Sonar': args.sonar_report}
+    if args.sast_from_reports:
+        for column, candidates in DEFAULT_SAST_REPORTS.items():
+            found = [os.path.join(results_dir, name) for name in candidates
+                     if os.path.exists(os.path.join(results_dir, name))]
+            if sast_reports[column] is None and found:
+                sast_reports[column] = found[0]
+    mapper = None
+    for column, report_path in sast_reports.items():
+        if report_path is None:
+            continue
+        if not os.path.exists(report_path):
+            raise FileNotFoundError(f"Relatório SAST não encontrado: {report_path}")
+        mapper = mapper or FindingMapper(df_combined)
+        df_combined[column] = mapper.detections(iter_report_findings(report_path))
+        print(f"📥 {column} a partir de {report_path}: {int(df_combined[column].sum())} arquivo(s) com achados")
 
     # Usar as colunas de detecção corretas para cada ferramenta
     # Assumimos que 'Detected_Semgrep' e 'Detected_Sonar' já estão no ground_truth
@@ -105,11 +223,34 @@ def main():
     # A coluna 'Is_Vulnerable' é o y_true para todas as ferramentas
     y_true_common = df_combined["Is_Vulnerable"]
     
-    results = []
-    for tool_name, preds in tools.items():
-        # Converte para int. Agora que NaN foi preenchido, deve funcionar.
-        results.append(calculate_metrics(tool_name, y_true_common, preds.astype(int)))
+    # Uma única matriz de confusão para todas as ferramentas (predições empilhadas).
+    # Converte para int. Agora que NaN foi preenchido, deve funcionar.
+    results = calculate_all_metrics(
+        y_true_common.astype(int),
+        {tool_name: preds.astype(int) for tool_name, preds in tools.items()}
+    )
     
+    # Intervalos de confiança por bootstrap (opcional)
+    interval_columns = []
+    if args.bootstrap > 0:
+        confidence_label = f"IC{args.confidence * 100:g}"
+        intervals = bootstrap_confidence_intervals(
+            y_true_common.astype(int),
+            pd.concat([preds.astype(int) for preds in tools.values()], axis=1).to_numpy(),
+            n_resamples=args.bootstrap,
+            confidence=args.confidence,
+            seed=args.seed,
+            workers=args.workers
+        )
+        for col in METRIC_COLUMNS:
+            lower_col, upper_col = f"{col} {confidence_label} Inf", f"{col} {confidence_label} Sup"
+            interval_columns += [lower_col, upper_col]
+            lower, upper = intervals[col]
+            for i, record in enumerate(results):
+                record[lower_col] = float(lower[i])
+                record[upper_col] = float(upper[i])
+        print(f"📐 Intervalos de confiança ({args.confidence:.0%}) com {args.bootstrap} reamostragens")
+
     # Criar DataFrame de métricas
     df_metrics = pd.DataFrame(results)
     
@@ -120,7 +261,7 @@ def main():
     # Salvar JSON do resumo das métricas (para o README)
     json_summary_path = os.path.join(results_dir, 'metrics_summary.json')
     df_metrics_for_json = df_metrics.copy()
-    for col in ['Precisão', 'Recall', 'F1-Score', 'FP Rate']:
+    for col in ['Precisão', 'Recall', 'F1-Score', 'FP Rate'] + interval_columns:
         df_metrics_for_json[col] = df_metrics_for_json[col].round(4)
     
     with open(json_summary_path, 'w') as f:
@@ -130,7 +271,7 @@ def main():
     html = df_metrics.to_html(
         index=False,
         float_format='{:.2%}'.format,
-        columns=['Ferramenta', 'Precisão', 'Recall', 'F1-Score', 'FP Rate', 'VP', 'FP', 'FN'],
+        columns=['Ferramenta', 'Precisão', 'Recall', 'F1-Score', 'FP Rate', 'VP', 'FP', 'FN'] + interval_columns,
         border=1
     )
     
@@ -142,6 +283,35 @@ def main():
     print(f"✅ Resultados consolidados salvos em:\n- {csv_path}\n- {html_path}\n- {json_summary_path}")
     print("\nResumo da Tabela 2:")
     print(df_metrics[['Ferramenta', 'Precisão', 'Recall', 'F1-Score', 'FP Rate']].to_string(index=False))
+    if interval_columns:
+        print("\nIntervalos de confiança:")
+        print(df_metrics[['Ferramenta'] + interval_columns].to_string(index=False))
+
+    # Métricas por recorte (opcional): todos os grupos e ferramentas em uma passada
+    if args.slices:
+        slices_config = load_slices_config(args.slices)
+        df_slices = slice_metrics(df_combined, tools_columns(slices_config, df_combined), slices_config['slices'])
+        slices_csv, slices_json = save_slice_metrics(df_slices, results_dir)
+        print(f"\n📊 Métricas por recorte ({', '.join(slices_config['slices'])}) salvas em:\n- {slices_csv}\n- {slices_json}")
+        print(df_slices[['Recorte', 'Grupo', 'Ferramenta', 'Amostras', 'Recall', 'Precisão']].to_string(index=False))
+
+    # Métricas com localização (opcional)
+    if args.localization:
+        snippets_dir = args.snippets_dir or os.path.join(project_root, 'dataset', 'code_snippets')
+        df_localization = pd.DataFrame(
+            localization_metrics(df_ground_truth, sast_reports, df_llm_raw, snippets_dir, args.source_root)
+        )
+        if df_localization.empty:
+            print("⚠️ Nenhuma ferramenta com achados localizáveis (informe relatórios SAST ou respostas LLM).")
+            return
+        localization_csv = os.path.join(results_dir, 'localization_metrics.csv')
+        localization_json = os.path.join(results_dir, 'localization_metrics.json')
+        df_localization.to_csv(localization_csv, index=False)
+        with open(localization_json, 'w') as f:
+            json.dump(df_localization.round({col: 4 for col in LOCALIZATION_COLUMNS}).to_dict(orient='records'),
+                      f, indent=4, ensure_ascii=False)
+        print(f"\n📍 Métricas por linhas salvas em:\n- {localization_csv}\n- {localization_json}")
+        print(df_localization[['Ferramenta', 'Achados'] + LOCALIZATION_COLUMNS].to_string(index=False))
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,87 @@
+# scripts/code_chunker.py
+
+import re
+from collections import namedtuple
+
+# Trecho de código com intervalo de linhas (1-based, inclusivo)
+CodeChunk = namedtuple('CodeChunk', ['start_line', 'end_line', 'text'])
+
+# Início de declaração de nível superior em TypeScript/JavaScript
+DECLARATION_RE = re.compile(
+    r'^(?:export\s+)?(?:default\s+)?(?:declare\s+)?(?:abstract\s+)?(?:async\s+)?'
+    r'(?:function\b|class\b|interface\b|enum\b|type\s+\w|const\b|let\b|var\b|module\.exports\b|@\w)'
+)
+
+# Literais de string e comentários de linha são ignorados na contagem de chaves
+_NOISE_RE = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|`(?:\\.|[^`\\])*`|//.*$')
+
+
+def _brace_delta(line):
+    cleaned = _NOISE_RE.sub('', line)
+    return cleaned.count('{') - cleaned.count('}')
+
+
+def find_boundaries(lines):
+    """Índices (0-based) das linhas que iniciam uma declaração de nível superior."""
+    boundaries = [0]
+    depth = 0
+    for i, line in enumerate(lines):
+        if i > 0 and depth <= 0 and DECLARATION_RE.match(line):
+            boundaries.append(i)
+        depth = max(depth + _brace_delta(line), 0)
+    return boundaries
+
+
+def _split_oversized(lines, start, end, max_chars):
+    """Divide por linhas um segmento maior que o orçamento (ex.: função muito longa)."""
+    pieces = []
+    piece_start = start
+    size = 0
+    for i in range(start, end):
+        line_size = len(lines[i]) + 1
+        if size and size + line_size > max_chars:
+            pieces.append((piece_start, i))
+            piece_start, size = i, 0
+        size += line_size
+    pieces.append((piece_start, end))
+    return pieces
+
+
+def chunk_code(code, max_chars, overlap_lines=0):
+    """
+    Divide o código em trechos de até max_chars, respeitando limites de função/classe.
+
+    Declarações de nível superior consecutivas são agrupadas enquanto couberem no
+    orçamento; cada trecho após o primeiro repete as overlap_lines linhas finais do
+    anterior para preservar contexto. Código que cabe no orçamento volta inteiro.
+    """
+    lines = code.split('\n')
+    if len(code) <= max_chars:
+        return [CodeChunk(1, len(lines), code)]
+
+    boundaries = find_boundaries(lines) + [len(lines)]
+    segments = []
+    for start, end in zip(boundaries, boundaries[1:]):
+        if sum(len(line) + 1 for line in lines[start:end]) > max_chars:
+            segments.extend(_split_oversized(lines, start, end, max_chars))
+        else:
+            segments.append((start, end))
+
+    # Agrupar segmentos consecutivos até o limite do orçamento
+    groups = []
+    group_start, group_end, size = segments[0][0], segments[0][0], 0
+    for start, end in segments:
+        segment_size = sum(len(line) + 1 for line in lines[start:end])
+        if size and size + segment_size > max_chars:
+            groups.append((group_start, group_end))
+            group_start, size = start, 0
+        group_end = end
+        size += segment_size
+    groups.append((group_start, group_end))
+
+    chunks = []
+    for n, (start, end) in enumerate(groups):
+        if n > 0:
+            start = max(start - overlap_lines, 0)
+        chunks.append(CodeChunk(start + 1, end, '\n'.join(lines[start:end])))
+    return chunks
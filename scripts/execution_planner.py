@@ -0,0 +1,71 @@
+# scripts/execution_planner.py
+
+from collections import namedtuple
+
+SNIPPET_MAJOR = 'snippet-major'
+MODEL_MAJOR = 'model-major'
+EXECUTION_ORDERS = (MODEL_MAJOR, SNIPPET_MAJOR)
+
+# Etapa da execução: modelo da fase (None = modelos intercalados), seus jobs, hosts dedicados
+# (None = todos os endpoints) e se o modelo deve ser descarregado ao final
+ExecutionPhase = namedtuple('ExecutionPhase', ['model', 'jobs', 'hosts', 'unload'])
+
+
+class ExecutionPlanner:
+    """
+    Decide a ordem em que os jobs (snippet, modelo) chegam ao Ollama.
+
+    - snippet-major: uma única fase com todos os modelos intercalados (cada
+      snippet passa por todos os modelos). Com pouca memória, o Ollama pode
+      descarregar e recarregar os modelos a cada troca.
+    - model-major: uma fase por modelo. O modelo da fase fica fixado na memória
+      com keep_alive. Modelos que já estão carregados no servidor vão primeiro.
+
+    As fases são agrupadas em raias pelo local de execução (placement: hosts
+    dedicados a cada modelo, como no roteamento affinity do OllamaPool).
+    Modelos que dividem os mesmos endpoints ficam na mesma raia e rodam um por
+    vez; o modelo só é descarregado se outro vier depois dele na raia. Raias
+    diferentes (modelos em nós dedicados) rodam em paralelo.
+    """
+
+    def __init__(self, order=MODEL_MAJOR, keep_alive='30m'):
+        if order not in EXECUTION_ORDERS:
+            raise ValueError(f"Ordem de execução inválida: {order} (use {', '.join(EXECUTION_ORDERS)})")
+        self.order = order
+        self.keep_alive = keep_alive
+
+    def plan(self, jobs, resident_models=(), placement=None):
+        """
+        Divide os jobs em raias de fases, preservando a ordem original dentro de cada fase.
+
+        placement: {modelo: hosts dedicados (tupla) ou None}. Retorna uma lista de
+        raias; cada raia é uma lista de ExecutionPhase executadas em sequência.
+        """
+        jobs = list(jobs)
+        if not jobs:
+            return []
+        if self.order == SNIPPET_MAJOR:
+            return [[ExecutionPhase(None, jobs, None, False)]]
+        by_model = {}
+        for job in jobs:
+            by_model.setdefault(job.model, []).append(job)
+        resident = set(resident_models)
+        placement = placement or {}
+        # sorted é estável: entre residentes (e entre não residentes) vale a ordem original
+        models = sorted(by_model, key=lambda model: model not in resident)
+        lanes = {}
+        for model in models:
+            lanes.setdefault(placement.get(model), []).append(model)
+        return [
+            [ExecutionPhase(model, by_model[model], hosts, i < len(lane_models) - 1)
+             for i, model in enumerate(lane_models)]
+            for hosts, lane_models in lanes.items()
+        ]
+
+    def keep_alive_for(self, model):
+        """keep_alive das requisições do modelo (None = padrão do servidor)."""
+        return self.keep_alive if self.order == MODEL_MAJOR else None
+
+    def unload_after(self, phase):
+        """Ao fim de uma fase model-major seguida de outro modelo na raia, o modelo é descarregado."""
+        return self.order == MODEL_MAJOR and phase.model is not None and phase.unload
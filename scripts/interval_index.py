@@ -0,0 +1,102 @@
+# scripts/interval_index.py
+
+import os
+import re
+
+
+class IntervalIndex:
+    """
+    Árvore de intervalos estática (intervalos fechados [início, fim]).
+
+    Os intervalos ficam ordenados pelo início em um array que representa uma
+    árvore binária balanceada implícita (o nó de [lo, hi) é o elemento do meio);
+    cada nó guarda o maior fim da sua subárvore. Consultas de sobreposição
+    custam O(log n + k), onde k é o número de intervalos retornados.
+    """
+
+    def __init__(self, intervals=()):
+        # intervals: iterável de (início, fim, payload)
+        items = sorted(intervals, key=lambda item: (item[0], item[1]))
+        self._starts = [item[0] for item in items]
+        self._ends = [item[1] for item in items]
+        self._payloads = [item[2] for item in items]
+        self._max_end = list(self._ends)
+        self._build(0, len(items))
+
+    def __len__(self):
+        return len(self._starts)
+
+    def _build(self, lo, hi):
+        if lo >= hi:
+            return float('-inf')
+        mid = (lo + hi) // 2
+        self._max_end[mid] = max(self._ends[mid], self._build(lo, mid), self._build(mid + 1, hi))
+        return self._max_end[mid]
+
+    def overlapping(self, start, end):
+        """Payloads dos intervalos que se sobrepõem a [start, end]."""
+        found = []
+        stack = [(0, len(self._starts))]
+        while stack:
+            lo, hi = stack.pop()
+            if lo >= hi:
+                continue
+            mid = (lo + hi) // 2
+            if self._max_end[mid] < start:
+                continue  # Nenhum intervalo desta subárvore alcança `start`
+            stack.append((lo, mid))
+            # À direita, os inícios são >= ao deste nó: se ele começa depois de `end`, poda
+            if self._starts[mid] <= end:
+                if self._ends[mid] >= start:
+                    found.append(self._payloads[mid])
+                stack.append((mid + 1, hi))
+        return found
+
+
+def normalize_path(path):
+    """Normaliza caminhos do ground truth e dos relatórios (espaços, quebras de linha, prefixos)."""
+    path = re.sub(r'\s+', '', str(path)).replace('\\', '/')
+    if path.startswith('file://'):
+        path = path[len('file://'):]
+    while path.startswith('./'):
+        path = path[2:]
+    return path.lstrip('/')
+
+
+class FileIntervalIndex:
+    """
+    Índice de intervalos de linhas por arquivo.
+
+    Caminhos são casados pelo sufixo (um relatório pode citar
+    'juice-shop/routes/login.ts' para 'routes/login.ts') e também sem a
+    extensão, já que o ground truth tem entradas como 'routes/basketItems'.
+    """
+
+    def __init__(self, entries=()):
+        # entries: iterável de (caminho, início, fim, payload)
+        grouped = {}
+        for path, start, end, payload in entries:
+            grouped.setdefault(normalize_path(path), []).append((start, end, payload))
+        self._indexes = {path: IntervalIndex(items) for path, items in grouped.items()}
+        self._aliases = {}
+        for path in self._indexes:
+            self._aliases.setdefault(path, path)
+            self._aliases.setdefault(os.path.splitext(path)[0], path)
+
+    def resolve(self, path):
+        """Caminho indexado correspondente a `path` (pelo maior sufixo), ou None."""
+        parts = normalize_path(path).split('/')
+        for i in range(len(parts)):
+            candidate = '/'.join(parts[i:])
+            for key in (candidate, os.path.splitext(candidate)[0]):
+                if key in self._aliases:
+                    return self._aliases[key]
+        return None
+
+    def index_for(self, path):
+        resolved = self.resolve(path)
+        return self._indexes.get(resolved) if resolved is not None else None
+
+    def overlapping(self, path, start, end):
+        index = self.index_for(path)
+        return index.overlapping(start, end) if index is not None else []
@@ -0,0 +1,200 @@
+# scripts/line_matching.py
+
+import os
+import re
+
+import numpy as np
+
+from interval_index import FileIntervalIndex, normalize_path
+from response_classifier import DEFAULT_CLASSIFIER
+from sast_ingest import Finding, parse_line_range
+from snippet_corpus import SnippetCorpus
+
+SNIPPET_KEYS = ('trecho vulnerável', 'trecho vulneravel', 'vulnerable snippet')
+
+_SPACES_RE = re.compile(r'\s+')
+_LINE_RANGE_RE = re.compile(r'(\d+)\s*-\s*(\d+)')
+
+
+def normalize_line(line):
+    """Linha sem espaços nas pontas e com espaços internos colapsados (comparação tolerante)."""
+    return _SPACES_RE.sub(' ', line).strip()
+
+
+class LineLocator:
+    """
+    Localiza um fragmento de código (ex.: "Trecho Vulnerável" de um LLM) nas linhas de um texto.
+
+    As linhas não vazias são indexadas por conteúdo normalizado, então a linha
+    âncora do fragmento é encontrada em O(1) e só as candidatas são estendidas.
+    Fragmentos que não coincidem com linhas inteiras (ex.: uma expressão) são
+    procurados por substring.
+    """
+
+    def __init__(self, text):
+        self._lines = []
+        self._positions = {}
+        for number, line in enumerate(text.splitlines(), start=1):
+            normalized = normalize_line(line)
+            if normalized:
+                self._positions.setdefault(normalized, []).append(len(self._lines))
+                self._lines.append((number, normalized))
+
+    def _extend(self, index, fragment, equal):
+        matched = 0
+        while (matched < len(fragment) and index + matched < len(self._lines)
+               and equal(self._lines[index + matched][1], fragment[matched])):
+            matched += 1
+        return matched
+
+    def locate(self, fragment, min_ratio=0.5):
+        """Faixa (início, fim) de linhas onde o fragmento aparece, ou None."""
+        fragment = [line for line in map(normalize_line, str(fragment).splitlines()) if line]
+        if not fragment:
+            return None
+        best_index, best_matched = None, 0
+        for index in self._positions.get(fragment[0], ()):
+            matched = self._extend(index, fragment, str.__eq__)
+            if matched > best_matched:
+                best_index, best_matched = index, matched
+        if best_index is None:
+            # Fragmento parcial: a primeira linha pode ser só parte da linha de código
+            for index, (_, line) in enumerate(self._lines):
+                if fragment[0] in line:
+                    matched = self._extend(index, fragment, lambda line, part: part in line)
+                    if matched > best_matched:
+                        best_index, best_matched = index, matched
+        if best_index is None or best_matched < max(1, int(len(fragment) * min_ratio)):
+            return None
+        return self._lines[best_index][0], self._lines[best_index + best_matched - 1][0]
+
+
+def snippet_offsets(df_ground_truth, snippets_dir, source_root):
+    """
+    Deslocamento de linhas de cada snippet em relação ao arquivo original (coluna File).
+
+    O conteúdo do snippet é localizado no arquivo original de source_root. IDs
+    cujo original não existe (ou não contém o snippet) ficam de fora.
+    """
+    offsets = {}
+    if not source_root:
+        return offsets
+    corpus = SnippetCorpus(snippets_dir)
+    for snippet_id, path in zip(df_ground_truth['ID'], df_ground_truth['File']):
+        snippet_path = corpus.resolve(snippet_id)
+        original_path = os.path.join(source_root, normalize_path(path))
+        if not os.path.exists(original_path) and os.path.exists(f"{original_path}.ts"):
+            original_path = f"{original_path}.ts"
+        if snippet_path is None or not os.path.exists(original_path):
+            continue
+        with open(snippet_path, 'r', encoding='utf-8') as f:
+            snippet = f.read()
+        with open(original_path, 'r', encoding='utf-8') as f:
+            located = LineLocator(f.read()).locate(snippet, min_ratio=0.8)
+        first_line = LineLocator(snippet).locate(snippet)
+        if located is not None and first_line is not None:
+            offsets[snippet_id] = located[0] - first_line[0]
+    return offsets
+
+
+def iter_llm_findings(snippet_id, response, code, classifier=DEFAULT_CLASSIFIER):
+    """
+    Achados (relativos ao snippet) de uma resposta bruta de LLM.
+
+    Cada "Trecho Vulnerável" é resolvido para linhas do snippet. Em respostas
+    consolidadas por trechos (merge_chunk_results), a faixa "Linhas" do trecho
+    é usada quando o fragmento não é encontrado. Detecções sem localização
+    geram um achado sem linhas, que conta como não localizado.
+    """
+    if not isinstance(response, str) or classifier.classify(response) != 1:
+        return
+    locator = LineLocator(code)
+    path = f"{snippet_id}.ts"
+    found = False
+    for data in classifier.find_json_objects(response):
+        if not isinstance(data, dict):
+            continue
+        entries = data.get('Trechos') if isinstance(data.get('Trechos'), list) else [data]
+        for entry in entries:
+            if not isinstance(entry, dict):
+                continue
+            location = None
+            for key, value in entry.items():
+                if str(key).lower() in SNIPPET_KEYS and value:
+                    location = locator.locate(value)
+            if location is None and isinstance(entry.get('Linhas'), str):
+                match = _LINE_RANGE_RE.search(entry['Linhas'])
+                location = (int(match.group(1)), int(match.group(2))) if match else None
+            if location is not None:
+                found = True
+                yield Finding(path, location[0], location[1], None)
+    if not found:
+        yield Finding(path, None, None, None)
+
+
+class LineMatcher:
+    """
+    Casa achados com as faixas de linhas do ground truth (coluna Line).
+
+    Cada linha do ground truth vira um intervalo em um FileIntervalIndex, então
+    cada achado custa O(log n + k). Achados em snippets (code_snippets/<ID>.ts)
+    são levados às linhas do arquivo original pelo deslocamento do snippet;
+    sem deslocamento conhecido, ficam fora das métricas por linhas (não há
+    como saber se a linha do snippet cai na faixa do ground truth).
+    """
+
+    def __init__(self, df_ground_truth, offsets=None):
+        self.ids = list(df_ground_truth['ID'])
+        self.files = dict(zip(self.ids, df_ground_truth['File']))
+        self.offsets = offsets or {}
+        self._position = {snippet_id: i for i, snippet_id in enumerate(self.ids)}
+        # IDs cujo snippet foi posicionado no arquivo original
+        self.positioned = np.array([snippet_id in self.offsets for snippet_id in self.ids], dtype=bool)
+        lines = df_ground_truth['Line'] if 'Line' in df_ground_truth.columns else [None] * len(self.ids)
+        entries = []
+        for snippet_id, path, line in zip(self.ids, df_ground_truth['File'], lines):
+            start, end = parse_line_range(line)
+            entries.append((path, start, end, snippet_id))
+        self.index = FileIntervalIndex(entries)
+        self.vulnerable = df_ground_truth['Is_Vulnerable'].astype(int).to_numpy(dtype=bool)
+
+    def on_snippet(self, finding):
+        """Se o achado aponta para um arquivo de snippet (<ID>.ts) em vez do código original."""
+        return os.path.splitext(os.path.basename(str(finding.path)))[0] in self._position
+
+    def match(self, finding):
+        """IDs do ground truth cuja faixa de linhas contém o achado (None = snippet sem deslocamento)."""
+        stem = os.path.splitext(os.path.basename(str(finding.path)))[0]
+        if stem in self._position and stem not in self.offsets:
+            return None
+        if finding.start_line is None:
+            return []
+        if stem in self._position:
+            offset = self.offsets[stem]
+            return self.index.overlapping(self.files[stem], finding.start_line + offset,
+                                          finding.end_line + offset)
+        return self.index.overlapping(finding.path, finding.start_line, finding.end_line)
+
+    def counts(self, findings, evaluable=None):
+        """
+        Contagens de localização de uma ferramenta.
+
+        Achados em snippets sem deslocamento conhecido são ignorados. evaluable
+        (máscara por ID, ex.: positioned para ferramentas que apontam linhas de
+        snippets) restringe as faixas vulneráveis do recall. Retorna (achados,
+        achados em faixa vulnerável, faixas vulneráveis atingidas, total de
+        faixas vulneráveis).
+        """
+        ranges = self.vulnerable if evaluable is None else self.vulnerable & evaluable
+        hit = np.zeros(len(self.ids), dtype=bool)
+        total = localized = 0
+        for finding in findings:
+            matched = self.match(finding)
+            if matched is None:
+                continue
+            total += 1
+            positions = [self._position[snippet_id] for snippet_id in matched]
+            if positions and self.vulnerable[positions].any():
+                localized += 1
+                hit[positions] = True
+        return total, localized, int(np.count_nonzero(hit & ranges)), int(np.count_nonzero(ranges))
@@ -0,0 +1,265 @@
+# scripts/llm_backoff.py
+
+import random
+import statistics
+import threading
+import time
+from contextlib import contextmanager
+
+import httpx
+import ollama
+
+# Tipos de erro de uma chamada ao Ollama
+CONTEXT = 'context'            # Prompt maior que a janela de contexto (não adianta repetir)
+MODEL_MISSING = 'model_missing'
+CLIENT = 'client'              # Requisição inválida (4xx)
+OVERLOADED = 'overloaded'      # Servidor saturado (429/503): reduz a concorrência
+TIMEOUT = 'timeout'
+CONNECTION = 'connection'
+SERVER = 'server'              # Erro interno (5xx)
+UNKNOWN = 'unknown'
+
+RETRYABLE = frozenset({OVERLOADED, TIMEOUT, CONNECTION, SERVER, UNKNOWN})
+# Erros que indicam saturação: contam para o circuit breaker e para o limitador
+PRESSURE = frozenset({OVERLOADED, TIMEOUT, CONNECTION, SERVER})
+
+
+def classify_error(error):
+    """Classifica uma exceção da chamada ao Ollama pelo tipo (e status HTTP), não pelo texto."""
+    if isinstance(error, ollama.ResponseError):
+        status = error.status_code
+        if 'context' in str(error.error).lower() and 'length' in str(error.error).lower():
+            return CONTEXT
+        if status == 404:
+            return MODEL_MISSING
+        if status in (429, 503):
+            return OVERLOADED
+        if status in (408, 504):
+            return TIMEOUT
+        if 400 <= status < 500:
+            return CLIENT
+        return SERVER
+    if isinstance(error, (httpx.TimeoutException, TimeoutError)):
+        return TIMEOUT
+    if isinstance(error, (httpx.TransportError, ConnectionError)):
+        return CONNECTION
+    return UNKNOWN
+
+
+class BackoffPolicy:
+    """
+    Backoff exponencial com jitter completo (atraso uniforme em [0, base * 2^tentativa]).
+
+    O jitter espalha os retries de requisições que falharam juntas, em vez de
+    repeti-las em sincronia contra um servidor já saturado.
+    """
+
+    def __init__(self, max_retries=3, base_delay=1.0, max_delay=30.0, rng=None):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._rng = rng or random.Random()
+
+    def delay(self, attempt):
+        """Atraso antes da tentativa attempt + 1 (attempt começa em 0)."""
+        return self._rng.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker por modelo (fechado → aberto → meio-aberto).
+
+    Após failure_threshold falhas de saturação seguidas, o circuito abre e as
+    chamadas esperam reset_timeout segundos. Depois disso, uma única chamada de
+    teste passa (meio-aberto): sucesso fecha o circuito, falha reabre.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = 'fechado', 'aberto', 'meio-aberto'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.trips = 0
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._condition = threading.Condition()
+
+    def acquire(self, timeout=None):
+        """Aguarda permissão para chamar; False se o circuito continuar aberto após timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while True:
+                if self.state == self.CLOSED:
+                    return True
+                now = time.monotonic()
+                if self.state == self.OPEN and now - self._opened_at >= self.reset_timeout:
+                    self.state = self.HALF_OPEN
+                if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                    self._probe_in_flight = True
+                    return True
+                wait = self.reset_timeout - (now - self._opened_at) if self.state == self.OPEN else self.reset_timeout
+                if deadline is not None:
+                    if now >= deadline:
+                        return False
+                    wait = min(wait, deadline - now)
+                self._condition.wait(max(wait, 0.01))
+
+    def record_success(self):
+        with self._condition:
+            self._failures = 0
+            self._probe_in_flight = False
+            if self.state != self.CLOSED:
+                self.state = self.CLOSED
+                self._condition.notify_all()
+
+    def record_failure(self):
+        with self._condition:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.trips += 1
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+            self._probe_in_flight = False
+            self._condition.notify_all()
+
+    def release_probe(self):
+        """Libera a chamada de teste sem veredito (ex.: erro que não indica saturação)."""
+        with self._condition:
+            if self._probe_in_flight:
+                self._probe_in_flight = False
+                self._condition.notify_all()
+
+
+class AdaptiveLimiter:
+    """
+    Limite de requisições simultâneas que se ajusta à carga do servidor (AIMD).
+
+    Erros de saturação (429/503/timeout) multiplicam o limite por
+    `backoff_ratio`. A latência só reduz o limite quando a lentidão é
+    sustentada: a mediana das últimas `sustain` amostras precisa passar de
+    `tolerance` vezes a mediana da janela longa (`baseline_window`). Cada
+    amostra é a latência por token gerado (quando o número de tokens é
+    conhecido), para que respostas longas não pareçam congestionamento.
+    Amostras normais aumentam o limite em 1/limite (cresce ~1 por janela
+    completa). O limite fica entre min_limit e max_limit.
+    """
+
+    def __init__(self, max_limit, min_limit=1, initial=None, tolerance=2.0, backoff_ratio=0.7,
+                 baseline_window=50, sustain=10):
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.limit = float(initial or self.max_limit)
+        self.tolerance = tolerance
+        self.backoff_ratio = backoff_ratio
+        self.baseline_window = baseline_window
+        self.sustain = max(1, min(sustain, baseline_window))
+        self.in_flight = 0
+        self.decreases = 0
+        self._recent = []
+        self._since_decrease = 0
+        self._condition = threading.Condition()
+
+    @property
+    def current_limit(self):
+        return max(self.min_limit, int(self.limit))
+
+    def acquire(self):
+        with self._condition:
+            while self.in_flight >= self.current_limit:
+                self._condition.wait()
+            self.in_flight += 1
+
+    def release(self, latency=None, overloaded=False, tokens=None):
+        with self._condition:
+            self.in_flight -= 1
+            if overloaded:
+                self._decrease()
+            elif latency is not None:
+                sample = latency / tokens if tokens else latency
+                self._recent = (self._recent + [sample])[-self.baseline_window:]
+                self._since_decrease += 1
+                if self._congested():
+                    self._decrease()
+                else:
+                    self.limit = min(self.max_limit, self.limit + 1.0 / max(self.limit, 1.0))
+            self._condition.notify_all()
+
+    def _congested(self):
+        """Lentidão sustentada: janela curta (desde a última redução) bem acima da janela longa."""
+        if self._since_decrease < self.sustain or len(self._recent) < self.baseline_window:
+            return False
+        baseline = statistics.median(self._recent)
+        return statistics.median(self._recent[-self.sustain:]) > baseline * self.tolerance
+
+    def _decrease(self):
+        self._since_decrease = 0
+        limit = max(self.min_limit, self.limit * self.backoff_ratio)
+        if limit < self.limit:
+            self.limit = limit
+            self.decreases += 1
+
+    @contextmanager
+    def slot(self):
+        """Reserva uma vaga; o chamador preenche slot['latency'] (e 'tokens') ou slot['overloaded'] antes de sair."""
+        self.acquire()
+        outcome = {'latency': None, 'overloaded': False, 'tokens': None}
+        try:
+            yield outcome
+        finally:
+            self.release(outcome['latency'], outcome['overloaded'], outcome['tokens'])
+
+
+class BackpressureController:
+    """
+    Reúne, por modelo, a política de backoff, o circuit breaker e o limitador adaptativo.
+
+    max_concurrency: {modelo: limite máximo} (normalmente a concorrência do
+    scheduler); o limitador nunca passa desse valor.
+    """
+
+    def __init__(self, policy=None, max_concurrency=None, default_concurrency=1, adaptive=True,
+                 failure_threshold=5, reset_timeout=30.0):
+        self.policy = policy or BackoffPolicy()
+        self.max_concurrency = dict(max_concurrency or {})
+        self.default_concurrency = default_concurrency
+        self.adaptive = adaptive
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._breakers = {}
+        self._limiters = {}
+        self._lock = threading.Lock()
+
+    def breaker(self, model):
+        with self._lock:
+            if model not in self._breakers:
+                self._breakers[model] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            return self._breakers[model]
+
+    def limiter(self, model):
+        with self._lock:
+            if model not in self._limiters:
+                max_limit = self.max_concurrency.get(model, self.default_concurrency)
+                # Sem adaptação, o limitador só espelha o limite fixo
+                self._limiters[model] = AdaptiveLimiter(
+                    max_limit, min_limit=1 if self.adaptive else max_limit
+                )
+            return self._limiters[model]
+
+    def report(self):
+        """Estado final por modelo: limite atual, reduções, aberturas do circuito."""
+        with self._lock:
+            models = sorted(set(self._breakers) | set(self._limiters))
+        report = {}
+        for model in models:
+            limiter, breaker = self.limiter(model), self.breaker(model)
+            report[model] = {
+                'limit': limiter.current_limit,
+                'max_limit': limiter.max_limit,
+                'decreases': limiter.decreases,
+                'circuit': breaker.state,
+                'trips': breaker.trips,
+            }
+        return report
@@ -0,0 +1,133 @@
+# scripts/llm_cache.py
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+
+class ResponseCache:
+    """
+    Cache persistente em disco para respostas do Ollama, endereçado por conteúdo.
+
+    A chave é o SHA-256 de (modelo, prompt, opções). Como as execuções usam
+    temperature 0.0, uma resposta armazenada pode substituir uma nova inferência.
+    Cada entrada é um arquivo JSON em <cache_dir>/<2 primeiros hex>/<hash>.json;
+    o mtime do arquivo marca o último acesso e orienta a remoção (LRU).
+    """
+
+    def __init__(self, cache_dir, max_entries=None, max_bytes=None, max_age_seconds=None,
+                 enabled=True, refresh=False):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.enabled = enabled
+        self.refresh = refresh
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self._lock = threading.Lock()
+        if self.enabled:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(model, prompt, options):
+        payload = json.dumps(
+            {'model': model, 'prompt': prompt, 'options': options or {}},
+            sort_keys=True, ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _count(self, attr):
+        with self._lock:
+            setattr(self, attr, getattr(self, attr) + 1)
+
+    def get(self, key):
+        """Retorna a resposta armazenada ou None (cache desativado, --refresh, ausente ou expirada)."""
+        if not self.enabled or self.refresh:
+            return None
+        path = self._path(key)
+        try:
+            if self.max_age_seconds is not None and time.time() - os.path.getmtime(path) > self.max_age_seconds:
+                self._count('misses')
+                return None
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            os.utime(path)  # Atualiza o último acesso para a política LRU
+        except (OSError, ValueError):
+            self._count('misses')
+            return None
+        self._count('hits')
+        return entry.get('response')
+
+    def put(self, key, response, model=None, options=None):
+        """Grava a resposta de forma atômica (arquivo temporário + rename)."""
+        if not self.enabled:
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        entry = {
+            'model': model,
+            'options': options,
+            'created': time.time(),
+            'response': response,
+        }
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        self._count('writes')
+
+    def _entries(self):
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith('.json'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def evict(self):
+        """Remove entradas expiradas e, se preciso, as menos usadas até respeitar os limites."""
+        if not self.enabled:
+            return 0
+        now = time.time()
+        removed = 0
+        kept = []
+        for mtime, size, path in self._entries():
+            if self.max_age_seconds is not None and now - mtime > self.max_age_seconds:
+                removed += self._remove(path)
+            else:
+                kept.append((mtime, size, path))
+
+        kept.sort()  # Mais antigos primeiro
+        total_bytes = sum(size for _, size, _ in kept)
+        while kept and (
+            (self.max_entries is not None and len(kept) > self.max_entries)
+            or (self.max_bytes is not None and total_bytes > self.max_bytes)
+        ):
+            _, size, path = kept.pop(0)
+            total_bytes -= size
+            removed += self._remove(path)
+        return removed
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+            return 1
+        except OSError:
+            return 0
+
+    def summary(self):
+        return f"{self.hits} acerto(s), {self.misses} falta(s), {self.writes} gravação(ões)"
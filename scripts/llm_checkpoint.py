@@ -0,0 +1,76 @@
+# scripts/llm_checkpoint.py
+
+import json
+import os
+import threading
+import time
+
+
+class ResultCheckpoint:
+    """
+    Checkpoint incremental (JSONL, somente anexação) dos resultados por (snippet, modelo).
+
+    Cada par concluído vira uma linha gravada e sincronizada em disco logo após a
+    inferência, de modo que uma queda no meio da execução perde no máximo o par
+    em andamento. Em caso de registros repetidos, o último prevalece.
+    """
+
+    def __init__(self, path, resume=False):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.records = self._load() if resume else {}
+        if not resume:
+            # Execução nova: descarta o checkpoint anterior
+            open(self.path, 'w', encoding='utf-8').close()
+        else:
+            self._terminate_partial_line()
+
+    def _load(self):
+        records = {}
+        if not os.path.exists(self.path):
+            return records
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # Linha truncada por uma interrupção durante a escrita
+                    continue
+                records[(record['ID'], record['model'])] = record
+        return records
+
+    def _terminate_partial_line(self):
+        # Garante que novos registros não sejam colados a uma linha truncada
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            return
+        with open(self.path, 'rb+') as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b'\n':
+                f.write(b'\n')
+
+    def is_done(self, snippet_id, model):
+        """Um par está concluído se houver registro sem erro para ele."""
+        record = self.records.get((snippet_id, model))
+        return record is not None and not str(record.get('raw', '')).startswith('ERROR')
+
+    def append(self, snippet_id, model, raw, detected, elapsed):
+        record = {
+            'ID': snippet_id,
+            'model': model,
+            'raw': raw,
+            'detected': int(detected),
+            'time': elapsed,
+            'timestamp': time.time(),
+        }
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            self.records[(snippet_id, model)] = record
+        return record
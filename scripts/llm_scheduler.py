@@ -0,0 +1,101 @@
+# scripts/llm_scheduler.py
+
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+# Unidade de trabalho: posição no DataFrame de saída, modelo e dados do snippet
+InferenceJob = namedtuple('InferenceJob', ['idx', 'model', 'payload'])
+
+
+class InferenceScheduler:
+    """
+    Executa jobs de inferência em paralelo, com um limite de concorrência por modelo.
+
+    Cada modelo recebe seu próprio pool de threads, de modo que snippets e modelos
+    ficam em voo ao mesmo tempo no Ollama. Os resultados são devolvidos na mesma
+    ordem dos jobs recebidos, independentemente da ordem de conclusão. O tempo
+    que cada job esperou na fila fica disponível para o worker em
+    current_queue_wait().
+    """
+
+    def __init__(self, concurrency=None, default_concurrency=1):
+        self.concurrency = dict(concurrency or {})
+        self.default_concurrency = max(1, int(default_concurrency))
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._local = threading.local()
+
+    def concurrency_for(self, model):
+        return max(1, int(self.concurrency.get(model, self.default_concurrency)))
+
+    def current_queue_wait(self):
+        """Segundos que o job em execução nesta thread esperou na fila (None fora de um job)."""
+        return getattr(self._local, 'queue_wait', None)
+
+    def _record(self, model, started, finished, queue_wait=0.0):
+        with self._lock:
+            stats = self._stats.setdefault(model, {
+                'jobs': 0, 'busy': 0.0, 'queued': 0.0, 'first_start': started, 'last_end': finished
+            })
+            stats['jobs'] += 1
+            stats['busy'] += finished - started
+            stats['queued'] += queue_wait
+            stats['first_start'] = min(stats['first_start'], started)
+            stats['last_end'] = max(stats['last_end'], finished)
+
+    def run(self, jobs, worker):
+        """Executa worker(job) para cada job e retorna os resultados na ordem de entrada."""
+        jobs = list(jobs)
+        models = list(dict.fromkeys(job.model for job in jobs))
+        executors = {
+            model: ThreadPoolExecutor(
+                max_workers=self.concurrency_for(model),
+                thread_name_prefix=f"llm-{model}"
+            )
+            for model in models
+        }
+
+        def timed(job, submitted):
+            started = time.time()
+            self._local.queue_wait = started - submitted
+            try:
+                return worker(job)
+            finally:
+                self._record(job.model, started, time.time(), started - submitted)
+                self._local.queue_wait = None
+
+        try:
+            futures = [executors[job.model].submit(timed, job, time.time()) for job in jobs]
+            return [future.result() for future in futures]
+        finally:
+            for executor in executors.values():
+                executor.shutdown(wait=True)
+
+    def throughput_report(self):
+        """Retorna métricas de vazão por modelo (jobs, tempo de parede, jobs/min, latência e espera médias)."""
+        report = {}
+        with self._lock:
+            for model, stats in self._stats.items():
+                wall = max(stats['last_end'] - stats['first_start'], 1e-9)
+                report[model] = {
+                    'jobs': stats['jobs'],
+                    'concurrency': self.concurrency_for(model),
+                    'wall_seconds': wall,
+                    'jobs_per_minute': stats['jobs'] / wall * 60,
+                    'avg_latency': stats['busy'] / stats['jobs'],
+                    'avg_queue_wait': stats['queued'] / stats['jobs'],
+                }
+        return report
+
+
+def parse_concurrency_overrides(values):
+    """Converte entradas 'modelo=N' em um dicionário {modelo: N}."""
+    overrides = {}
+    for value in values or []:
+        model, sep, count = value.rpartition('=')
+        if not sep or not model:
+            raise ValueError(f"Concorrência inválida (use modelo=N): {value}")
+        overrides[model] = int(count)
+    return overrides
@@ -0,0 +1,191 @@
+# scripts/llm_telemetry.py
+
+import argparse
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+
+import numpy as np
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_TELEMETRY_PATH = os.path.join(PROJECT_ROOT, 'results', 'llm_telemetry.jsonl')
+
+# Campos de tempo/token devolvidos pelo Ollama (durações em nanossegundos)
+OLLAMA_STAT_FIELDS = (
+    'total_duration', 'load_duration', 'prompt_eval_count',
+    'prompt_eval_duration', 'eval_count', 'eval_duration',
+)
+
+# Métricas com percentis no relatório
+LATENCY_FIELDS = ('queue_wait', 'ttft', 'duration', 'tokens_per_second')
+PERCENTILES = (50, 95, 99)
+
+# load_duration acima disto indica que o modelo precisou ser carregado na memória
+MODEL_LOAD_THRESHOLD_SECONDS = 0.5
+
+
+def ollama_stats(response):
+    """Extrai as contagens e durações de uma resposta do Ollama (dict ou GenerateResponse)."""
+    if response is None:
+        return {}
+    stats = {}
+    for field in OLLAMA_STAT_FIELDS:
+        value = response.get(field) if hasattr(response, 'get') else getattr(response, field, None)
+        if value is not None:
+            stats[field] = value
+    return stats
+
+
+class TelemetryRecorder:
+    """
+    Telemetria por tentativa de geração, gravada em JSONL (somente anexação).
+
+    Cada tentativa vira um registro com espera na fila, tempo até o primeiro
+    token, duração total, contagens de tokens do Ollama e número da tentativa.
+    Os registros da execução atual ficam também em memória para o relatório.
+    """
+
+    def __init__(self, path=DEFAULT_TELEMETRY_PATH, enabled=True, run_id=None):
+        self.path = path
+        self.enabled = enabled
+        self.run_id = run_id or time.strftime('%Y%m%dT%H%M%S')
+        self.records = []
+        self._lock = threading.Lock()
+        if enabled:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def record(self, snippet_id, model, status, attempt=0, queue_wait=None, ttft=None,
+               duration=None, stats=None, error=None, **extra):
+        """
+        Registra uma tentativa.
+
+        status: 'ok', 'empty', 'error' ou 'cache'. ttft é o tempo até o primeiro
+        token: medido no cliente em streaming; sem streaming, estimado pelo
+        Ollama (load_duration + prompt_eval_duration).
+        """
+        if not self.enabled:
+            return None
+        stats = stats or {}
+        if ttft is None and 'prompt_eval_duration' in stats:
+            ttft = (stats.get('load_duration', 0) + stats['prompt_eval_duration']) / 1e9
+        tokens_per_second = None
+        if stats.get('eval_count') and stats.get('eval_duration'):
+            tokens_per_second = stats['eval_count'] / (stats['eval_duration'] / 1e9)
+        record = {
+            'run': self.run_id,
+            'timestamp': time.time(),
+            'ID': snippet_id,
+            'model': model,
+            'status': status,
+            'attempt': attempt,
+            'retries': max(attempt - 1, 0),
+            'queue_wait': queue_wait,
+            'ttft': ttft,
+            'duration': duration,
+            'tokens_per_second': tokens_per_second,
+            'error': error,
+        }
+        record.update(stats)
+        record.update(extra)
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+            self.records.append(record)
+        return record
+
+
+def load_records(path, run_id=None):
+    """Lê os registros de um JSONL de telemetria (por padrão, só os da última execução)."""
+    records = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    if run_id is None and records:
+        run_id = records[-1].get('run')
+    return [record for record in records if record.get('run') == run_id]
+
+
+def latency_report(records):
+    """
+    Relatório agregado por modelo: contagens, tokens e percentis p50/p95/p99.
+
+    A espera na fila é contada uma vez por requisição (primeira tentativa); as
+    demais métricas consideram apenas as tentativas com resposta do Ollama.
+    """
+    grouped = defaultdict(list)
+    for record in records:
+        grouped[record['model']].append(record)
+
+    report = {}
+    for model, items in grouped.items():
+        generated = [r for r in items if r['status'] in ('ok', 'empty')]
+        summary = {
+            'requests': sum(1 for r in items if r['attempt'] <= 1),
+            'attempts': sum(1 for r in items if r['status'] != 'cache'),
+            'cache_hits': sum(1 for r in items if r['status'] == 'cache'),
+            'errors': sum(1 for r in items if r['status'] == 'error'),
+            'retries': sum(1 for r in items if r['attempt'] > 1),
+            'prompt_tokens': int(sum(r.get('prompt_eval_count') or 0 for r in generated)),
+            'eval_tokens': int(sum(r.get('eval_count') or 0 for r in generated)),
+            'load_seconds': sum(r.get('load_duration') or 0 for r in generated) / 1e9,
+            'model_loads': sum(1 for r in generated
+                               if (r.get('load_duration') or 0) / 1e9 >= MODEL_LOAD_THRESHOLD_SECONDS),
+        }
+        for field in LATENCY_FIELDS:
+            source = [r for r in items if r['attempt'] <= 1] if field == 'queue_wait' else generated
+            values = np.array([r[field] for r in source if r.get(field) is not None], dtype=np.float64)
+            for p in PERCENTILES:
+                summary[f'{field}_p{p}'] = float(np.percentile(values, p)) if values.size else None
+        report[model] = summary
+    return report
+
+
+def format_report(report):
+    """Linhas de texto do relatório de latência, uma por modelo e métrica."""
+    def fmt(value, unit):
+        return '-' if value is None else f"{value:.2f}{unit}"
+
+    lines = []
+    for model, summary in report.items():
+        lines.append(
+            f"  {model}: {summary['requests']} req | {summary['attempts']} tentativa(s) "
+            f"| {summary['retries']} retry(s) | {summary['errors']} erro(s) | {summary['cache_hits']} em cache "
+            f"| tokens {summary['prompt_tokens']} prompt / {summary['eval_tokens']} gerados "
+            f"| {summary['model_loads']} carga(s) do modelo ({summary['load_seconds']:.1f}s)"
+        )
+        for field, unit in (('queue_wait', 's'), ('ttft', 's'), ('duration', 's'), ('tokens_per_second', ' tok/s')):
+            values = ' | '.join(f"p{p} {fmt(summary[f'{field}_p{p}'], unit)}" for p in PERCENTILES)
+            lines.append(f"    {field:<18} {values}")
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Relatório de latência e tokens a partir da telemetria LLM")
+    parser.add_argument('--input', default=DEFAULT_TELEMETRY_PATH, help="JSONL de telemetria")
+    parser.add_argument('--run', default=None, help="Execução a resumir (padrão: a última)")
+    parser.add_argument('--json', metavar='ARQUIVO', help="Gravar também o relatório em JSON")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.input):
+        raise FileNotFoundError(f"Arquivo de telemetria não encontrado: {args.input}")
+    records = load_records(args.input, args.run)
+    if not records:
+        print("⚠️ Nenhum registro de telemetria encontrado.")
+        return
+    report = latency_report(records)
+    print(f"⏱️ Telemetria da execução {records[0]['run']} ({len(records)} registro(s)):")
+    print('\n'.join(format_report(report)))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=4, ensure_ascii=False)
+        print(f"💾 Relatório salvo em: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
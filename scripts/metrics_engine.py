@@ -0,0 +1,171 @@
+# scripts/metrics_engine.py
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+METRIC_COLUMNS = ['Precisão', 'Recall', 'F1-Score', 'FP Rate']
+
+
+def confusion_counts(y_true, y_pred_matrix):
+    """
+    Calcula VP/FP/FN/VN de todas as ferramentas em uma única passada vetorizada.
+
+    y_true: (..., n) com o ground truth binário.
+    y_pred_matrix: (..., n, t) com as predições empilhadas (uma coluna por ferramenta).
+    Dimensões iniciais extras (ex.: reamostragens de bootstrap) são preservadas.
+    Retorna um array (..., 4, t) com as linhas VP, FP, FN, VN.
+    """
+    y_true = np.asarray(y_true, dtype=np.int64)
+    y_pred = np.asarray(y_pred_matrix, dtype=np.int64)
+    n = y_true.shape[-1]
+
+    tp = np.einsum('...n,...nt->...t', y_true, y_pred)
+    predicted_pos = y_pred.sum(axis=-2)
+    actual_pos = y_true.sum(axis=-1)[..., None]
+
+    fp = predicted_pos - tp
+    fn = actual_pos - tp
+    tn = n - tp - fp - fn
+    return np.stack([tp, fp, fn, tn], axis=-2)
+
+
+def _safe_divide(numerator, denominator):
+    numerator = np.asarray(numerator, dtype=np.float64)
+    denominator = np.asarray(denominator, dtype=np.float64)
+    return np.divide(numerator, denominator, out=np.zeros_like(numerator), where=denominator > 0)
+
+
+def metrics_from_counts(counts):
+    """
+    Deriva as métricas a partir da matriz de confusão (zero_division=0, como no sklearn).
+
+    FP Rate segue a definição do artigo: FP / (VP + FP).
+    """
+    tp, fp, fn = counts[..., 0, :], counts[..., 1, :], counts[..., 2, :]
+    return {
+        'Precisão': _safe_divide(tp, tp + fp),
+        'Recall': _safe_divide(tp, tp + fn),
+        'F1-Score': _safe_divide(2 * tp, 2 * tp + fp + fn),
+        'FP Rate': _safe_divide(fp, tp + fp),
+    }
+
+
+def calculate_all_metrics(y_true, tools):
+    """
+    Calcula as métricas de todas as ferramentas de uma vez.
+
+    tools: dicionário {nome da ferramenta: predições binárias}, na ordem da tabela.
+    Retorna uma lista de registros no formato da Tabela 2.
+    """
+    names = list(tools)
+    y_pred_matrix = np.column_stack([np.asarray(tools[name], dtype=np.int64) for name in names])
+    counts = confusion_counts(y_true, y_pred_matrix)
+    metrics = metrics_from_counts(counts)
+
+    results = []
+    for i, name in enumerate(names):
+        record = {'Ferramenta': name}
+        for column in METRIC_COLUMNS:
+            record[column] = float(metrics[column][i])
+        record['VP'] = int(counts[0, i])
+        record['FP'] = int(counts[1, i])
+        record['FN'] = int(counts[2, i])
+        results.append(record)
+    return results
+
+
+LOCALIZATION_COLUMNS = ['Precisão (linhas)', 'Recall (linhas)', 'F1-Score (linhas)']
+
+
+def calculate_localization_metrics(counts):
+    """
+    Métricas com localização a partir das contagens de LineMatcher.counts.
+
+    counts: {ferramenta: (achados, achados localizados, faixas atingidas, faixas vulneráveis)}.
+    Precisão é por achado (achados dentro de uma faixa vulnerável / achados) e
+    recall é por faixa (faixas vulneráveis atingidas / faixas vulneráveis).
+    """
+    names = list(counts)
+    findings, localized, hit, ranges = np.asarray([counts[name] for name in names], dtype=np.int64).reshape(-1, 4).T
+    precision = _safe_divide(localized, findings)
+    recall = _safe_divide(hit, ranges)
+    f1 = _safe_divide(2 * precision * recall, precision + recall)
+
+    results = []
+    for i, name in enumerate(names):
+        results.append({
+            'Ferramenta': name,
+            'Achados': int(findings[i]),
+            'Achados Localizados': int(localized[i]),
+            'Faixas Atingidas': int(hit[i]),
+            'Faixas Vulneráveis': int(ranges[i]),
+            'Precisão (linhas)': float(precision[i]),
+            'Recall (linhas)': float(recall[i]),
+            'F1-Score (linhas)': float(f1[i]),
+        })
+    return results
+
+
+# Limite de memória para a matriz de pesos (reamostragens x amostras) de cada lote
+BOOTSTRAP_BATCH_BYTES = 64 * 1024 * 1024
+
+
+def _bootstrap_batch(task):
+    """Calcula as métricas de um lote de reamostragens (executado em um processo do pool)."""
+    y_true, y_pred_matrix, n_resamples, seed_sequence = task
+    n = y_true.shape[0]
+    rng = np.random.default_rng(seed_sequence)
+
+    # Cada reamostragem com reposição vira um vetor de contagens (pesos) por amostra,
+    # e a matriz de confusão sai de produtos matriciais: (b, n) @ (n, t)
+    # (em float64 para usar BLAS; as contagens continuam exatas)
+    indices = rng.integers(0, n, size=(n_resamples, n))
+    offsets = (indices + np.arange(n_resamples)[:, None] * n).ravel()
+    weights = np.bincount(offsets, minlength=n_resamples * n).reshape(n_resamples, n).astype(np.float64)
+    tp = weights @ (y_true[:, None] * y_pred_matrix).astype(np.float64)
+    predicted_pos = weights @ y_pred_matrix.astype(np.float64)
+    actual_pos = (weights @ y_true.astype(np.float64))[:, None]
+    fp = predicted_pos - tp
+    fn = actual_pos - tp
+    tn = n - tp - fp - fn
+    return metrics_from_counts(np.stack([tp, fp, fn, tn], axis=-2))
+
+
+def bootstrap_confidence_intervals(y_true, y_pred_matrix, n_resamples=10000, confidence=0.95,
+                                   seed=42, workers=None):
+    """
+    Intervalos de confiança por bootstrap percentil para todas as métricas e ferramentas.
+
+    As reamostragens são divididas em lotes vetorizados e distribuídas em um pool
+    de processos. Cada lote recebe uma semente derivada de seed, então o resultado
+    não depende do número de workers. Retorna {métrica: (inferior, superior)},
+    com arrays de uma posição por ferramenta.
+    """
+    y_true = np.asarray(y_true, dtype=np.int64)
+    y_pred_matrix = np.asarray(y_pred_matrix, dtype=np.int64)
+    n = y_true.shape[0]
+
+    batch_size = max(1, min(n_resamples, BOOTSTRAP_BATCH_BYTES // (8 * max(n, 1))))
+    sizes = [batch_size] * (n_resamples // batch_size)
+    if n_resamples % batch_size:
+        sizes.append(n_resamples % batch_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(y_true, y_pred_matrix, size, seed_sequence) for size, seed_sequence in zip(sizes, seeds)]
+
+    if workers is None:
+        workers = min(len(tasks), os.cpu_count() or 1)
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            batches = list(executor.map(_bootstrap_batch, tasks))
+    else:
+        batches = [_bootstrap_batch(task) for task in tasks]
+
+    alpha = (1 - confidence) / 2
+    intervals = {}
+    for column in METRIC_COLUMNS:
+        samples = np.concatenate([batch[column] for batch in batches], axis=0)
+        lower, upper = np.quantile(samples, [alpha, 1 - alpha], axis=0)
+        intervals[column] = (lower, upper)
+    return intervals
@@ -0,0 +1,146 @@
+# scripts/metrics_slices.py
+
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from metrics_engine import METRIC_COLUMNS, metrics_from_counts
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SLICES_PATH = os.path.join(PROJECT_ROOT, 'dataset', 'metrics_slices.json')
+
+SLICE_COLUMNS = ['Recorte', 'Grupo', 'Ferramenta', 'Amostras', 'Vulneráveis', 'Detectadas',
+                 'VP', 'FP', 'FN', 'VN'] + METRIC_COLUMNS
+
+
+def load_slices_config(path=DEFAULT_SLICES_PATH):
+    """Lê a configuração de recortes: {"tools": {nome: coluna}, "slices": {recorte: especificação}}."""
+    with open(path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    if not config.get('slices'):
+        raise ValueError(f"Nenhum recorte definido em {path}")
+    return config
+
+
+def normalize_label(value):
+    """Rótulo sem quebras de linha e espaços repetidos (ex.: categorias digitadas no CSV)."""
+    if not isinstance(value, str):
+        return value if pd.notna(value) else None
+    return re.sub(r'\s+', ' ', value).strip() or None
+
+
+def path_prefix(value, depth):
+    """Os primeiros `depth` diretórios do caminho ('.' para arquivos na raiz)."""
+    if not isinstance(value, str):
+        return None
+    path = re.sub(r'\s*/\s*', '/', value.strip()).strip('/')
+    directories = path.split('/')[:-1]
+    return '/'.join(directories[:depth]) or '.'
+
+
+def merge_detections(df_ground_truth, df_detections, columns):
+    """
+    Ground truth com as colunas de detecção alinhadas por ID.
+
+    As colunas de df_detections substituem as homônimas do ground truth (sem
+    sufixos _x/_y de merge). IDs sem resultado contam como não detectados.
+    """
+    df = df_ground_truth.copy()
+    aligned = (df_detections.drop_duplicates('ID').set_index('ID').reindex(df['ID'])
+               if df_detections is not None else pd.DataFrame(index=df['ID']))
+    for column in columns:
+        values = aligned[column] if column in aligned.columns else pd.Series(np.nan, index=aligned.index)
+        df[column] = pd.to_numeric(values, errors='coerce').fillna(0).astype(np.int8).to_numpy()
+    return df
+
+
+def slice_keys(df, spec):
+    """Grupo de cada linha para um recorte (None = linha fora do recorte)."""
+    if 'all' in spec:
+        return np.full(len(df), spec['all'], dtype=object)
+    if 'column' in spec:
+        return df[spec['column']].map(normalize_label).to_numpy(dtype=object)
+    if 'path_prefix' in spec:
+        depth = int(spec.get('depth', 1))
+        return df[spec['path_prefix']].map(lambda value: path_prefix(value, depth)).to_numpy(dtype=object)
+    if 'rules' in spec:
+        # Regras em ordem: a primeira que casar define o grupo; uma regra só com "group" casa com tudo
+        keys = np.full(len(df), None, dtype=object)
+        pending = np.ones(len(df), dtype=bool)
+        for rule in spec['rules']:
+            if 'ids' in rule:
+                matches = df['ID'].isin(rule['ids']).to_numpy()
+            elif 'column' in rule:
+                matches = df[rule['column']].isin(rule['values']).to_numpy()
+            else:
+                matches = np.ones(len(df), dtype=bool)
+            selected = pending & matches
+            keys[selected] = rule['group']
+            pending &= ~selected
+        return keys
+    raise ValueError(f"Recorte inválido (use all, column, path_prefix ou rules): {spec}")
+
+
+def slice_metrics(df, tools, slices, y_true_column='Is_Vulnerable'):
+    """
+    Métricas de todas as ferramentas em todos os grupos de todos os recortes.
+
+    Cada recorte vira um código de grupo por linha; os códigos de todos os
+    recortes são concatenados e as contagens (VP, predições positivas,
+    vulneráveis, amostras) de todos os grupos e ferramentas saem de um único
+    np.add.at. As métricas usam metrics_from_counts, como a Tabela 2.
+    Retorna um DataFrame longo com SLICE_COLUMNS.
+    """
+    names = list(tools)
+    y_true = df[y_true_column].astype(np.int64).to_numpy()
+    preds = np.column_stack([df[tools[name]].astype(np.int64).to_numpy() for name in names])
+    # Colunas acumuladas: VP por ferramenta, positivos por ferramenta, vulneráveis, amostras
+    values = np.hstack([preds * y_true[:, None], preds, y_true[:, None], np.ones((len(df), 1), dtype=np.int64)])
+
+    labels, rows, groups = [], [], []
+    for slice_name, spec in slices.items():
+        codes, uniques = pd.factorize(pd.Series(slice_keys(df, spec), dtype=object), sort=True)
+        valid = np.flatnonzero(codes >= 0)
+        rows.append(valid)
+        groups.append(codes[valid] + len(labels))
+        labels.extend((slice_name, group) for group in uniques)
+
+    totals = np.zeros((len(labels), values.shape[1]), dtype=np.int64)
+    rows, groups = np.concatenate(rows), np.concatenate(groups)
+    np.add.at(totals, groups, values[rows])
+
+    t = len(names)
+    tp, predicted = totals[:, :t], totals[:, t:2 * t]
+    actual, size = totals[:, 2 * t:2 * t + 1], totals[:, 2 * t + 1:]
+    fp, fn = predicted - tp, actual - tp
+    counts = np.stack([tp, fp, fn, size - tp - fp - fn], axis=-2)
+    metrics = metrics_from_counts(counts)
+
+    records = []
+    for g, (slice_name, group) in enumerate(labels):
+        for i, name in enumerate(names):
+            record = {
+                'Recorte': slice_name, 'Grupo': group, 'Ferramenta': name,
+                'Amostras': int(size[g, 0]), 'Vulneráveis': int(actual[g, 0]), 'Detectadas': int(predicted[g, i]),
+                'VP': int(counts[g, 0, i]), 'FP': int(counts[g, 1, i]),
+                'FN': int(counts[g, 2, i]), 'VN': int(counts[g, 3, i]),
+            }
+            for column in METRIC_COLUMNS:
+                record[column] = float(metrics[column][g, i])
+            records.append(record)
+    return pd.DataFrame(records, columns=SLICE_COLUMNS)
+
+
+def save_slice_metrics(df_slices, results_dir):
+    """Grava results/metrics_slices.csv e .json; retorna os caminhos."""
+    csv_path = os.path.join(results_dir, 'metrics_slices.csv')
+    json_path = os.path.join(results_dir, 'metrics_slices.json')
+    df_slices.to_csv(csv_path, index=False)
+    df_json = df_slices.copy()
+    df_json[METRIC_COLUMNS] = df_json[METRIC_COLUMNS].round(4)
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(df_json.to_dict(orient='records'), f, indent=4, ensure_ascii=False)
+    return csv_path, json_path
@@ -0,0 +1,333 @@
+# scripts/mock_ollama_server.py
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_MODELS = [
+    os.getenv('DEEPSEEK_VERSION', 'deepseek-coder:1.3b'),
+    os.getenv('CODELLAMA_VERSION', 'codellama:7b'),
+]
+
+VULNERABLE_RESPONSE = json.dumps({
+    "Arquivo": "{filename}",
+    "Trecho Vulnerável": "{line}",
+    "Tipo da Vulnerabilidade": "Injection",
+    "Descrição Breve": "Entrada do usuário usada sem validação"
+}, ensure_ascii=False, indent=2)
+SAFE_RESPONSE = "Código seguro"
+
+# "Arquivo": "x" (prompt original) ou Arquivo: x (prefixo fixo e lotes); vale a última ocorrência
+_FILENAME_RE = re.compile(r'^\s*"?Arquivo"?:\s*"?([^"\n]*?)"?,?\s*$', re.MULTILINE)
+_BATCH_SECTION_RE = re.compile(r'^### ID: (\S+)\n(.*?)^### FIM \1$', re.MULTILINE | re.DOTALL)
+
+
+class MockConfig:
+    """
+    Comportamento do servidor simulado.
+
+    latency: segundos até o primeiro token (mais jitter uniforme).
+    tokens_per_second: velocidade de geração (0 = instantânea).
+    error_rate: fração das gerações que falham com error_status.
+    vulnerable_ratio: fração dos prompts respondidos com uma detecção, decidida
+    pelo hash do prompt (a mesma entrada sempre recebe a mesma resposta).
+    responses: regras [{"contains": texto, "response": resposta}] avaliadas antes.
+    max_loaded_models: modelos que cabem na memória ao mesmo tempo (0 = sem
+    limite); carregar outro descarrega o usado há mais tempo, e cada carga custa
+    load_seconds.
+    prompt_tokens_per_second: velocidade de avaliação do prompt (0 = instantânea).
+    Cada modelo guarda o último prompt avaliado e só os tokens após o prefixo
+    em comum são reavaliados, como o cache KV do Ollama.
+    Prompts de lote (seções "### ID: ...") recebem um objeto JSON por ID.
+    """
+
+    def __init__(self, models=None, latency=0.0, jitter=0.0, tokens_per_second=0.0,
+                 error_rate=0.0, error_status=500, vulnerable_ratio=0.5, responses=None,
+                 load_seconds=0.0, max_loaded_models=0, prompt_tokens_per_second=0.0, seed=None):
+        self.models = list(models or DEFAULT_MODELS)
+        self.latency = latency
+        self.jitter = jitter
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.vulnerable_ratio = vulnerable_ratio
+        self.responses = list(responses or [])
+        self.load_seconds = load_seconds
+        self.max_loaded_models = max_loaded_models
+        self.prompt_tokens_per_second = prompt_tokens_per_second
+        self.random = random.Random(seed)
+
+    def response_for(self, prompt):
+        for rule in self.responses:
+            if rule.get('contains', '') in prompt:
+                return rule['response']
+        sections = _BATCH_SECTION_RE.findall(prompt)
+        if sections:
+            answers = []
+            for snippet_id, section in sections:
+                response = self._snippet_response(section, section.split('\n', 1)[-1])
+                data = {'Resultado': response} if response == SAFE_RESPONSE else json.loads(response)
+                answers.append(dict({'ID': snippet_id}, **data))
+            return json.dumps(answers, ensure_ascii=False, indent=2)
+        return self._snippet_response(prompt, prompt.split('Code:', 1)[-1])
+
+    def _snippet_response(self, text, code):
+        digest = hashlib.sha256(text.encode('utf-8')).digest()
+        if int.from_bytes(digest[:4], 'big') / 2 ** 32 >= self.vulnerable_ratio:
+            return SAFE_RESPONSE
+        filenames = _FILENAME_RE.findall(text)
+        code_lines = [line.strip() for line in code.splitlines() if line.strip()]
+        line = code_lines[digest[4] % len(code_lines)] if code_lines else ''
+        return (VULNERABLE_RESPONSE
+                .replace('{filename}', filenames[-1] if filenames else '')
+                .replace('{line}', json.dumps(line, ensure_ascii=False)[1:-1]))
+
+
+class MockOllamaServer(ThreadingHTTPServer):
+    """Servidor HTTP que imita a API do Ollama (/api/tags, /api/generate, /api/pull, /api/ps)."""
+
+    daemon_threads = True
+
+    def __init__(self, config=None, host='127.0.0.1', port=0):
+        self.config = config or MockConfig()
+        self.stats = {'generate': 0, 'errors': 0, 'streamed': 0, 'loads': 0,
+                      'prompt_tokens': 0, 'cached_prompt_tokens': 0}
+        self.loaded_models = OrderedDict()
+        self.prompt_cache = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        super().__init__((host, port), MockOllamaHandler)
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Atende em uma thread de fundo; retorna a URL para usar como OLLAMA_HOST."""
+        self._thread = threading.Thread(target=self.serve_forever, name='mock-ollama', daemon=True)
+        self._thread.start()
+        return self.url
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def should_fail(self):
+        with self._lock:
+            return self.config.random.random() < self.config.error_rate
+
+    def load_model(self, model):
+        """Simula o carregamento do modelo quando ele não está na memória; retorna os segundos gastos."""
+        with self._lock:
+            if model in self.loaded_models:
+                self.loaded_models.move_to_end(model)
+                return 0.0
+            self.loaded_models[model] = True
+            self.stats['loads'] += 1
+            # Memória limitada: descarrega o modelo usado há mais tempo
+            while 0 < self.config.max_loaded_models < len(self.loaded_models):
+                self.loaded_models.popitem(last=False)
+        time.sleep(self.config.load_seconds)
+        return self.config.load_seconds
+
+    def unload_model(self, model):
+        with self._lock:
+            self.loaded_models.pop(model, None)
+            self.prompt_cache.pop(model, None)
+
+    def evaluate_prompt(self, model, prompt):
+        """Simula a avaliação do prompt reaproveitando o prefixo do anterior; retorna os tokens avaliados."""
+        with self._lock:
+            cached_chars = len(os.path.commonprefix([self.prompt_cache.get(model, ''), prompt]))
+            self.prompt_cache[model] = prompt
+            total_tokens, cached_tokens = len(prompt) // 4, cached_chars // 4
+            self.stats['prompt_tokens'] += total_tokens
+            self.stats['cached_prompt_tokens'] += cached_tokens
+        evaluated = total_tokens - cached_tokens
+        if self.config.prompt_tokens_per_second > 0:
+            time.sleep(evaluated / self.config.prompt_tokens_per_second)
+        return evaluated
+
+
+class MockOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass  # Sem log por requisição
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length) or b'{}')
+
+    def do_GET(self):
+        if self.path == '/api/tags':
+            models = [{
+                'name': model,
+                'model': model,
+                'modified_at': '2024-01-01T00:00:00Z',
+                'size': 1,
+                'digest': hashlib.sha256(model.encode('utf-8')).hexdigest(),
+                'details': {'format': 'gguf', 'family': 'mock'},
+            } for model in self.server.config.models]
+            self._send_json({'models': models})
+        elif self.path == '/api/ps':
+            self._send_json({'models': [{'name': m, 'model': m} for m in sorted(self.server.loaded_models)]})
+        elif self.path in ('/', '/api/version'):
+            self._send_json({'version': 'mock'})
+        else:
+            self._send_json({'error': 'not found'}, status=404)
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_POST(self):
+        request = self._read_json()
+        if self.path == '/api/generate':
+            self._generate(request)
+        elif self.path == '/api/pull':
+            model = request.get('model') or request.get('name')
+            if model not in self.server.config.models:
+                self.server.config.models.append(model)
+            self._send_json({'status': 'success'})
+        elif self.path == '/api/show':
+            self._send_json({'modelfile': '', 'parameters': '', 'template': '', 'details': {}})
+        else:
+            self._send_json({'error': 'not found'}, status=404)
+
+    def _generate(self, request):
+        server = self.server
+        config = server.config
+        model = request.get('model')
+        server.count('generate')
+        if model not in config.models:
+            self._send_json({'error': f"model '{model}' not found"}, status=404)
+            return
+        # Prompt vazio com keep_alive 0 descarrega o modelo (como no Ollama)
+        if not request.get('prompt') and str(request.get('keep_alive')) in ('0', '0s', '0.0'):
+            server.unload_model(model)
+            self._send_json({'model': model, 'response': '', 'done': True, 'done_reason': 'unload'})
+            return
+        if server.should_fail():
+            server.count('errors')
+            self._send_json({'error': 'mock failure'}, status=config.error_status)
+            return
+
+        started = time.perf_counter_ns()
+        load_seconds = server.load_model(model)
+        time.sleep(max(0.0, config.latency + config.random.uniform(-config.jitter, config.jitter)))
+        prompt = request.get('prompt', '')
+        prompt_tokens = server.evaluate_prompt(model, prompt)
+        text = config.response_for(prompt)
+        # Tokens aproximados: palavras e espaços
+        tokens = re.findall(r'\S+|\s+', text) or ['']
+        delay = 1.0 / config.tokens_per_second if config.tokens_per_second > 0 else 0.0
+        first_token_ns = time.perf_counter_ns()
+
+        def final_stats():
+            now = time.perf_counter_ns()
+            return {
+                'model': model,
+                'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+                'done': True,
+                'done_reason': 'stop',
+                'total_duration': now - started,
+                'load_duration': int(load_seconds * 1e9),
+                'prompt_eval_count': prompt_tokens,
+                'prompt_eval_duration': first_token_ns - started - int(load_seconds * 1e9),
+                'eval_count': len(tokens),
+                'eval_duration': max(now - first_token_ns, 1),
+            }
+
+        if request.get('stream', True) is False:
+            time.sleep(delay * len(tokens))
+            self._send_json(dict(final_stats(), response=text))
+            return
+
+        server.count('streamed')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        try:
+            for token in tokens:
+                self._write_chunk({'model': model, 'response': token, 'done': False})
+                if delay:
+                    time.sleep(delay)
+            self._write_chunk(dict(final_stats(), response=''))
+            self.wfile.write(b'0\r\n\r\n')
+        except (BrokenPipeError, ConnectionResetError):
+            # Cliente interrompeu o stream (parada antecipada)
+            self.close_connection = True
+
+    def _write_chunk(self, payload):
+        data = json.dumps(payload, ensure_ascii=False).encode('utf-8') + b'\n'
+        self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b'\r\n')
+        self.wfile.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor Ollama simulado para benchmarks e testes locais")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=11435)
+    parser.add_argument('--models', nargs='+', default=DEFAULT_MODELS, help="Modelos anunciados em /api/tags")
+    parser.add_argument('--latency', type=float, default=0.0, help="Segundos até o primeiro token")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Variação uniforme (±) da latência")
+    parser.add_argument('--tokens-per-second', type=float, default=0.0, help="Velocidade de geração (0 = instantânea)")
+    parser.add_argument('--load-seconds', type=float, default=0.0, help="Custo de carregar um modelo na memória")
+    parser.add_argument('--max-loaded-models', type=int, default=0, help="Modelos carregados ao mesmo tempo (0 = sem limite)")
+    parser.add_argument('--prompt-tokens-per-second', type=float, default=0.0,
+                        help="Velocidade de avaliação do prompt, com cache do prefixo (0 = instantânea)")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fração das gerações que falham")
+    parser.add_argument('--error-status', type=int, default=500, help="Status HTTP das falhas simuladas")
+    parser.add_argument('--vulnerable-ratio', type=float, default=0.5, help="Fração de respostas com detecção")
+    parser.add_argument('--responses', metavar='ARQUIVO', help='JSON com regras [{"contains": ..., "response": ...}]')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    responses = None
+    if args.responses:
+        with open(args.responses, 'r', encoding='utf-8') as f:
+            responses = json.load(f)
+    config = MockConfig(
+        models=args.models, latency=args.latency, jitter=args.jitter,
+        tokens_per_second=args.tokens_per_second, error_rate=args.error_rate,
+        error_status=args.error_status, vulnerable_ratio=args.vulnerable_ratio,
+        responses=responses, load_seconds=args.load_seconds,
+        max_loaded_models=args.max_loaded_models,
+        prompt_tokens_per_second=args.prompt_tokens_per_second, seed=args.seed
+    )
+    server = MockOllamaServer(config, args.host, args.port)
+    print(f"🧪 Ollama simulado em {server.url} (modelos: {', '.join(config.models)})")
+    print(f"   Use: OLLAMA_HOST={server.url} python scripts/run_llm_analysis.py")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 Servidor encerrado.")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
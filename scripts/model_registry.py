@@ -0,0 +1,100 @@
+# scripts/model_registry.py
+
+import threading
+import time
+
+import ollama
+
+READY = 'ready'
+PULLING = 'pulling'
+FAILED = 'failed'
+
+
+class ModelRegistry:
+    """
+    Resolve e prepara cada modelo uma única vez por execução.
+
+    Uma única chamada a list() popula o cache de metadados; modelos ausentes são
+    baixados em threads de fundo enquanto os demais já processam. O laço de
+    inferência consulta o estado local (status/wait_ready), sem ida à rede.
+    """
+
+    def __init__(self, client=ollama, pull_timeout=300):
+        self.client = client
+        self.pull_timeout = pull_timeout
+        self.metadata = {}
+        self._status = {}
+        self._events = {}
+        self._deadlines = {}
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Atualiza o cache de metadados com uma chamada a list()."""
+        response = self.client.list()
+        metadata = {model['model']: model for model in response.get('models', [])}
+        with self._lock:
+            self.metadata = metadata
+        return metadata
+
+    def warm(self, models):
+        """Resolve todos os modelos; os ausentes começam a ser baixados em segundo plano."""
+        try:
+            self.refresh()
+        except Exception as e:
+            print(f"❌ Erro listando modelos: {e}")
+            for model in models:
+                self._set(model, FAILED)
+            return
+
+        for model in models:
+            if model in self.metadata:
+                self._set(model, READY)
+            else:
+                print(f"⚠️ Modelo {model} não encontrado. Baixando em segundo plano...")
+                self._set(model, PULLING)
+                self._deadlines[model] = time.time() + self.pull_timeout
+                threading.Thread(target=self._pull, args=(model,), daemon=True).start()
+
+    def _set(self, model, status):
+        with self._lock:
+            self._status[model] = status
+            event = self._events.setdefault(model, threading.Event())
+        if status != PULLING:
+            event.set()
+
+    def _pull(self, model):
+        try:
+            self.client.pull(model)
+            self.refresh()
+            if model in self.metadata:
+                print(f"✅ Modelo {model} baixado")
+                self._set(model, READY)
+            else:
+                print(f"❌ Modelo {model} não apareceu após o download")
+                self._set(model, FAILED)
+        except Exception as pull_error:
+            print(f"❌ Erro ao baixar modelo {model}: {pull_error}")
+            self._set(model, FAILED)
+
+    def status(self, model):
+        with self._lock:
+            return self._status.get(model)
+
+    def is_ready(self, model):
+        return self.status(model) == READY
+
+    def wait_ready(self, model, timeout=None):
+        """Bloqueia até o modelo ficar pronto (ou falhar); não faz chamadas de rede."""
+        event = self._events.get(model)
+        if event is None:
+            return False
+        if timeout is None:
+            timeout = max(self._deadlines.get(model, time.time()) - time.time(), 0)
+        if not event.wait(timeout) and self.status(model) == PULLING:
+            print(f"❌ Timeout ao baixar modelo {model}")
+            self._set(model, FAILED)
+        return self.is_ready(model)
+
+    def digest(self, model):
+        info = self.metadata.get(model)
+        return info.get('digest') if info is not None else None
@@ -0,0 +1,326 @@
+# scripts/ollama_pool.py
+
+import hashlib
+import os
+import threading
+import time
+
+import ollama
+
+from llm_backoff import CONNECTION, TIMEOUT, classify_error
+
+LEAST_LOADED = 'least-loaded'
+AFFINITY = 'affinity'
+ROUTING_MODES = (LEAST_LOADED, AFFINITY)
+
+DEFAULT_HOST = 'http://localhost:11434'
+
+
+def parse_hosts(value):
+    """Lista de hosts a partir de 'host1,host2' (espaços e vazios ignorados)."""
+    return [host.strip() for host in (value or '').split(',') if host.strip()]
+
+
+def parse_affinity(values):
+    """Converte entradas 'modelo=host1|host2' em {modelo: [hosts]}."""
+    affinity = {}
+    for value in values or []:
+        model, sep, hosts = value.rpartition('=')
+        if not sep or not model:
+            raise ValueError(f"Afinidade inválida (use modelo=host1|host2): {value}")
+        affinity[model] = [host.strip() for host in hosts.split('|') if host.strip()]
+    return affinity
+
+
+class Endpoint:
+    """Um servidor Ollama do pool: cliente, saúde, modelos instalados e carga atual."""
+
+    def __init__(self, host, client=None):
+        self.host = host
+        self.client = client or ollama.Client(host=host)
+        self.healthy = True
+        self.models = {}
+        self.in_flight = 0
+        self.requests = 0
+        self.failures = 0
+        self.last_check = 0.0
+        self.last_error = None
+
+
+class OllamaPool:
+    """
+    Pool de servidores Ollama com a mesma interface usada do módulo ollama
+    (list, pull, generate).
+
+    Roteamento:
+    - least-loaded: o endpoint saudável com o modelo e menos requisições em voo;
+    - affinity: cada modelo tem um endpoint preferido (mapa explícito ou hash
+      de rendezvous), para que fique residente em um nó dedicado; os demais só
+      recebem o modelo se o preferido estiver indisponível.
+
+    A saúde vem de /api/tags (list), consultado periodicamente em segundo plano
+    e logo após uma falha de conexão. Falhas de conexão antes do primeiro token
+    são repetidas imediatamente em outro endpoint (failover). Se nenhum
+    endpoint estiver saudável, todos voltam a ser candidatos: a própria
+    requisição serve de teste, e os retries de quem chamou continuam tentando
+    em vez de falharem de imediato até a próxima verificação.
+    """
+
+    def __init__(self, hosts, routing=LEAST_LOADED, affinity=None, health_interval=30.0, clients=None):
+        if routing not in ROUTING_MODES:
+            raise ValueError(f"Roteamento inválido: {routing} (use {', '.join(ROUTING_MODES)})")
+        hosts = list(dict.fromkeys(hosts)) or [DEFAULT_HOST]
+        clients = clients or {}
+        self.endpoints = [Endpoint(host, clients.get(host)) for host in hosts]
+        self.routing = routing
+        self.affinity = dict(affinity or {})
+        self.health_interval = health_interval
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._health_thread = None
+
+    @classmethod
+    def from_env(cls, routing=None, affinity=None, health_interval=None):
+        """Pool a partir de OLLAMA_HOSTS (vírgulas) ou, na falta dele, de OLLAMA_HOST."""
+        hosts = parse_hosts(os.getenv('OLLAMA_HOSTS')) or parse_hosts(os.getenv('OLLAMA_HOST'))
+        return cls(
+            hosts,
+            routing=routing or os.getenv('OLLAMA_ROUTING', LEAST_LOADED),
+            affinity=affinity if affinity is not None else parse_affinity(
+                [item for item in os.getenv('OLLAMA_AFFINITY', '').split(',') if item.strip()]
+            ),
+            health_interval=health_interval or float(os.getenv('OLLAMA_HEALTH_INTERVAL', '30')),
+        )
+
+    # Saúde
+
+    def check_endpoint(self, endpoint):
+        """Consulta /api/tags de um endpoint e atualiza saúde e modelos."""
+        try:
+            response = endpoint.client.list()
+            models = {model['model']: model for model in response.get('models', [])}
+        except Exception as e:
+            with self._lock:
+                endpoint.healthy = False
+                endpoint.last_error = f"{type(e).__name__}: {e}"
+                endpoint.last_check = time.time()
+            return False
+        with self._lock:
+            endpoint.healthy = True
+            endpoint.models = models
+            endpoint.last_error = None
+            endpoint.last_check = time.time()
+        return True
+
+    def check_health(self):
+        """Verifica todos os endpoints (em paralelo); retorna quantos estão saudáveis."""
+        threads = [threading.Thread(target=self.check_endpoint, args=(endpoint,)) for endpoint in self.endpoints]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return sum(1 for endpoint in self.endpoints if endpoint.healthy)
+
+    def start_health_checks(self):
+        """Verificação periódica em uma thread de fundo (endpoints que caem ou voltam)."""
+        if self._health_thread is not None or self.health_interval <= 0:
+            return
+
+        def loop():
+            while not self._stop.wait(self.health_interval):
+                self.check_health()
+
+        self._health_thread = threading.Thread(target=loop, name='ollama-health', daemon=True)
+        self._health_thread.start()
+
+    def close(self):
+        self._stop.set()
+
+    def healthy_endpoints(self):
+        with self._lock:
+            return [endpoint for endpoint in self.endpoints if endpoint.healthy]
+
+    def _mark_failed(self, endpoint, error):
+        with self._lock:
+            endpoint.healthy = False
+            endpoint.failures += 1
+            endpoint.last_error = f"{type(error).__name__}: {error}"
+        # Reavaliar em segundo plano: o endpoint volta assim que responder a /api/tags
+        threading.Thread(target=self.check_endpoint, args=(endpoint,), daemon=True).start()
+
+    # Roteamento
+
+    def _preferred_hosts(self, model, candidates):
+        if model in self.affinity:
+            return [endpoint for endpoint in candidates if endpoint.host in self.affinity[model]]
+        # Hash de rendezvous: o preferido só muda para os modelos do endpoint que sair
+        best = max(
+            candidates,
+            key=lambda endpoint: hashlib.sha256(f"{model}@{endpoint.host}".encode('utf-8')).digest(),
+        )
+        return [best]
+
+    def dedicated_hosts(self, model):
+        """Hosts dedicados ao modelo no roteamento affinity (None = o modelo usa todos os endpoints)."""
+        if self.routing != AFFINITY or len(self.endpoints) < 2:
+            return None
+        with self._lock:
+            healthy = [endpoint for endpoint in self.endpoints if endpoint.healthy] or list(self.endpoints)
+            with_model = [endpoint for endpoint in healthy if model in endpoint.models] or healthy
+            preferred = self._preferred_hosts(model, with_model)
+        return tuple(sorted(endpoint.host for endpoint in preferred)) or None
+
+    def _candidates(self, model):
+        """Endpoints em ordem de preferência para o modelo (o primeiro recebe a requisição)."""
+        with self._lock:
+            # Sem nenhum saudável (ex.: queda breve do único host), tentar todos mesmo assim
+            healthy = [endpoint for endpoint in self.endpoints if endpoint.healthy] or list(self.endpoints)
+            with_model = [endpoint for endpoint in healthy if model in endpoint.models] or healthy
+            if not with_model:
+                return []
+            by_load = sorted(with_model, key=lambda endpoint: (endpoint.in_flight, endpoint.requests))
+            if self.routing == AFFINITY:
+                preferred = self._preferred_hosts(model, with_model)
+                if preferred:
+                    preferred = sorted(preferred, key=lambda endpoint: (endpoint.in_flight, endpoint.requests))
+                    return preferred + [endpoint for endpoint in by_load if endpoint not in preferred]
+            return by_load
+
+    def _acquire(self, endpoint):
+        with self._lock:
+            endpoint.in_flight += 1
+            endpoint.requests += 1
+
+    def _release(self, endpoint):
+        with self._lock:
+            endpoint.in_flight -= 1
+
+    # Interface compatível com o módulo ollama
+
+    def list(self):
+        """União dos modelos dos endpoints saudáveis, no formato de ollama.list()."""
+        if not any(endpoint.healthy and endpoint.last_check for endpoint in self.endpoints):
+            self.check_health()
+        with self._lock:
+            healthy = [endpoint for endpoint in self.endpoints if endpoint.healthy]
+            errors = [endpoint.last_error for endpoint in self.endpoints if endpoint.last_error]
+            merged = {}
+            for endpoint in healthy:
+                for name, info in endpoint.models.items():
+                    merged.setdefault(name, info)
+        if not healthy:
+            raise ConnectionError(f"Nenhum endpoint Ollama disponível: {'; '.join(errors)}")
+        return {'models': list(merged.values())}
+
+    def pull(self, model, **kwargs):
+        """Baixa o modelo nos endpoints que podem recebê-lo (o preferido, no modo affinity)."""
+        targets = self._candidates(model)
+        if self.routing == AFFINITY and targets:
+            targets = targets[:1] if model not in self.affinity else [
+                endpoint for endpoint in targets if endpoint.host in self.affinity[model]
+            ]
+        if not targets:
+            raise ConnectionError("Nenhum endpoint Ollama disponível para baixar o modelo")
+        response = None
+        for endpoint in targets:
+            response = endpoint.client.pull(model, **kwargs)
+            self.check_endpoint(endpoint)
+        return response
+
+    def generate(self, model, prompt=None, stream=False, **kwargs):
+        """Gera no endpoint escolhido; falhas de conexão passam para o próximo candidato."""
+        candidates = self._candidates(model)
+        if not candidates:
+            raise ConnectionError("Nenhum endpoint Ollama saudável")
+        last_error = None
+        for endpoint in candidates:
+            self._acquire(endpoint)
+            try:
+                if not stream:
+                    try:
+                        return endpoint.client.generate(model=model, prompt=prompt, stream=False, **kwargs)
+                    finally:
+                        self._release(endpoint)
+                iterator = endpoint.client.generate(model=model, prompt=prompt, stream=True, **kwargs)
+                # A conexão só é aberta no primeiro next(): falhas aqui ainda permitem failover
+                first = next(iterator, None)
+            except Exception as e:
+                if stream:
+                    self._release(endpoint)
+                if classify_error(e) not in (CONNECTION, TIMEOUT):
+                    raise
+                print(f"  🔀 {endpoint.host} indisponível ({type(e).__name__}); tentando outro endpoint")
+                self._mark_failed(endpoint, e)
+                last_error = e
+                continue
+            return _PooledStream(self, endpoint, iterator, first)
+        raise last_error
+
+    def loaded_models(self):
+        """Modelos carregados na memória de algum endpoint saudável (/api/ps)."""
+        loaded = set()
+        for endpoint in self.endpoints:
+            if not endpoint.healthy:
+                continue
+            try:
+                loaded.update(model['model'] for model in endpoint.client.ps().get('models', []))
+            except Exception:
+                continue
+        return loaded
+
+    def unload(self, model, hosts=None):
+        """Descarrega o modelo dos endpoints saudáveis (ou só de hosts) com prompt vazio e keep_alive=0."""
+        unloaded = 0
+        for endpoint in self.endpoints:
+            if not endpoint.healthy or (hosts is not None and endpoint.host not in hosts):
+                continue
+            try:
+                endpoint.client.generate(model=model, prompt='', keep_alive=0)
+                unloaded += 1
+            except Exception as e:
+                print(f"  ⚠️ Não foi possível descarregar {model} de {endpoint.host}: {e}")
+        return unloaded
+
+    def report(self):
+        """Estado por endpoint: saúde, requisições, falhas e modelos."""
+        with self._lock:
+            return [{
+                'host': endpoint.host,
+                'healthy': endpoint.healthy,
+                'requests': endpoint.requests,
+                'failures': endpoint.failures,
+                'in_flight': endpoint.in_flight,
+                'models': sorted(endpoint.models),
+            } for endpoint in self.endpoints]
+
+
+class _PooledStream:
+    """Iterador de streaming que devolve a vaga do endpoint ao terminar ou ao ser fechado."""
+
+    def __init__(self, pool, endpoint, iterator, first):
+        self._pool = pool
+        self._endpoint = endpoint
+        self._iterator = iterator
+        self._pending = [first] if first is not None else []
+        self._released = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._pending:
+            return self._pending.pop()
+        try:
+            return next(self._iterator)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        if self._released:
+            return
+        self._released = True
+        close = getattr(self._iterator, 'close', None)
+        if close is not None:
+            close()
+        self._pool._release(self._endpoint)
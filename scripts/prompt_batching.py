@@ -0,0 +1,164 @@
+# scripts/prompt_batching.py
+
+import json
+import re
+
+from response_classifier import DEFAULT_CLASSIFIER, SAFE_RESPONSES
+
+ORIGINAL_LAYOUT = 'original'
+PREFIX_LAYOUT = 'prefix'
+PROMPT_LAYOUTS = (ORIGINAL_LAYOUT, PREFIX_LAYOUT)
+
+# Mesmo pedido do PROMPT_TEMPLATE, mas com todo o texto fixo antes da parte
+# variável (arquivo e código): requisições seguidas ao mesmo modelo
+# compartilham o prefixo e o Ollama reaproveita o cache KV desses tokens.
+PREFIX_PROMPT_TEMPLATE = """
+Analise os riscos de segurança no código abaixo, seguindo o OWASP Top 10.
+Retorne APENAS se houver vulnerabilidades, no formato JSON abaixo.
+Caso contrário, retorne "Código seguro".
+
+{{
+  "Arquivo": "Nome do arquivo analisado",
+  "Trecho Vulnerável": "O snippet específico",
+  "Tipo da Vulnerabilidade": "A categoria da vulnerabilidade",
+  "Descrição Breve": "Explicação concisa"
+}}
+
+Arquivo: {filename}
+Code:
+{code}
+"""
+
+# Vários snippets em um único prompt, delimitados por ID; uma resposta JSON por ID
+BATCH_PROMPT_TEMPLATE = """
+Analise os riscos de segurança de cada arquivo abaixo, seguindo o OWASP Top 10.
+Cada arquivo começa com a linha "### ID: <id>" e termina com "### FIM <id>".
+Responda com um objeto JSON por arquivo, na mesma ordem, sempre com o campo "ID".
+
+Arquivo com vulnerabilidades:
+{{
+  "ID": "<id>",
+  "Arquivo": "Nome do arquivo analisado",
+  "Trecho Vulnerável": "O snippet específico",
+  "Tipo da Vulnerabilidade": "A categoria da vulnerabilidade",
+  "Descrição Breve": "Explicação concisa"
+}}
+
+Arquivo sem vulnerabilidades:
+{{
+  "ID": "<id>",
+  "Resultado": "Código seguro"
+}}
+
+Arquivos:
+{files}
+"""
+
+BATCH_ID_KEYS = ('id', 'snippet', 'snippet_id')
+_SECTION_RE = re.compile(r'^#{2,}\s*ID:\s*(\S+)\s*$', re.MULTILINE)
+_JSON_START_RE = re.compile(r'[\[{]')
+
+
+def build_batch_prompt(items):
+    """Prompt com vários snippets; items é uma sequência de (ID, arquivo, código)."""
+    sections = [
+        f"### ID: {snippet_id}\nArquivo: {filename}\n{code.rstrip()}\n### FIM {snippet_id}"
+        for snippet_id, filename, code in items
+    ]
+    return BATCH_PROMPT_TEMPLATE.format(files='\n\n'.join(sections))
+
+
+def plan_batches(items, batch_size, max_chars):
+    """
+    Agrupa itens (ID, tamanho do código, ...) em lotes consecutivos.
+
+    Cada lote tem até batch_size itens e até max_chars caracteres de código.
+    Itens maiores que max_chars ficam sozinhos (seguem pelo caminho normal,
+    com divisão em trechos).
+    """
+    batches, current, current_chars = [], [], 0
+    for item in items:
+        size = item[1]
+        if current and (len(current) >= batch_size or current_chars + size > max_chars):
+            batches.append(current)
+            current, current_chars = [], 0
+        current.append(item)
+        current_chars += size
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _iter_json_values(text):
+    """Objetos JSON do texto, em ordem; listas são expandidas."""
+    decoder = json.JSONDecoder()
+    match = _JSON_START_RE.search(text)
+    while match is not None:
+        try:
+            data, end = decoder.raw_decode(text, match.start())
+        except json.JSONDecodeError:
+            match = _JSON_START_RE.search(text, match.start() + 1)
+            continue
+        for value in (data if isinstance(data, list) else [data]):
+            if isinstance(value, dict):
+                yield value
+        match = _JSON_START_RE.search(text, end)
+
+
+def _object_id(data):
+    for key, value in data.items():
+        if str(key).lower() in BATCH_ID_KEYS:
+            return str(value).strip()
+    return None
+
+
+def _answer_text(data):
+    """Resposta individual no formato das respostas de um snippet só."""
+    answer = {key: value for key, value in data.items() if str(key).lower() not in BATCH_ID_KEYS}
+    if any(str(key).lower() in DEFAULT_CLASSIFIER.type_keys for key in answer):
+        return json.dumps(answer, ensure_ascii=False, indent=2)
+    values = [str(value).strip().lower() for value in answer.values()]
+    if not answer or any(value in SAFE_RESPONSES for value in values):
+        return "Código seguro"
+    return json.dumps(answer, ensure_ascii=False, indent=2)
+
+
+def split_batch_response(response, ids):
+    """
+    Separa a resposta de um lote por ID: {ID: resposta ou None}.
+
+    Aceita objetos JSON com o campo "ID" (soltos ou em uma lista), um objeto
+    indexado pelos IDs ou seções "### ID: <id>" repetidas pelo modelo. As
+    respostas ficam no formato de um snippet isolado ("Código seguro" ou o JSON
+    da vulnerabilidade), para o mesmo classificador. IDs sem resposta
+    reconhecível ficam com None e devem ser reanalisados individualmente.
+    """
+    answers = dict.fromkeys(ids)
+    if not isinstance(response, str) or response.strip().lower().startswith('error'):
+        return answers
+    lookup = {str(snippet_id).lower(): snippet_id for snippet_id in ids}
+
+    for data in _iter_json_values(response):
+        snippet_id = lookup.get((_object_id(data) or '').lower())
+        if snippet_id is not None:
+            if answers[snippet_id] is None:
+                answers[snippet_id] = _answer_text(data)
+            continue
+        # Objeto indexado pelos IDs: {"VULN-01": {...}, "VULN-02": "Código seguro"}
+        for key, value in data.items():
+            snippet_id = lookup.get(str(key).strip().lower())
+            if snippet_id is None or answers[snippet_id] is not None:
+                continue
+            answers[snippet_id] = _answer_text(value) if isinstance(value, dict) else str(value).strip()
+
+    # Seções de texto livre, quando o modelo repete os delimitadores do prompt
+    headers = list(_SECTION_RE.finditer(response))
+    for header, following in zip(headers, headers[1:] + [None]):
+        snippet_id = lookup.get(header.group(1).lower())
+        if snippet_id is None or answers[snippet_id] is not None:
+            continue
+        body = response[header.end():following.start() if following else len(response)]
+        body = re.sub(r'^#{2,}\s*FIM\b.*$', '', body, flags=re.MULTILINE).strip()
+        if body:
+            answers[snippet_id] = body
+    return answers
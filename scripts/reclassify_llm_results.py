@@ -0,0 +1,147 @@
+# scripts/reclassify_llm_results.py
+
+import argparse
+import importlib
+import os
+
+import numpy as np
+import pandas as pd
+
+from response_classifier import DEFAULT_CLASSIFIER
+from results_store import DEFAULT_STORE_DIR, ResultsStore
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Coluna de resposta bruta de cada LLM e a coluna de detecção derivada dela
+RAW_TO_DETECTED = {
+    'DeepSeek_Raw_Result': 'Detected_Deepseek',
+    'CodeLlama_Raw_Result': 'Detected_CodeLlama',
+}
+
+
+def load_parser(spec):
+    """
+    Carrega um parser no formato 'modulo:atributo'.
+
+    O atributo pode ser um objeto com classify_many (como ResponseClassifier) ou
+    uma função resposta -> 0/1 (como parse_llm_response_to_detection).
+    """
+    if spec is None:
+        return DEFAULT_CLASSIFIER
+    module_name, sep, attribute = spec.partition(':')
+    if not sep or not attribute:
+        raise ValueError(f"Parser inválido (use modulo:atributo): {spec}")
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+def classify_column(raw_values, parser):
+    """
+    Classifica uma coluna de respostas brutas em lote.
+
+    Os valores são fatorados primeiro: cada resposta distinta é classificada uma
+    única vez e o resultado é espalhado para as linhas por indexação NumPy.
+    Valores ausentes contam como não detectados.
+    """
+    codes, uniques = pd.factorize(pd.Series(raw_values), use_na_sentinel=True)
+    uniques = list(uniques)
+    if hasattr(parser, 'classify_many'):
+        unique_verdicts = np.asarray(parser.classify_many(uniques), dtype=np.int8)
+    else:
+        unique_verdicts = np.fromiter((parser(value) for value in uniques), dtype=np.int8, count=len(uniques))
+    # Sentinela -1 (NaN) aponta para a posição extra com veredito 0
+    return np.append(unique_verdicts, np.int8(0))[codes]
+
+
+def reclassify(df, parser):
+    """Reescreve as colunas Detected_* a partir das *_Raw_Result; retorna as mudanças por coluna."""
+    changes = {}
+    for raw_col, detected_col in RAW_TO_DETECTED.items():
+        if raw_col not in df.columns:
+            continue
+        verdicts = classify_column(df[raw_col].to_numpy(dtype=object), parser)
+        if detected_col in df.columns:
+            previous = pd.to_numeric(df[detected_col], errors='coerce').fillna(0).to_numpy(dtype=np.int8)
+            changes[detected_col] = int(np.count_nonzero(previous != verdicts))
+        else:
+            changes[detected_col] = int(np.count_nonzero(verdicts))
+        df[detected_col] = verdicts
+    return changes
+
+
+def reclassify_store(store, run_id, parser, dry_run=False):
+    """Reclassifica as partições de uma execução do histórico colunar; retorna {modelo: (detecções, mudanças)}."""
+    summary = {}
+    for partition in store.partitions(run_id):
+        verdicts = classify_column(np.asarray(partition.raw_values(), dtype=object), parser)
+        changed = int(np.count_nonzero(np.asarray(partition.detected) != verdicts))
+        if not dry_run:
+            partition.update_detected(verdicts)
+        summary[partition.model] = (int(verdicts.sum()), len(partition), changed)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Reclassifica as respostas brutas dos LLMs sem chamar o Ollama"
+    )
+    parser.add_argument(
+        '--input', default=os.path.join(PROJECT_ROOT, 'results', 'llm_detections_results.csv'),
+        help="CSV gerado por run_llm_analysis.py (reescrito no lugar)"
+    )
+    parser.add_argument(
+        '--parser', default=None, metavar='MODULO:ATRIBUTO',
+        help="Parser alternativo (padrão: response_classifier:DEFAULT_CLASSIFIER)"
+    )
+    parser.add_argument(
+        '--run', default=None, metavar='ID',
+        help="Reclassificar uma execução do histórico colunar (results/store) em vez do CSV ('latest' = a mais recente)"
+    )
+    parser.add_argument(
+        '--store', default=DEFAULT_STORE_DIR,
+        help="Pasta do histórico colunar usado com --run"
+    )
+    parser.add_argument(
+        '--dry-run', action='store_true',
+        help="Apenas mostrar quantas detecções mudariam, sem gravar"
+    )
+    args = parser.parse_args()
+
+    if args.run:
+        store = ResultsStore(args.store)
+        run_id = store.latest_run() if args.run == 'latest' else args.run
+        summary = reclassify_store(store, run_id, load_parser(args.parser), dry_run=args.dry_run)
+        if not summary:
+            print(f"⚠️ Nenhuma partição da execução {run_id} em {args.store}.")
+            return
+        print(f"🔁 Reclassificação da execução {run_id}:")
+        for model, (detections, rows, changed) in summary.items():
+            print(f"  {model}: {detections}/{rows} detecções ({changed} alterada(s))")
+        print("ℹ️ --dry-run: nenhum arquivo foi alterado." if args.dry_run else f"💾 Detecções atualizadas em: {args.store}")
+        return
+
+    if not os.path.exists(args.input):
+        raise FileNotFoundError(f"Arquivo de resultados LLM não encontrado: {args.input}")
+
+    df = pd.read_csv(args.input)
+    changes = reclassify(df, load_parser(args.parser))
+    if not changes:
+        print("⚠️ Nenhuma coluna *_Raw_Result encontrada para reclassificar.")
+        return
+
+    print("🔁 Reclassificação concluída:")
+    for detected_col, changed in changes.items():
+        print(f"  {detected_col}: {int(df[detected_col].sum())}/{len(df)} detecções ({changed} alterada(s))")
+
+    if args.dry_run:
+        print("ℹ️ --dry-run: nenhum arquivo foi alterado.")
+        return
+
+    # Gravação atômica para não corromper o CSV em caso de interrupção
+    tmp_path = f"{args.input}.tmp"
+    df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, args.input)
+    print(f"💾 Resultados atualizados em: {args.input}")
+
+
+if __name__ == "__main__":
+    main()
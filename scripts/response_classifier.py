@@ -0,0 +1,219 @@
+# scripts/response_classifier.py
+
+import json
+import os
+import re
+
+import numpy as np
+
+# Chaves JSON que caracterizam uma detecção e respostas que indicam código seguro
+VULNERABILITY_TYPE_KEYS = ["tipo da vulnerabilidade", "vulnerability type", "tipo"]
+SAFE_RESPONSES = ["código seguro", "codigo seguro", "safe code", "no vulnerabilities"]
+
+VULNERABILITY_KEYWORDS = [
+    "vulnerável", "vulnerability", "injection", "xss", "csrf",
+    "access control", "insecure", "falha de segurança", "risco",
+    "sql", "nosql", "sensitive data", "broken", "cwe-"
+]
+
+NEGATIVE_PHRASES = [
+    "não contém vulnerabilidades", "no vulnerabilities", "not vulnerable",
+    "está seguro", "no security risks", "secure code", "sem riscos"
+]
+
+# Início provável de um objeto JSON com chaves
+_OBJECT_START_RE = re.compile(r'\{\s*"')
+
+# Objetos JSON extras tentados quando o trecho guloso não é JSON válido (0 = só o trecho guloso,
+# como o parser original). Valores > 0 mudam vereditos: ver JSON_FALLBACK_CLASSIFIER
+JSON_CANDIDATES = int(os.getenv('LLM_JSON_CANDIDATES', '0'))
+
+
+class ResponseClassifier:
+    """
+    Classificador de respostas de LLM (1 = vulnerabilidade detectada, 0 = não).
+
+    As listas de palavras-chave e frases negativas são preparadas uma única vez
+    (tuplas imutáveis de busca por substring, que no CPython superam uma regex
+    com alternância) e a busca de frases negativas só ocorre quando há alguma
+    palavra-chave. Objetos JSON são localizados sem regex: o trecho entre o
+    primeiro "{" e o último "}" (mesma regra da busca gulosa original).
+
+    Com max_json_candidates > 0, se esse trecho não for JSON válido, até
+    max_json_candidates objetos são decodificados incrementalmente com
+    JSONDecoder.raw_decode. Isso muda vereditos em relação ao parser original
+    (ex.: JSON seguido de código com chaves passa de 0 a 1), por isso é opt-in.
+    """
+
+    def __init__(self, vulnerability_keywords=VULNERABILITY_KEYWORDS, negative_phrases=NEGATIVE_PHRASES,
+                 safe_responses=SAFE_RESPONSES, type_keys=VULNERABILITY_TYPE_KEYS, max_json_candidates=JSON_CANDIDATES):
+        self.vulnerability_keywords = tuple(dict.fromkeys(vulnerability_keywords))
+        self.negative_phrases = tuple(dict.fromkeys(negative_phrases))
+        self.safe_responses = frozenset(safe_responses)
+        self.type_keys = frozenset(type_keys)
+        self.max_json_candidates = max_json_candidates
+        self._decoder = json.JSONDecoder()
+
+    def _is_detection(self, data):
+        return isinstance(data, dict) and any(str(key).lower() in self.type_keys for key in data.keys())
+
+    def find_json_objects(self, text):
+        """Itera sobre os objetos JSON encontrados no texto, com número limitado de tentativas."""
+        start, end = text.find('{'), text.rfind('}')
+        if start == -1 or end < start:
+            return
+        try:
+            yield json.loads(text[start:end + 1])
+            return
+        except json.JSONDecodeError:
+            pass
+
+        # Só posições com cara de objeto JSON ('{' seguido de '"') são decodificadas
+        attempts = 0
+        match = _OBJECT_START_RE.search(text, start, end)
+        while match is not None and attempts < self.max_json_candidates:
+            attempts += 1
+            try:
+                data, consumed = self._decoder.raw_decode(text, match.start())
+            except json.JSONDecodeError:
+                match = _OBJECT_START_RE.search(text, match.start() + 1, end)
+                continue
+            yield data
+            match = _OBJECT_START_RE.search(text, consumed, end)
+
+    def classify(self, response, verbose=False):
+        """Classifica uma resposta; com verbose=True, avisa sobre respostas de erro."""
+        if not isinstance(response, str) or response.strip() == "":
+            return 0
+
+        response_lower = response.strip().lower()
+
+        # 1. Código explicitamente seguro
+        if response_lower in self.safe_responses:
+            return 0
+
+        # 2. Verificar se começa com ERROR
+        if response_lower.startswith("error"):
+            if verbose:
+                print(f"⚠️ Resposta com erro: {response[:100]}...")
+            return 0
+
+        # 3. Objetos JSON com o tipo da vulnerabilidade
+        if any(self._is_detection(data) for data in self.find_json_objects(response)):
+            return 1
+
+        # 4. Palavras-chave, salvo se houver uma frase negativa
+        if any(keyword in response_lower for keyword in self.vulnerability_keywords) \
+                and not any(phrase in response_lower for phrase in self.negative_phrases):
+            return 1
+
+        return 0
+
+    def classify_many(self, responses):
+        """
+        Classifica uma sequência de respostas (ex.: uma coluna *_Raw_Result inteira).
+
+        Respostas idênticas são classificadas uma única vez. Valores ausentes
+        (NaN/None) contam como não detectados. Retorna um array NumPy de int8.
+        """
+        memo = {}
+        verdicts = np.zeros(len(responses), dtype=np.int8)
+        for i, response in enumerate(responses):
+            if not isinstance(response, str):
+                continue
+            verdict = memo.get(response)
+            if verdict is None:
+                verdict = memo[response] = self.classify(response)
+            verdicts[i] = verdict
+        return verdicts
+
+
+DEFAULT_CLASSIFIER = ResponseClassifier()
+# Com busca de objetos JSON além do trecho guloso (ex.: --parser response_classifier:JSON_FALLBACK_CLASSIFIER)
+JSON_FALLBACK_CLASSIFIER = ResponseClassifier(max_json_candidates=8)
+
+
+class IncrementalDetectionParser:
+    """
+    Versão incremental do ResponseClassifier para respostas em streaming.
+
+    Recebe os tokens à medida que chegam. Com um classificador que busca
+    objetos JSON além do trecho guloso (max_json_candidates > 0), o veredito 1
+    é decidido assim que o primeiro objeto JSON fecha contendo o tipo da
+    vulnerabilidade: o texto que vier depois não muda o veredito completo. Com
+    a busca gulosa (padrão), um "}" posterior ainda pode invalidar o trecho, então
+    não há decisão antecipada. "Código seguro" também não encerra o streaming:
+    palavras-chave depois da frase ainda levam o classificador a 1. Sem decisão
+    antecipada, o veredito sai de finalize(), com a resposta inteira.
+    """
+
+    def __init__(self, classifier=None):
+        self.classifier = classifier or DEFAULT_CLASSIFIER
+        self.text = ''
+        self.verdict = None
+        self.decided_at = None
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._obj_start = None
+        self._json_done = False
+
+    @property
+    def decided_text(self):
+        return self.text if self.decided_at is None else self.text[:self.decided_at]
+
+    def feed(self, chunk):
+        """Acrescenta um trecho da resposta; retorna o veredito (0/1) ou None se indefinido."""
+        self.text += chunk
+        if self.verdict is None and self.classifier.max_json_candidates > 0:
+            self._scan_json()
+        return self.verdict
+
+    def _decide(self, verdict, position):
+        self.verdict = verdict
+        self.decided_at = position
+
+    def _scan_json(self):
+        # Apenas o primeiro objeto JSON é considerado, como na busca gulosa do parser completo
+        if self._json_done or self.text.lstrip().lower().startswith('error'):
+            self._pos = len(self.text)
+            return
+        text = self.text
+        for i in range(self._pos, len(text)):
+            char = text[i]
+            if self._depth == 0:
+                if char == '{':
+                    self._obj_start = i
+                    self._depth = 1
+                continue
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == '{':
+                self._depth += 1
+            elif char == '}':
+                self._depth -= 1
+                if self._depth == 0:
+                    self._json_done = True
+                    self._pos = i + 1
+                    try:
+                        data = json.loads(text[self._obj_start:i + 1])
+                    except json.JSONDecodeError:
+                        return
+                    if self.classifier._is_detection(data):
+                        self._decide(1, i + 1)
+                    return
+        self._pos = len(text)
+
+    def finalize(self):
+        """Veredito final: o decidido durante o streaming ou o do parser completo."""
+        if self.verdict is not None:
+            return self.verdict
+        return self.classifier.classify(self.text)
@@ -0,0 +1,266 @@
+# scripts/results_store.py
+
+import argparse
+import json
+import os
+import re
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_STORE_DIR = os.path.join(PROJECT_ROOT, 'results', 'store')
+
+# Colunas do CSV de resultados por modelo: (rótulo, detecção, resposta bruta, tempo)
+DEFAULT_MODEL_COLUMNS = {
+    os.getenv('DEEPSEEK_VERSION', 'deepseek-coder:1.3b'):
+        ('DeepSeek', 'Detected_Deepseek', 'DeepSeek_Raw_Result', 'DeepSeek_Time'),
+    os.getenv('CODELLAMA_VERSION', 'codellama:7b'):
+        ('CodeLlama', 'Detected_CodeLlama', 'CodeLlama_Raw_Result', 'CodeLlama_Time'),
+}
+
+# Arquivos de uma partição (run, modelo)
+META_FILE = 'meta.json'
+IDS_FILE = 'ids.npy'
+DETECTED_FILE = 'detected.npy'
+TIME_FILE = 'time.npy'
+RAW_DATA_FILE = 'raw.bin'
+RAW_OFFSETS_FILE = 'raw_offsets.npy'
+
+FIELDS = ('detected', 'time', 'raw')
+
+
+def _partition_name(prefix, value):
+    return f"{prefix}={re.sub(r'[^A-Za-z0-9._-]+', '_', str(value))}"
+
+
+def _save_npy(path, array):
+    """Grava um .npy de forma atômica (arquivo temporário + os.replace)."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        np.save(f, array)
+    os.replace(tmp_path, path)
+
+
+class ResultPartition:
+    """
+    Resultados de um modelo em uma execução, em colunas separadas.
+
+    ids/detected/time são .npy abertos com memmap (somente leitura, sem cópia);
+    as respostas brutas ficam concatenadas em raw.bin (UTF-8) com os limites de
+    cada linha em raw_offsets.npy, e só são decodificadas quando pedidas.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, META_FILE), 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        self.run = self.meta['run']
+        self.model = self.meta['model']
+        self.columns = self.meta['columns']
+
+    def __len__(self):
+        return self.meta['rows']
+
+    def _load(self, name):
+        return np.load(os.path.join(self.path, name), mmap_mode='r')
+
+    @property
+    def ids(self):
+        return self._load(IDS_FILE)
+
+    @property
+    def detected(self):
+        return self._load(DETECTED_FILE)
+
+    @property
+    def time(self):
+        return self._load(TIME_FILE)
+
+    def raw(self, index):
+        """Resposta bruta de uma linha, lendo apenas os bytes dela."""
+        offsets = self._load(RAW_OFFSETS_FILE)
+        start, end = int(offsets[index]), int(offsets[index + 1])
+        if start == end:
+            return ''
+        data = np.memmap(os.path.join(self.path, RAW_DATA_FILE), dtype=np.uint8, mode='r')
+        return bytes(data[start:end]).decode('utf-8')
+
+    def raw_values(self):
+        """Todas as respostas brutas (lista de str), na ordem das linhas."""
+        offsets = self._load(RAW_OFFSETS_FILE)
+        with open(os.path.join(self.path, RAW_DATA_FILE), 'rb') as f:
+            data = f.read()
+        return [data[start:end].decode('utf-8') for start, end in zip(offsets[:-1], offsets[1:])]
+
+    def field(self, name):
+        if name == 'detected':
+            return self.detected
+        if name == 'time':
+            return self.time
+        if name == 'raw':
+            return self.raw_values()
+        raise ValueError(f"Campo inválido: {name} (use {', '.join(FIELDS)})")
+
+    def update_detected(self, verdicts):
+        """Regrava a coluna de detecções (ex.: após reclassificar as respostas brutas)."""
+        verdicts = np.asarray(verdicts, dtype=np.int8)
+        if len(verdicts) != len(self):
+            raise ValueError(f"Esperadas {len(self)} detecções, recebidas {len(verdicts)}")
+        _save_npy(os.path.join(self.path, DETECTED_FILE), verdicts)
+
+
+class ResultsStore:
+    """
+    Histórico de resultados dos LLMs particionado por execução e modelo:
+    <raiz>/run=<id>/model=<modelo>/.
+
+    Cada partição guarda as detecções (int8) e os tempos (float32) em colunas
+    compactas, separadas das respostas brutas. Quem só precisa das detecções
+    (métricas, recall contextual) não lê o texto das respostas.
+    """
+
+    def __init__(self, root=DEFAULT_STORE_DIR):
+        self.root = root
+
+    def write(self, run_id, model, ids, detected, times, raw, columns=None, label=None):
+        """Grava (ou substitui) a partição (run_id, model); retorna o ResultPartition."""
+        ids = np.asarray([str(value) for value in ids], dtype=str)
+        raw_bytes = [('' if not isinstance(value, str) else value).encode('utf-8') for value in raw]
+        offsets = np.zeros(len(raw_bytes) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in raw_bytes], out=offsets[1:])
+
+        run_dir = os.path.join(self.root, _partition_name('run', run_id))
+        path = os.path.join(run_dir, _partition_name('model', model))
+        tmp_path = f"{path}.tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        np.save(os.path.join(tmp_path, IDS_FILE), ids)
+        np.save(os.path.join(tmp_path, DETECTED_FILE), np.asarray(detected, dtype=np.int8))
+        np.save(os.path.join(tmp_path, TIME_FILE), np.asarray(times, dtype=np.float32))
+        np.save(os.path.join(tmp_path, RAW_OFFSETS_FILE), offsets)
+        with open(os.path.join(tmp_path, RAW_DATA_FILE), 'wb') as f:
+            f.write(b''.join(raw_bytes))
+        with open(os.path.join(tmp_path, META_FILE), 'w', encoding='utf-8') as f:
+            json.dump({
+                'run': str(run_id),
+                'model': model,
+                'label': label or model,
+                'columns': columns or {'detected': 'Detected', 'raw': 'Raw_Result', 'time': 'Time'},
+                'rows': len(ids),
+                'created': time.time(),
+            }, f, indent=4, ensure_ascii=False)
+
+        # Troca atômica da partição: a antiga só é removida depois
+        old_path = f"{path}.old"
+        if os.path.exists(path):
+            os.replace(path, old_path)
+        os.replace(tmp_path, path)
+        shutil.rmtree(old_path, ignore_errors=True)
+        return ResultPartition(path)
+
+    def write_frame(self, run_id, df, model_columns=None):
+        """Grava uma partição por modelo a partir de um DataFrame no formato do CSV de resultados."""
+        written = []
+        for model, (label, detected_col, raw_col, time_col) in (model_columns or DEFAULT_MODEL_COLUMNS).items():
+            if detected_col not in df.columns:
+                continue
+            detected = pd.to_numeric(df[detected_col], errors='coerce').fillna(0).to_numpy(dtype=np.int8)
+            times = (pd.to_numeric(df[time_col], errors='coerce').fillna(0).to_numpy(dtype=np.float32)
+                     if time_col in df.columns else np.zeros(len(df), dtype=np.float32))
+            raw = df[raw_col].tolist() if raw_col in df.columns else [''] * len(df)
+            written.append(self.write(
+                run_id, model, df['ID'], detected, times, raw, label=label,
+                columns={'detected': detected_col, 'raw': raw_col, 'time': time_col}
+            ))
+        return written
+
+    def partitions(self, run_id=None, models=None):
+        """Partições de uma execução (padrão: todas), na ordem de gravação."""
+        if not os.path.isdir(self.root):
+            return []
+        found = []
+        for run_name in sorted(os.listdir(self.root)):
+            run_dir = os.path.join(self.root, run_name)
+            if not run_name.startswith('run=') or not os.path.isdir(run_dir):
+                continue
+            for model_name in sorted(os.listdir(run_dir)):
+                path = os.path.join(run_dir, model_name)
+                if model_name.startswith('model=') and os.path.exists(os.path.join(path, META_FILE)):
+                    found.append(ResultPartition(path))
+        found = [p for p in found if (run_id is None or p.run == str(run_id)) and (models is None or p.model in models)]
+        return sorted(found, key=lambda p: p.meta['created'])
+
+    def runs(self):
+        """IDs das execuções, da mais antiga à mais recente."""
+        return list(dict.fromkeys(p.run for p in self.partitions()))
+
+    def latest_run(self):
+        runs = self.runs()
+        return runs[-1] if runs else None
+
+    def frame(self, run_id=None, fields=('detected',), models=None):
+        """
+        DataFrame no formato do CSV de resultados (ID + colunas dos campos pedidos).
+
+        Carrega apenas os campos pedidos. Sem run_id, usa a execução mais recente.
+        """
+        run_id = run_id or self.latest_run()
+        partitions = self.partitions(run_id, models)
+        if not partitions:
+            raise FileNotFoundError(f"Nenhum resultado da execução {run_id} em {self.root}")
+        df = None
+        for partition in partitions:
+            columns = {'ID': partition.ids}
+            for name in fields:
+                columns[partition.columns[name]] = partition.field(name)
+            part_df = pd.DataFrame(columns)
+            df = part_df if df is None else df.merge(part_df, on='ID', how='outer')
+        return df
+
+    def history(self):
+        """Resumo de todas as execuções por modelo (só as colunas compactas são lidas)."""
+        rows = []
+        for partition in self.partitions():
+            detected, times = partition.detected, partition.time
+            rows.append({
+                'run': partition.run,
+                'model': partition.model,
+                'rows': len(partition),
+                'detections': int(detected.sum()),
+                'avg_time': float(times.mean()) if len(times) else 0.0,
+                'raw_mb': os.path.getsize(os.path.join(partition.path, RAW_DATA_FILE)) / 1e6,
+            })
+        return pd.DataFrame(rows, columns=['run', 'model', 'rows', 'detections', 'avg_time', 'raw_mb'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Histórico colunar dos resultados dos LLMs")
+    parser.add_argument('--store', default=DEFAULT_STORE_DIR, help="Pasta do histórico")
+    parser.add_argument(
+        '--import-csv', metavar='CSV',
+        help="Importar um CSV de resultados (ex.: results/llm_detections_results.csv) como uma execução"
+    )
+    parser.add_argument('--run', default=None, help="ID da execução importada (padrão: data e hora atuais)")
+    args = parser.parse_args()
+
+    store = ResultsStore(args.store)
+    if args.import_csv:
+        run_id = args.run or time.strftime('%Y%m%dT%H%M%S')
+        written = store.write_frame(run_id, pd.read_csv(args.import_csv))
+        print(f"💾 {len(written)} partição(ões) importada(s) como execução {run_id}")
+
+    history = store.history()
+    if history.empty:
+        print(f"⚠️ Nenhuma execução em {args.store}")
+        return
+    print(f"🗂️ Execuções em {args.store}:")
+    for row in history.itertuples(index=False):
+        print(f"  {row.run} | {row.model}: {row.detections}/{row.rows} detecções "
+              f"| tempo médio {row.avg_time:.1f}s | respostas {row.raw_mb:.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
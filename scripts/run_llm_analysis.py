@@ -1,15 +1,33 @@
 # scripts/run_llm_analysis.py
 
-import ollama
 import pandas as pd
 import os
 import time
 import json
-import traceback
-import re
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from dotenv import load_dotenv
 from collections import defaultdict
 
+from code_chunker import chunk_code
+from execution_planner import EXECUTION_ORDERS, ExecutionPlanner
+
+from llm_backoff import (CONTEXT, MODEL_MISSING, PRESSURE, RETRYABLE, BackoffPolicy, BackpressureController,
+                         classify_error)
+from llm_cache import ResponseCache
+from llm_checkpoint import ResultCheckpoint
+from llm_scheduler import InferenceJob, InferenceScheduler, parse_concurrency_overrides
+from llm_telemetry import TelemetryRecorder, format_report, latency_report, ollama_stats
+from model_registry import FAILED, ModelRegistry
+from ollama_pool import LEAST_LOADED, ROUTING_MODES, OllamaPool, parse_affinity
+from prompt_batching import (BATCH_PROMPT_TEMPLATE, PREFIX_LAYOUT, PREFIX_PROMPT_TEMPLATE, PROMPT_LAYOUTS,
+                             build_batch_prompt, plan_batches, split_batch_response)
+from response_classifier import DEFAULT_CLASSIFIER, VULNERABILITY_TYPE_KEYS, IncrementalDetectionParser
+from results_store import ResultsStore
+from snippet_corpus import SNIPPET_EXTENSIONS, SnippetCorpus
+
 # Carregar configurações do .env
 load_dotenv(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '.env'))
 
@@ -19,9 +37,60 @@ PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 # Configurações com fallbacks robustos
 DEEPSEEK_MODEL = os.getenv('DEEPSEEK_VERSION', 'deepseek-coder:1.3b')
 CODELLAMA_MODEL = os.getenv('CODELLAMA_VERSION', 'codellama:7b')
-MAX_RETRIES = 3
-RETRY_DELAY = 10
+MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', '3'))
+RETRY_BASE_DELAY = float(os.getenv('LLM_RETRY_BASE_DELAY', '1'))  # Backoff exponencial com jitter
+RETRY_MAX_DELAY = float(os.getenv('LLM_RETRY_MAX_DELAY', '30'))
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('LLM_CIRCUIT_THRESHOLD', '5'))  # Falhas seguidas que abrem o circuito
+CIRCUIT_RESET_SECONDS = float(os.getenv('LLM_CIRCUIT_RESET', '30'))
+CIRCUIT_MAX_WAIT_SECONDS = float(os.getenv('LLM_CIRCUIT_MAX_WAIT', '120'))  # Espera máxima com circuito aberto
+EXECUTION_ORDER = os.getenv('LLM_EXECUTION_ORDER', 'model-major')  # Agrupar jobs por modelo (ver execution_planner)
+KEEP_ALIVE = os.getenv('LLM_KEEP_ALIVE', '30m')  # Tempo que o modelo da fase fica fixado na memória
+ADAPTIVE_CONCURRENCY = os.getenv('LLM_ADAPTIVE_CONCURRENCY', '1').lower() not in ('0', 'false', 'no')
 TIMEOUT_SECONDS = 120  # Timeout para cada requisição
+PULL_TIMEOUT_SECONDS = 300  # Timeout para baixar um modelo ausente
+STREAM_DEFAULT = os.getenv('LLM_STREAM', '').lower() in ('1', 'true', 'yes')  # Streaming com parada antecipada
+
+# Divisão de arquivos grandes em trechos, dimensionados pela janela de contexto de cada modelo
+DEFAULT_CONTEXT_TOKENS = int(os.getenv('LLM_CONTEXT_TOKENS', '2048'))  # num_ctx padrão do Ollama
+MODEL_CONTEXT_TOKENS = {
+    DEEPSEEK_MODEL: int(os.getenv('DEEPSEEK_CONTEXT_TOKENS', DEFAULT_CONTEXT_TOKENS)),
+    CODELLAMA_MODEL: int(os.getenv('CODELLAMA_CONTEXT_TOKENS', DEFAULT_CONTEXT_TOKENS)),
+}
+RESPONSE_RESERVE_TOKENS = 512  # Tokens reservados para a resposta
+CHARS_PER_TOKEN = 3.0  # Estimativa conservadora para código-fonte
+MIN_CHUNK_CHARS = 1000
+CHUNK_OVERLAP_LINES = int(os.getenv('LLM_CHUNK_OVERLAP_LINES', '5'))
+CHUNK_CONCURRENCY = int(os.getenv('LLM_CHUNK_CONCURRENCY', '2'))  # Trechos de um arquivo em paralelo
+DEFAULT_CONCURRENCY = int(os.getenv('LLM_CONCURRENCY', '1'))  # Requisições simultâneas por modelo
+PROMPT_LAYOUT = os.getenv('LLM_PROMPT_LAYOUT', 'original')  # 'prefix': texto fixo antes do código (cache KV)
+BATCH_SIZE = int(os.getenv('LLM_BATCH_SIZE', '1'))  # Snippets por prompt (1 = um snippet por requisição)
+BATCH_MAX_SNIPPET_CHARS = int(os.getenv('LLM_BATCH_MAX_SNIPPET_CHARS', '1500'))  # Maiores seguem sozinhos
+BATCH_ANSWER_TOKENS = 100  # Tokens reservados para a resposta de cada snippet do lote
+TELEMETRY_DEFAULT = os.getenv('LLM_TELEMETRY', '1').lower() not in ('0', 'false', 'no')  # JSONL por tentativa
+STORE_DEFAULT = os.getenv('LLM_RESULTS_STORE', '1').lower() not in ('0', 'false', 'no')  # Histórico colunar
+
+# Opções de geração (também compõem a chave do cache de respostas)
+GENERATION_OPTIONS = {
+    'temperature': 0.0,
+    'timeout': TIMEOUT_SECONDS
+}
+
+# Cache de respostas: limites de remoção por quantidade, tamanho e idade
+CACHE_DIR = os.getenv('LLM_CACHE_DIR', os.path.join(PROJECT_ROOT, 'results', '.llm_cache'))
+CACHE_MAX_ENTRIES = int(os.getenv('LLM_CACHE_MAX_ENTRIES', '10000'))
+CACHE_MAX_MB = float(os.getenv('LLM_CACHE_MAX_MB', '512'))
+CACHE_MAX_AGE_DAYS = float(os.getenv('LLM_CACHE_MAX_AGE_DAYS', '30'))
+
+# Colunas de saída por modelo: (rótulo, detecção, resposta bruta, tempo)
+MODEL_COLUMNS = {
+    DEEPSEEK_MODEL: ('DeepSeek', 'Detected_Deepseek', 'DeepSeek_Raw_Result', 'DeepSeek_Time'),
+    CODELLAMA_MODEL: ('CodeLlama', 'Detected_CodeLlama', 'CodeLlama_Raw_Result', 'CodeLlama_Time'),
+}
+
+DEFAULT_BACKOFF = BackoffPolicy(MAX_RETRIES, RETRY_BASE_DELAY, RETRY_MAX_DELAY)
+
+# Servidores Ollama: OLLAMA_HOSTS (vírgulas) ou OLLAMA_HOST; todas as chamadas passam pelo pool
+OLLAMA_POOL = OllamaPool.from_env()
 
 PROMPT_TEMPLATE = """
 Analise os riscos de segurança no código abaixo, seguindo o OWASP Top 10. 
@@ -42,8 +111,12 @@ Code:
 def check_ollama_connection():
     """Verifica se Ollama está funcionando."""
     try:
-        response = ollama.list()
+        response = OLLAMA_POOL.list()
         print(f"✅ Ollama conectado. Modelos disponíveis: {[model['model'] for model in response.get('models', [])]}")
+        healthy = [endpoint['host'] for endpoint in OLLAMA_POOL.report() if endpoint['healthy']]
+        if len(OLLAMA_POOL.endpoints) > 1:
+            print(f"🔀 {len(healthy)}/{len(OLLAMA_POOL.endpoints)} endpoint(s) saudável(is) "
+                  f"({OLLAMA_POOL.routing}): {', '.join(healthy)}")
         return True
     except Exception as e:
         print(f"❌ Ollama não está respondendo: {e}")
@@ -51,7 +124,7 @@ def check_ollama_connection():
 def check_model_availability(model_name):
     """Verifica se um modelo específico está disponível."""
     try:
-        models = ollama.list()
+        models = OLLAMA_POOL.list()
         model_names = [model['model'] for model in models.get('models', [])]
         if model_name in model_names:
             return True
@@ -59,10 +132,8 @@ def check_model_availability(model_name):
             print(f"⚠️ Modelo {model_name} não encontrado. Tentando baixar...")
             try:
                 # Adicionar timeout para operação de pull
-                import threading
-                
                 def pull_model():
-                    ollama.pull(model_name)
+                    OLLAMA_POOL.pull(model_name)
                 
                 thread = threading.Thread(target=pull_model)
                 thread.start()
@@ -73,7 +144,7 @@ def check_model_availability(model_name):
                     return False
                     
                 # Verificar novamente após o pull
-                models = ollama.list()
+                models = OLLAMA_POOL.list()
                 model_names = [model['model'] for model in models.get('models', [])]
                 return model_name in model_names
             except Exception as pull_error:
@@ -88,138 +159,433 @@ def parse_llm_response_to_detection(llm_response):
     Parses the LLM response to determine if a vulnerability was detected.
     Returns 1 if vulnerability detected, 0 otherwise.
     """
-    if llm_response is None or llm_response.strip() == "":
-        return 0
-
-    response_lower = llm_response.strip().lower()
-
-    # 1. Código explicitamente seguro
-    if response_lower in ["código seguro", "codigo seguro", "safe code", "no vulnerabilities"]:
-        return 0
+    return DEFAULT_CLASSIFIER.classify(llm_response, verbose=True)
 
-    # 2. Verificar se começa com ERROR
-    if response_lower.startswith("error"):
-        print(f"⚠️ Resposta com erro: {llm_response[:100]}...")
-        return 0
-
-    # 3. Tentar parsing JSON
-    try:
-        json_match = re.search(r'\{.*\}', llm_response, re.DOTALL)
-        if json_match:
-            json_str = json_match.group(0)
-            data = json.loads(json_str)
-            if isinstance(data, dict) and any(key.lower() in ["tipo da vulnerabilidade", "vulnerability type", "tipo"] for key in data.keys()):
-                return 1
-    except json.JSONDecodeError:
-        pass
-
-    # 4. Verificação de palavras-chave
-    vulnerability_keywords = [
-        "vulnerável", "vulnerability", "injection", "xss", "csrf",
-        "access control", "insecure", "falha de segurança", "risco",
-        "sql", "nosql", "sensitive data", "broken", "cwe-"
-    ]
-    
-    negative_phrases = [
-        "não contém vulnerabilidades", "no vulnerabilities", "not vulnerable", 
-        "está seguro", "no security risks", "secure code", "sem riscos"
-    ]
-
-    has_vuln_keyword = any(keyword in response_lower for keyword in vulnerability_keywords)
-    has_negative_phrase = any(neg_phrase in response_lower for neg_phrase in negative_phrases)
-    
-    if has_vuln_keyword and not has_negative_phrase:
-        return 1
-            
-    return 0
+def stream_generate(model_name, prompt, keep_full_output=False, keep_alive=None):
+    """
+    Gera em modo streaming, alimentando um IncrementalDetectionParser.
 
-def analyze_code(file_path, model_name, file_name_for_prompt):
-    """Analisa um arquivo com o modelo LLM especificado, com retries robustos."""
+    Interrompe a geração assim que o veredito é decidido, a menos que
+    keep_full_output seja True. Retorna (texto, segundos até o veredito ou None,
+    segundos até o primeiro token ou None, estatísticas do Ollama). As
+    estatísticas só vêm no último chunk, então ficam vazias com parada antecipada.
+    """
+    parser = IncrementalDetectionParser()
+    start_time = time.time()
+    verdict_time = None
+    first_token_time = None
+    stats = {}
+    stream = OLLAMA_POOL.generate(
+        model=model_name, prompt=prompt, options=GENERATION_OPTIONS, stream=True, keep_alive=keep_alive
+    )
     try:
-        # Verificar se arquivo existe
-        if not os.path.exists(file_path):
-            return "ERROR: Snippet file not found"
-            
-        with open(file_path, 'r', encoding='utf-8') as f:
-            code = f.read()
-
-        # Truncar código se muito longo (limitação de contexto)
-        if len(code) > 8000:
-            code = code[:8000] + "\n// ... código truncado ..."
-            print(f"  ⚠️ Código truncado para {file_name_for_prompt}")
-
-        # Preparar prompt
-        final_prompt = PROMPT_TEMPLATE.format(
-            filename=file_name_for_prompt,
-            code=code
-        )
-
-        # Verificar modelo antes de usar
-        if not check_model_availability(model_name):
-            return f"ERROR: Model {model_name} not available"
-
-        for attempt in range(MAX_RETRIES):
+        for chunk in stream:
+            if first_token_time is None and chunk.get('response'):
+                first_token_time = time.time() - start_time
+            if chunk.get('done'):
+                stats = ollama_stats(chunk)
+            parser.feed(chunk.get('response') or '')
+            if parser.verdict is not None and verdict_time is None:
+                verdict_time = time.time() - start_time
+                if not keep_full_output:
+                    break
+    finally:
+        # Fechar o stream encerra a conexão HTTP e a geração no Ollama
+        close = getattr(stream, 'close', None)
+        if close is not None:
+            close()
+    text = parser.text if keep_full_output else parser.decided_text
+    return text, verdict_time, first_token_time, stats
+
+def generate_for_prompt(final_prompt, model_name, cache=None, registry=None,
+                        stream=False, keep_full_output=False, telemetry=None, trace=None,
+                        backpressure=None, keep_alive=None):
+    """Gera a resposta para um prompt pronto: cache, disponibilidade do modelo e retries.
+
+    Com um TelemetryRecorder, cada tentativa (e cada acerto de cache) é
+    registrada com os dados de trace (ID, espera na fila, trecho). Com um
+    BackpressureController, as chamadas passam pelo circuit breaker e pelo
+    limitador adaptativo do modelo; os retries usam backoff exponencial com
+    jitter e só acontecem para erros transitórios (ver llm_backoff.classify_error).
+    keep_alive é repassado ao Ollama (tempo que o modelo fica na memória).
+    """
+    trace = trace or {}
+
+    def emit(status, attempt=0, **fields):
+        if telemetry is not None:
+            telemetry.record(
+                trace.get('id'), model_name, status, attempt=attempt,
+                queue_wait=trace.get('queue_wait') if attempt <= 1 else None,
+                chunk=trace.get('chunk'), batch=trace.get('batch'), stream=stream, **fields
+            )
+
+    # Consultar o cache antes de qualquer chamada de rede
+    # Respostas interrompidas no veredito são parciais: ficam sob outra chave
+    early_exit = stream and not keep_full_output
+    cache_options = dict(GENERATION_OPTIONS, early_exit=True) if early_exit else GENERATION_OPTIONS
+    cache_key = ResponseCache.make_key(model_name, final_prompt, cache_options)
+    if cache is not None:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            print(f"  💾 Resposta em cache para {model_name} ({len(cached)} chars)")
+            emit('cache')
+            return cached
+
+    # Verificar modelo antes de usar
+    if registry is not None:
+        model_ready = registry.wait_ready(model_name)
+    else:
+        model_ready = check_model_availability(model_name)
+    if not model_ready:
+        return f"ERROR: Model {model_name} not available"
+
+    policy = backpressure.policy if backpressure is not None else DEFAULT_BACKOFF
+    breaker = backpressure.breaker(model_name) if backpressure is not None else None
+    limiter = backpressure.limiter(model_name) if backpressure is not None else None
+
+    for attempt in range(policy.max_retries):
+        if breaker is not None and not breaker.acquire(timeout=CIRCUIT_MAX_WAIT_SECONDS):
+            print(f"  🚧 Circuito aberto para {model_name} há mais de {CIRCUIT_MAX_WAIT_SECONDS:.0f}s")
+            return f"ERROR: Circuit open for model {model_name}"
+
+        print(f"  📡 Tentativa {attempt + 1}/{policy.max_retries} para {model_name}...")
+        error = None
+        first_token_time = None
+        stats = {}
+        requested_at = time.time()
+        # O limitador segura a chamada enquanto o modelo estiver no limite de requisições simultâneas
+        with (limiter.slot() if limiter is not None else nullcontext({})) as slot:
+            start_time = time.time()
             try:
-                print(f"  📡 Tentativa {attempt + 1}/{MAX_RETRIES} para {model_name}...")
-                
-                start_time = time.time()
-                response = ollama.generate(
-                    model=model_name,
-                    prompt=final_prompt,
-                    options={
-                        'temperature': 0.0,
-                        'timeout': TIMEOUT_SECONDS
-                    }
-                )
-                elapsed = time.time() - start_time
-                
-                if 'response' in response and response['response']:
-                    result = response['response'].strip()
-                    print(f"  ✅ Resposta recebida em {elapsed:.1f}s ({len(result)} chars)")
-                    return result
+                if stream:
+                    text, verdict_time, first_token_time, stats = stream_generate(
+                        model_name, final_prompt, keep_full_output, keep_alive=keep_alive
+                    )
+                    response = {'response': text}
+                    if verdict_time is not None:
+                        print(f"  ⚡ Veredito em {verdict_time:.1f}s")
                 else:
-                    print(f"  ⚠️ Resposta vazia: {response}")
-                    if attempt == MAX_RETRIES - 1:
-                        return "ERROR: Empty response from model"
-
+                    response = OLLAMA_POOL.generate(
+                        model=model_name,
+                        prompt=final_prompt,
+                        options=GENERATION_OPTIONS,
+                        keep_alive=keep_alive
+                    )
+                    stats = ollama_stats(response)
+                slot['latency'] = time.time() - start_time
+                slot['tokens'] = stats.get('eval_count')
             except Exception as e:
-                error_msg = str(e).lower()
-                print(f"  ❌ Erro: {error_msg}")
-                
-                # Tratamento específico para diferentes tipos de erro
-                if "context length" in error_msg or "context" in error_msg:
-                    return "ERROR: Context length exceeded"
-                elif "timeout" in error_msg:
-                    print(f"  ⏱️ Timeout na tentativa {attempt + 1}")
-                elif "connection" in error_msg or "network" in error_msg:
-                    print(f"  🌐 Problema de conexão na tentativa {attempt + 1}")
-                elif "model" in error_msg and "not found" in error_msg:
-                    return f"ERROR: Model {model_name} not found"
-                
-                if attempt < MAX_RETRIES - 1:
-                    print(f"  🔄 Aguardando {RETRY_DELAY}s antes de tentar novamente...")
-                    time.sleep(RETRY_DELAY)
+                error = e
+                slot['overloaded'] = classify_error(e) in PRESSURE
+        elapsed = time.time() - start_time
+        throttle_wait = start_time - requested_at
+
+        if error is None:
+            if breaker is not None:
+                breaker.record_success()
+            if 'response' in response and response['response']:
+                result = response['response'].strip()
+                print(f"  ✅ Resposta recebida em {elapsed:.1f}s ({len(result)} chars)")
+                emit('ok', attempt + 1, ttft=first_token_time, duration=elapsed, stats=stats,
+                     throttle_wait=throttle_wait)
+                if cache is not None:
+                    cache.put(cache_key, result, model=model_name, options=cache_options)
+                return result
+            print(f"  ⚠️ Resposta vazia: {response}")
+            emit('empty', attempt + 1, ttft=first_token_time, duration=elapsed, stats=stats,
+                 throttle_wait=throttle_wait)
+            if attempt == policy.max_retries - 1:
+                return "ERROR: Empty response from model"
+        else:
+            kind = classify_error(error)
+            print(f"  ❌ Erro ({kind}): {str(error).lower()}")
+            emit('error', attempt + 1, duration=elapsed, error=type(error).__name__, error_kind=kind,
+                 throttle_wait=throttle_wait)
+            if breaker is not None:
+                if kind in PRESSURE:
+                    breaker.record_failure()
                 else:
-                    return f"ERROR: {type(e).__name__}: {str(e)[:200]}"
+                    breaker.release_probe()
+
+            # Erros permanentes não são repetidos
+            if kind == CONTEXT:
+                return "ERROR: Context length exceeded"
+            if kind == MODEL_MISSING:
+                return f"ERROR: Model {model_name} not found"
+            if kind not in RETRYABLE or attempt == policy.max_retries - 1:
+                return f"ERROR: {type(error).__name__}: {str(error)[:200]}"
+
+        delay = policy.delay(attempt)
+        print(f"  🔄 Aguardando {delay:.1f}s antes de tentar novamente...")
+        time.sleep(delay)
+
+def chunk_char_budget(model_name):
+    """Tamanho máximo (em caracteres) de código por prompt, a partir da janela de contexto do modelo."""
+    context_tokens = MODEL_CONTEXT_TOKENS.get(model_name, DEFAULT_CONTEXT_TOKENS)
+    usable_tokens = context_tokens - RESPONSE_RESERVE_TOKENS
+    return max(int(usable_tokens * CHARS_PER_TOKEN) - len(PROMPT_TEMPLATE), MIN_CHUNK_CHARS)
+
+def batch_char_budget(model_name):
+    """Caracteres disponíveis em um prompt de lote (código + reserva de resposta de cada snippet)."""
+    context_tokens = MODEL_CONTEXT_TOKENS.get(model_name, DEFAULT_CONTEXT_TOKENS)
+    usable_tokens = context_tokens - RESPONSE_RESERVE_TOKENS
+    return max(int(usable_tokens * CHARS_PER_TOKEN) - len(BATCH_PROMPT_TEMPLATE), MIN_CHUNK_CHARS)
+
+def batch_jobs(jobs, batch_size):
+    """
+    Agrupa jobs de snippets pequenos do mesmo modelo em jobs de lote.
+
+    Snippets acima de BATCH_MAX_SNIPPET_CHARS e lotes de um só snippet
+    continuam como jobs individuais. Um job de lote tem idx None e, no payload,
+    a lista dos payloads originais em 'batch'.
+    """
+    answer_chars = int(BATCH_ANSWER_TOKENS * CHARS_PER_TOKEN)
+    batched = []
+    by_model = defaultdict(list)
+    for job in jobs:
+        size = len(job.payload['code'])
+        if size > BATCH_MAX_SNIPPET_CHARS:
+            batched.append(job)
+        else:
+            by_model[job.model].append((job, size + answer_chars))
+    for model, items in by_model.items():
+        for batch in plan_batches(items, batch_size, batch_char_budget(model)):
+            if len(batch) == 1:
+                batched.append(batch[0][0])
+                continue
+            payloads = [job.payload for job, _ in batch]
+            batched.append(InferenceJob(None, model, {
+                'id': '+'.join(payload['id'] for payload in payloads),
+                'file': f"lote de {len(payloads)} snippets",
+                'batch': payloads,
+            }))
+    return batched
+
+def merge_chunk_results(file_name_for_prompt, chunks, responses):
+    """
+    Consolida os vereditos por trecho em uma única detecção para o arquivo.
+
+    Se algum trecho for vulnerável, retorna um JSON com o tipo da vulnerabilidade
+    e as faixas de linhas ("Linhas": "a - b") de cada trecho vulnerável. Sem
+    detecções, retorna o primeiro erro (se houver) ou "Código seguro".
+    """
+    findings = []
+    types = []
+    for chunk, response in zip(chunks, responses):
+        if parse_llm_response_to_detection(response) != 1:
+            continue
+        finding = {'Linhas': f"{chunk.start_line} - {chunk.end_line}", 'Resposta': response}
+        for data in DEFAULT_CLASSIFIER.find_json_objects(response):
+            if not isinstance(data, dict):
+                continue
+            for key, value in data.items():
+                if key.lower() in VULNERABILITY_TYPE_KEYS and value not in types:
+                    types.append(value)
+                if key.lower() in ('trecho vulnerável', 'vulnerable snippet'):
+                    finding['Trecho Vulnerável'] = value
+        findings.append(finding)
+
+    if findings:
+        return json.dumps({
+            'Arquivo': file_name_for_prompt,
+            'Tipo da Vulnerabilidade': '; '.join(str(t) for t in types) or 'Ver trechos',
+            'Trechos': findings,
+        }, ensure_ascii=False, indent=2)
+
+    errors = [response for response in responses if str(response).startswith('ERROR')]
+    return errors[0] if errors else "Código seguro"
+
+def analyze_code(file_path, model_name, file_name_for_prompt, cache=None, registry=None,
+                 stream=False, keep_full_output=False, telemetry=None, trace=None, backpressure=None,
+                 keep_alive=None, prompt_template=PROMPT_TEMPLATE, code=None):
+    """Analisa um arquivo com o modelo LLM especificado, com retries robustos.
+
+    Arquivos maiores que a janela de contexto do modelo são divididos em trechos
+    (limites de função/classe, com sobreposição), analisados em paralelo e
+    consolidados por merge_chunk_results. Se um ResponseCache for informado,
+    respostas já geradas para o mesmo (modelo, prompt, opções) são reaproveitadas
+    sem chamar o Ollama. Com um ModelRegistry, a disponibilidade do modelo é
+    consultada localmente em vez de uma chamada a ollama.list() por snippet. Com
+    stream=True, a geração é interrompida assim que o veredito estiver decidido
+    (ver stream_generate). telemetry/trace/backpressure/keep_alive são
+    repassados a generate_for_prompt, com a faixa de linhas de cada trecho.
+    prompt_template permite o layout com prefixo fixo (PREFIX_PROMPT_TEMPLATE).
+    Com code (conteúdo já carregado pelo SnippetCorpus), o arquivo não é relido.
+    """
+    try:
+        if code is None:
+            # Verificar se arquivo existe
+            if not os.path.exists(file_path):
+                return "ERROR: Snippet file not found"
+
+            with open(file_path, 'r', encoding='utf-8') as f:
+                code = f.read()
+
+        chunks = chunk_code(code, chunk_char_budget(model_name), CHUNK_OVERLAP_LINES)
+
+        def analyze_chunk(chunk):
+            prompt_name = file_name_for_prompt
+            if len(chunks) > 1:
+                prompt_name = f"{file_name_for_prompt} (linhas {chunk.start_line}-{chunk.end_line})"
+            final_prompt = prompt_template.format(
+                filename=prompt_name,
+                code=chunk.text
+            )
+            # A espera na fila pertence ao job: só o primeiro trecho a registra
+            chunk_trace = dict(trace or {}, chunk=f"{chunk.start_line}-{chunk.end_line}")
+            if chunk is not chunks[0]:
+                chunk_trace['queue_wait'] = None
+            return generate_for_prompt(
+                final_prompt, model_name, cache=cache, registry=registry,
+                stream=stream, keep_full_output=keep_full_output,
+                telemetry=telemetry, trace=chunk_trace, backpressure=backpressure,
+                keep_alive=keep_alive
+            )
+
+        if len(chunks) == 1:
+            return analyze_chunk(chunks[0])
+
+        print(f"  ✂️ {file_name_for_prompt} dividido em {len(chunks)} trechos para {model_name}")
+        with ThreadPoolExecutor(max_workers=min(CHUNK_CONCURRENCY, len(chunks))) as executor:
+            responses = list(executor.map(analyze_chunk, chunks))
+        return merge_chunk_results(file_name_for_prompt, chunks, responses)
 
     except Exception as e:
         error_message = f"{type(e).__name__}: {str(e)}"
         print(f"  💥 Erro geral ao processar {file_path}: {error_message}")
         return f"ERROR: {error_message}"
 
+def analyze_batch(snippets, model_name, cache=None, registry=None, telemetry=None, trace=None,
+                  backpressure=None, keep_alive=None):
+    """
+    Analisa vários snippets pequenos em um único prompt; retorna {ID: resposta ou None}.
+
+    O prompt de lote (prompt_batching.BATCH_PROMPT_TEMPLATE) tem o texto fixo
+    antes dos snippets delimitados por ID, e a resposta é separada por
+    split_batch_response. Lotes não usam streaming: a parada antecipada
+    cortaria as respostas dos snippets seguintes. IDs sem resposta (ou erro
+    do lote inteiro) voltam como None para reanálise individual.
+    """
+    try:
+        items = [(snippet['id'], snippet['file'], snippet['code']) for snippet in snippets]
+        response = generate_for_prompt(
+            build_batch_prompt(items), model_name, cache=cache, registry=registry,
+            telemetry=telemetry, trace=dict(trace or {}, batch=len(items)),
+            backpressure=backpressure, keep_alive=keep_alive
+        )
+    except Exception as e:
+        print(f"  💥 Erro geral ao processar o lote: {type(e).__name__}: {e}")
+        return dict.fromkeys(snippet['id'] for snippet in snippets)
+    return split_batch_response(response, [snippet['id'] for snippet in snippets])
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Análise de vulnerabilidades com LLMs via Ollama")
+    parser.add_argument(
+        '--dataset', default=os.path.join(PROJECT_ROOT, 'dataset', 'juice_shop_15_files.csv'),
+        help="CSV do ground truth com os IDs a analisar"
+    )
+    parser.add_argument(
+        '--snippets-dir', default=os.path.join(PROJECT_ROOT, 'dataset', 'code_snippets'),
+        help=f"Pasta com os snippets (<ID> com uma das extensões {', '.join(SNIPPET_EXTENSIONS)})"
+    )
+    parser.add_argument(
+        '--output', default=os.path.join(PROJECT_ROOT, 'results', 'llm_detections_results.csv'),
+        help="CSV de saída; checkpoint e telemetria ficam na mesma pasta"
+    )
+    parser.add_argument(
+        '--concurrency', action='append', metavar='MODELO=N',
+        help="Requisições simultâneas para um modelo específico (pode ser repetido)"
+    )
+    parser.add_argument(
+        '--default-concurrency', type=int, default=None,
+        help=f"Requisições simultâneas por modelo (padrão: {DEFAULT_CONCURRENCY}, vezes os endpoints saudáveis no least-loaded)"
+    )
+    parser.add_argument(
+        '--routing', choices=ROUTING_MODES, default=None,
+        help="Distribuição entre endpoints de OLLAMA_HOSTS (padrão: $OLLAMA_ROUTING ou least-loaded)"
+    )
+    parser.add_argument(
+        '--affinity', action='append', metavar='MODELO=HOST1|HOST2',
+        help="Endpoints dedicados a um modelo no roteamento affinity (pode ser repetido)"
+    )
+    cache_group = parser.add_mutually_exclusive_group()
+    cache_group.add_argument(
+        '--no-cache', action='store_true',
+        help="Não ler nem gravar o cache de respostas"
+    )
+    cache_group.add_argument(
+        '--refresh', action='store_true',
+        help="Ignorar respostas em cache e regravá-las (ex.: após atualizar um modelo)"
+    )
+    parser.add_argument(
+        '--stream', action='store_true', default=STREAM_DEFAULT,
+        help="Gerar em streaming e interromper assim que o veredito estiver decidido"
+    )
+    parser.add_argument(
+        '--keep-full-output', action='store_true',
+        help="Com --stream, continuar a geração para guardar a resposta completa"
+    )
+    parser.add_argument(
+        '--resume', action='store_true',
+        help="Retomar a partir do checkpoint, pulando pares (snippet, modelo) já concluídos"
+    )
+    parser.add_argument(
+        '--changed-only', action='store_true',
+        help="Como --resume, mas reanalisando os snippets novos ou alterados desde a última análise"
+    )
+    parser.add_argument(
+        '--no-telemetry', action='store_false', dest='telemetry', default=TELEMETRY_DEFAULT,
+        help="Não gravar a telemetria por tentativa (results/llm_telemetry.jsonl)"
+    )
+    parser.add_argument(
+        '--no-store', action='store_false', dest='store', default=STORE_DEFAULT,
+        help="Não gravar a execução no histórico colunar (results/store)"
+    )
+    parser.add_argument(
+        '--order', choices=EXECUTION_ORDERS, default=EXECUTION_ORDER,
+        help=f"Ordem de execução: um modelo por vez ou snippets com modelos intercalados (padrão: {EXECUTION_ORDER})"
+    )
+    parser.add_argument(
+        '--keep-alive', default=KEEP_ALIVE,
+        help=f"keep_alive do modelo em execução no modo model-major (padrão: {KEEP_ALIVE})"
+    )
+    parser.add_argument(
+        '--prompt-layout', choices=PROMPT_LAYOUTS, default=PROMPT_LAYOUT,
+        help="'prefix' coloca o texto fixo antes do arquivo e do código, para o Ollama reaproveitar o cache do prefixo"
+    )
+    parser.add_argument(
+        '--batch-size', type=int, default=BATCH_SIZE,
+        help=f"Snippets pequenos (até {BATCH_MAX_SNIPPET_CHARS} caracteres) por prompt (padrão: {BATCH_SIZE})"
+    )
+    parser.add_argument(
+        '--no-adaptive', action='store_false', dest='adaptive', default=ADAPTIVE_CONCURRENCY,
+        help="Manter a concorrência fixa, sem reduzi-la quando a latência ou os erros aumentam"
+    )
+    return parser.parse_args()
+
 def main():
+    args = parse_args()
     print("🚀 Iniciando análise de LLMs...")
     
+    if args.routing:
+        OLLAMA_POOL.routing = args.routing
+    OLLAMA_POOL.affinity.update(parse_affinity(args.affinity))
+
     # Verificar Ollama
     if not check_ollama_connection():
         print("❌ Ollama não está disponível. Certifique-se de que está rodando.")
         exit(1)
 
     # Caminhos
-    dataset_ground_truth_path = os.path.join(PROJECT_ROOT, 'dataset', 'juice_shop_15_files.csv')
-    snippets_dir = os.path.join(PROJECT_ROOT, 'dataset', 'code_snippets') 
-    results_dir = os.path.join(PROJECT_ROOT, 'results')
-    llm_output_csv_path = os.path.join(results_dir, 'llm_detections_results.csv')
+    dataset_ground_truth_path = args.dataset
+    snippets_dir = args.snippets_dir
+    llm_output_csv_path = args.output
+    results_dir = os.path.dirname(os.path.abspath(llm_output_csv_path))
+    checkpoint_path = os.path.join(results_dir, 'llm_checkpoint.jsonl')
+    telemetry_path = os.path.join(results_dir, 'llm_telemetry.jsonl')
+    telemetry_report_path = os.path.join(results_dir, 'llm_telemetry_report.json')
+    store_dir = os.path.join(results_dir, 'store')
+    snippet_index_path = os.path.join(results_dir, 'snippet_index.json')
 
     os.makedirs(results_dir, exist_ok=True)
 
@@ -233,14 +599,20 @@ def main():
     df_ground_truth = pd.read_csv(dataset_ground_truth_path)
     print(f"📊 Carregados {len(df_ground_truth)} arquivos para análise")
 
-    # Verificar modelos disponíveis
+    # Resolver os modelos uma única vez; os ausentes são baixados em segundo plano
     models_to_test = [DEEPSEEK_MODEL, CODELLAMA_MODEL]
+    OLLAMA_POOL.start_health_checks()
+    registry = ModelRegistry(client=OLLAMA_POOL, pull_timeout=PULL_TIMEOUT_SECONDS)
+    registry.warm(models_to_test)
     available_models = []
     
     for model in models_to_test:
-        if check_model_availability(model):
+        if registry.is_ready(model):
+            available_models.append(model)
+            print(f"✅ Modelo disponível: {model} ({(registry.digest(model) or '')[:12]})")
+        elif registry.status(model) != FAILED:
             available_models.append(model)
-            print(f"✅ Modelo disponível: {model}")
+            print(f"⏳ Modelo em download: {model}")
         else:
             print(f"❌ Modelo indisponível: {model}")
     
@@ -252,83 +624,248 @@ def main():
     df_llm_results = df_ground_truth[['ID', 'File', 'Vulnerability']].copy()
     
     # Inicializar colunas para cada modelo disponível
-    if DEEPSEEK_MODEL in available_models:
-        df_llm_results['Detected_Deepseek'] = 0
-        df_llm_results['DeepSeek_Raw_Result'] = ''
-        df_llm_results['DeepSeek_Time'] = 0.0
+    for model in available_models:
+        _, detected_col, raw_col, time_col = MODEL_COLUMNS[model]
+        df_llm_results[detected_col] = 0
+        df_llm_results[raw_col] = ''
+        df_llm_results[time_col] = 0.0
 
-    if CODELLAMA_MODEL in available_models:
-        df_llm_results['Detected_CodeLlama'] = 0
-        df_llm_results['CodeLlama_Raw_Result'] = ''
-        df_llm_results['CodeLlama_Time'] = 0.0
+    checkpoint = ResultCheckpoint(checkpoint_path, resume=args.resume or args.changed_only)
+    skipped = 0
 
-    print(f"🔬 Iniciando análise com {len(available_models)} modelo(s)...")
-    start_time = time.time()
+    # Snippets lidos uma única vez; o índice diz quais mudaram desde a última análise
+    corpus = SnippetCorpus(snippets_dir, index_path=snippet_index_path)
+    changed = corpus.changed(df_llm_results['ID']) if args.changed_only else set()
 
+    # Montar a fila de trabalho (snippet, modelo) na ordem do CSV de saída
+    pending = []
     for idx, row in df_llm_results.iterrows():
-        filename_in_snippets = f"{row['ID']}.ts" 
-        snippet_file_path = os.path.join(snippets_dir, filename_in_snippets)
-        file_name_for_prompt = row['File']
+        snippet_file_path = corpus.resolve(row['ID'])
 
-        if not os.path.exists(snippet_file_path):
-            print(f"⚠️ Arquivo não encontrado: {snippet_file_path}")
+        if snippet_file_path is None:
+            print(f"⚠️ Arquivo não encontrado: {os.path.join(snippets_dir, str(row['ID']))}")
             # Marcar como erro para todos os modelos disponíveis
-            if DEEPSEEK_MODEL in available_models:
-                df_llm_results.at[idx, 'DeepSeek_Raw_Result'] = "ERROR: Snippet file not found"
-            if CODELLAMA_MODEL in available_models:
-                df_llm_results.at[idx, 'CodeLlama_Raw_Result'] = "ERROR: Snippet file not found"
+            for model in available_models:
+                df_llm_results.at[idx, MODEL_COLUMNS[model][2]] = "ERROR: Snippet file not found"
             continue
-        
-        print(f"\n📁 Processando {row['ID']} ({file_name_for_prompt})...")
-
-        # Análise com DeepSeek (se disponível)
-        if DEEPSEEK_MODEL in available_models:
-            print(f"🤖 Analisando com DeepSeek...")
-            deepseek_start = time.time()
-            deepseek_result = analyze_code(snippet_file_path, DEEPSEEK_MODEL, file_name_for_prompt)
-            deepseek_time = time.time() - deepseek_start
-            
-            df_llm_results.at[idx, 'DeepSeek_Raw_Result'] = deepseek_result
-            df_llm_results.at[idx, 'Detected_Deepseek'] = parse_llm_response_to_detection(deepseek_result)
-            df_llm_results.at[idx, 'DeepSeek_Time'] = deepseek_time
-            
-            detection_status = "✅ DETECTADO" if df_llm_results.at[idx, 'Detected_Deepseek'] == 1 else "❌ NÃO DETECTADO"
-            print(f"  DeepSeek: {detection_status} ({deepseek_time:.1f}s)")
-
-        # Análise com CodeLlama (se disponível)
-        if CODELLAMA_MODEL in available_models:
-            print(f"🦙 Analisando com CodeLlama...")
-            llama_start = time.time()
-            codellama_result = analyze_code(snippet_file_path, CODELLAMA_MODEL, file_name_for_prompt)
-            llama_time = time.time() - llama_start
-            
-            df_llm_results.at[idx, 'CodeLlama_Raw_Result'] = codellama_result
-            df_llm_results.at[idx, 'Detected_CodeLlama'] = parse_llm_response_to_detection(codellama_result)
-            df_llm_results.at[idx, 'CodeLlama_Time'] = llama_time
-            
-            detection_status = "✅ DETECTADO" if df_llm_results.at[idx, 'Detected_CodeLlama'] == 1 else "❌ NÃO DETECTADO"
-            print(f"  CodeLlama: {detection_status} ({llama_time:.1f}s)")
-
-        # Progresso
-        progress = (idx + 1) / len(df_llm_results) * 100
-        print(f"📊 Progresso: {progress:.1f}% ({idx + 1}/{len(df_llm_results)})")
+
+        for model in available_models:
+            if checkpoint.is_done(row['ID'], model) and row['ID'] not in changed:
+                skipped += 1
+                continue
+            pending.append((idx, row, model, snippet_file_path))
+
+    # Leitura antecipada e paralela dos snippets agendados; o conteúdo é compartilhado entre os modelos
+    snippets = corpus.load(row['ID'] for _, row, _, _ in pending)
+    jobs = [
+        InferenceJob(idx, model, {
+            'id': row['ID'],
+            'path': snippet_file_path,
+            'file': row['File'],
+            'code': snippets[row['ID']].code,
+        })
+        for idx, row, model, snippet_file_path in pending
+    ]
+
+    cache = ResponseCache(
+        CACHE_DIR,
+        max_entries=CACHE_MAX_ENTRIES,
+        max_bytes=int(CACHE_MAX_MB * 1024 * 1024),
+        max_age_seconds=CACHE_MAX_AGE_DAYS * 86400,
+        enabled=not args.no_cache,
+        refresh=args.refresh
+    )
+    evicted = cache.evict()
+    if evicted:
+        print(f"🧹 {evicted} entrada(s) removida(s) do cache de respostas")
+
+    # least-loaded espalha cada modelo por todos os endpoints saudáveis; no affinity o modelo fica
+    # em um nó dedicado, e multiplicar a concorrência só empilharia requisições nele
+    endpoint_scale = len(OLLAMA_POOL.healthy_endpoints()) if OLLAMA_POOL.routing == LEAST_LOADED else 1
+    scheduler = InferenceScheduler(
+        concurrency=parse_concurrency_overrides(args.concurrency),
+        default_concurrency=args.default_concurrency or DEFAULT_CONCURRENCY * max(1, endpoint_scale)
+    )
+    telemetry = TelemetryRecorder(telemetry_path, enabled=args.telemetry)
+    planner = ExecutionPlanner(args.order, keep_alive=args.keep_alive)
+    # Limite de requisições em voo por modelo: jobs simultâneos x trechos simultâneos por job
+    backpressure = BackpressureController(
+        policy=DEFAULT_BACKOFF,
+        max_concurrency={
+            model: scheduler.concurrency_for(model) * CHUNK_CONCURRENCY for model in available_models
+        },
+        adaptive=args.adaptive,
+        failure_threshold=CIRCUIT_FAILURE_THRESHOLD,
+        reset_timeout=CIRCUIT_RESET_SECONDS
+    )
+    progress_lock = threading.Lock()
+    completed = [0]
+    pending_pairs = len(jobs)
+    prompt_template = PREFIX_PROMPT_TEMPLATE if args.prompt_layout == PREFIX_LAYOUT else PROMPT_TEMPLATE
+    if args.batch_size > 1:
+        jobs = batch_jobs(jobs, args.batch_size)
+
+    def record_result(payload, model, result, job_time):
+        detected = parse_llm_response_to_detection(result)
+        checkpoint.append(payload['id'], model, result, detected, job_time)
+
+        with progress_lock:
+            completed[0] += 1
+            detection_status = "✅ DETECTADO" if detected == 1 else "❌ NÃO DETECTADO"
+            print(f"  {MODEL_COLUMNS[model][0]} [{payload['id']}]: {detection_status} ({job_time:.1f}s)")
+            progress = completed[0] / pending_pairs * 100
+            print(f"📊 Progresso: {progress:.1f}% ({completed[0]}/{pending_pairs})")
+        return result, detected, job_time
+
+    def run_snippet(model, payload, queue_wait):
+        print(f"📁 {payload['id']} ({payload['file']}) → {MODEL_COLUMNS[model][0]}...")
+        job_start = time.time()
+        result = analyze_code(
+            payload['path'], model, payload['file'], code=payload['code'],
+            cache=cache, registry=registry,
+            stream=args.stream, keep_full_output=args.keep_full_output,
+            telemetry=telemetry, backpressure=backpressure,
+            keep_alive=planner.keep_alive_for(model), prompt_template=prompt_template,
+            trace={'id': payload['id'], 'queue_wait': queue_wait}
+        )
+        return record_result(payload, model, result, time.time() - job_start)
+
+    def run_job(job):
+        if 'batch' not in job.payload:
+            return run_snippet(job.model, job.payload, scheduler.current_queue_wait())
+
+        # Lote: o tempo do prompt é dividido igualmente entre os snippets
+        snippets = job.payload['batch']
+        print(f"📦 Lote {job.payload['id']} ({len(snippets)} snippets) → {MODEL_COLUMNS[job.model][0]}...")
+        job_start = time.time()
+        answers = analyze_batch(
+            snippets, job.model, cache=cache, registry=registry, telemetry=telemetry,
+            backpressure=backpressure, keep_alive=planner.keep_alive_for(job.model),
+            trace={'id': job.payload['id'], 'queue_wait': scheduler.current_queue_wait()}
+        )
+        job_time = (time.time() - job_start) / len(snippets)
+        missing = [snippet['id'] for snippet in snippets if answers.get(snippet['id']) is None]
+        if missing:
+            print(f"  ⚠️ Lote sem resposta para {', '.join(missing)}: reanalisando individualmente")
+        return [
+            run_snippet(job.model, snippet, None) if answers.get(snippet['id']) is None
+            else record_result(snippet, job.model, answers[snippet['id']], job_time)
+            for snippet in snippets
+        ]
+
+    if args.changed_only:
+        print(f"🔎 {len(changed)} snippet(s) novo(s) ou alterado(s) desde a última análise")
+    if args.resume or args.changed_only:
+        print(f"♻️ Retomando do checkpoint: {skipped} par(es) já concluído(s), {pending_pairs} pendente(s)")
+    print(f"🔬 Iniciando análise com {len(available_models)} modelo(s)...")
+    if args.batch_size > 1:
+        batches = sum(1 for job in jobs if 'batch' in job.payload)
+        print(f"📦 {pending_pairs} par(es) em {len(jobs)} requisição(ões) ({batches} lote(s) de até {args.batch_size})")
+    for model in available_models:
+        print(f"  ⚙️ {MODEL_COLUMNS[model][0]}: {scheduler.concurrency_for(model)} requisição(ões) simultânea(s)")
+    start_time = time.time()
+
+    # Raias: modelos em endpoints dedicados (affinity) rodam em paralelo; na mesma raia, um por vez
+    lanes = planner.plan(
+        jobs, resident_models=OLLAMA_POOL.loaded_models(),
+        placement={model: OLLAMA_POOL.dedicated_hosts(model) for model in available_models}
+    )
+    print(f"🧭 Ordem de execução: {planner.order} "
+          f"({sum(len(lane) for lane in lanes)} fase(s) em {len(lanes)} raia(s) paralela(s))")
+
+    def run_lane(lane):
+        for phase in lane:
+            if phase.model is not None:
+                hosts = f" em {', '.join(phase.hosts)}" if phase.hosts else ""
+                print(f"🧩 Fase {MODEL_COLUMNS[phase.model][0]}: {len(phase.jobs)} job(s){hosts} "
+                      f"(keep_alive {planner.keep_alive_for(phase.model)})")
+            scheduler.run(phase.jobs, run_job)
+            if planner.unload_after(phase):
+                OLLAMA_POOL.unload(phase.model, hosts=phase.hosts)
+
+    with ThreadPoolExecutor(max_workers=max(1, len(lanes)), thread_name_prefix='llm-lane') as executor:
+        list(executor.map(run_lane, lanes))
+
+    # Reconstruir o CSV final a partir do checkpoint (pares retomados + novos),
+    # sempre na ordem do ground truth
+    for idx, row in df_llm_results.iterrows():
+        for model in available_models:
+            record = checkpoint.records.get((row['ID'], model))
+            if record is None:
+                continue
+            _, detected_col, raw_col, time_col = MODEL_COLUMNS[model]
+            df_llm_results.at[idx, raw_col] = record['raw']
+            df_llm_results.at[idx, detected_col] = record['detected']
+            df_llm_results.at[idx, time_col] = record['time']
+
+    # Registrar no índice os snippets analisados sem erro por todos os modelos
+    def analyzed(snippet_id):
+        records = [checkpoint.records.get((snippet_id, model)) for model in available_models]
+        return all(record is not None and not str(record['raw']).startswith('ERROR') for record in records)
+
+    corpus.mark_analyzed(snippet_id for snippet_id in snippets if analyzed(snippet_id))
+    corpus.save_index()
 
     # Salvar resultados
     df_llm_results.to_csv(llm_output_csv_path, index=False)
+    if args.store:
+        # Mesma execução da telemetria: run=<id>/model=<modelo> no histórico colunar
+        ResultsStore(store_dir).write_frame(
+            telemetry.run_id, df_llm_results, {model: MODEL_COLUMNS[model] for model in available_models}
+        )
+    cache.evict()
 
     total_time = time.time() - start_time
     print(f"\n🎉 Análise concluída em {total_time/60:.1f} minutos!")
     print(f"💾 Resultados salvos em: {llm_output_csv_path}")
+    if args.store:
+        print(f"🗂️ Execução {telemetry.run_id} gravada no histórico colunar: {store_dir}")
 
     # Relatório resumido
     print(f"\n📈 Relatório Resumido:")
-    if DEEPSEEK_MODEL in available_models:
-        deepseek_detections = df_llm_results['Detected_Deepseek'].sum()
-        print(f"  DeepSeek: {deepseek_detections}/{len(df_llm_results)} detecções")
-    
-    if CODELLAMA_MODEL in available_models:
-        codellama_detections = df_llm_results['Detected_CodeLlama'].sum()
-        print(f"  CodeLlama: {codellama_detections}/{len(df_llm_results)} detecções")
+    for model in available_models:
+        label, detected_col, _, _ = MODEL_COLUMNS[model]
+        detections = df_llm_results[detected_col].sum()
+        print(f"  {label}: {detections}/{len(df_llm_results)} detecções")
+
+    print(f"\n⚡ Vazão por modelo:")
+    for model, stats in scheduler.throughput_report().items():
+        print(
+            f"  {MODEL_COLUMNS[model][0]}: {stats['jobs']} jobs em {stats['wall_seconds']:.1f}s "
+            f"| {stats['jobs_per_minute']:.2f} jobs/min | latência média {stats['avg_latency']:.1f}s "
+            f"| espera média na fila {stats['avg_queue_wait']:.1f}s | concorrência {stats['concurrency']}"
+        )
+
+    if len(OLLAMA_POOL.endpoints) > 1:
+        print(f"\n🔀 Endpoints Ollama ({OLLAMA_POOL.routing}):")
+        for endpoint in OLLAMA_POOL.report():
+            status = "✅" if endpoint['healthy'] else "❌"
+            print(f"  {status} {endpoint['host']}: {endpoint['requests']} requisição(ões) "
+                  f"| {endpoint['failures']} falha(s) | modelos: {', '.join(endpoint['models']) or '-'}")
+
+    backpressure_report = backpressure.report()
+    if backpressure_report:
+        print(f"\n🚦 Controle de carga por modelo:")
+        for model, state in backpressure_report.items():
+            print(
+                f"  {MODEL_COLUMNS[model][0]}: limite {state['limit']}/{state['max_limit']} requisição(ões) "
+                f"| {state['decreases']} redução(ões) | circuito {state['circuit']} ({state['trips']} abertura(s))"
+            )
+
+    if telemetry.records:
+        report = latency_report(telemetry.records)
+        with open(telemetry_report_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=4, ensure_ascii=False)
+        print(f"\n⏱️ Latência e tokens por modelo (telemetria em {telemetry_path}):")
+        print('\n'.join(format_report(report)))
+        loads = sum(summary['model_loads'] for summary in report.values())
+        load_seconds = sum(summary['load_seconds'] for summary in report.values())
+        # load_duration é somado entre requisições simultâneas (pode passar do tempo total)
+        print(f"\n📦 Carga de modelos ({planner.order}): {loads} carregamento(s), "
+              f"{load_seconds:.1f}s somados em load_duration")
+
+    if cache.enabled:
+        print(f"\n💾 Cache de respostas: {cache.summary()}")
 
     print(f"\n🔄 Próximo passo: python scripts/calculate_metrics.py dataset/juice_shop_15_files.csv")
 
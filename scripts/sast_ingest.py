@@ -0,0 +1,286 @@
+# scripts/sast_ingest.py
+
+import json
+import os
+import re
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from interval_index import FileIntervalIndex
+
+# Achado de uma ferramenta SAST: arquivo, faixa de linhas (inclusiva) e regra
+Finding = namedtuple('Finding', ['path', 'start_line', 'end_line', 'rule'])
+
+_WHITESPACE_RE = re.compile(r'[\s,:]*')
+_STRING_BODY_RE = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*"')
+_STRUCTURAL_RE = re.compile(r'["{}\[\]]')
+_SCALAR_END_RE = re.compile(r'[\s,\]}]')
+
+
+class JsonStreamReader:
+    """
+    Leitor JSON incremental que percorre apenas o caminho pedido.
+
+    Lê o arquivo em blocos e desce pelas chaves/arrays de `path` (ex.:
+    ('runs', '*', 'results', '*')); cada elemento no fim do caminho é
+    decodificado isoladamente e os demais valores são pulados sem serem
+    carregados. A memória usada fica limitada ao maior elemento individual.
+    """
+
+    def __init__(self, fp, chunk_size=1 << 16):
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+        self.offset = 0  # Caracteres já descartados do início do buffer
+        self._decoder = json.JSONDecoder()
+
+    def _read_more(self, size=None):
+        chunk = self.fp.read(size or self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.offset += self.pos
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def _peek(self):
+        """Próximo caractere significativo (ignora espaços, vírgulas e dois-pontos)."""
+        while True:
+            self.pos = _WHITESPACE_RE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._read_more():
+                return ''
+
+    def _skip_string(self):
+        # self.pos aponta para as aspas de abertura
+        while True:
+            match = _STRING_BODY_RE.match(self.buf, self.pos + 1)
+            if match is not None:
+                self.pos = match.end()
+                return
+            if not self._read_more():
+                raise ValueError("JSON truncado dentro de uma string")
+
+    def _read_key(self):
+        # A leitura pode compactar o buffer: guardar a posição absoluta
+        start = self.offset + self.pos
+        self._skip_string()
+        return json.loads(self.buf[start - self.offset:self.pos])
+
+    def _skip_value(self):
+        char = self._peek()
+        if char == '"':
+            self._skip_string()
+            return
+        if char not in '{[':
+            while True:
+                match = _SCALAR_END_RE.search(self.buf, self.pos)
+                if match is not None:
+                    self.pos = match.start()
+                    return
+                if not self._read_more():
+                    self.pos = len(self.buf)
+                    return
+        depth = 0
+        while True:
+            match = _STRUCTURAL_RE.search(self.buf, self.pos)
+            if match is None:
+                self.pos = len(self.buf)
+                if not self._read_more():
+                    raise ValueError("JSON truncado")
+                continue
+            self.pos = match.start()
+            char = match.group()
+            if char == '"':
+                self._skip_string()
+                continue
+            self.pos += 1
+            depth += 1 if char in '{[' else -1
+            if depth == 0:
+                return
+
+    def _decode_value(self):
+        char = self._peek()
+        if char not in '{["':
+            # Escalares (números, true/false/null) só são decodificados inteiros: um prefixo
+            # no fim do bloco ("-4." de "-4.5e2") seria aceito por raw_decode como outro valor
+            start = self.offset + self.pos
+            self._skip_value()
+            return json.loads(self.buf[start - self.offset:self.pos])
+        read_size = self.chunk_size
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                # Elemento ainda incompleto no buffer: ler mais (em blocos crescentes)
+                if not self._read_more(read_size):
+                    raise
+                read_size *= 2
+                continue
+            self.pos = end
+            return value
+
+    def _walk(self, path):
+        if not path:
+            yield self._decode_value()
+            return
+        head, rest = path[0], path[1:]
+        char = self._peek()
+        if head == '*' and char == '[':
+            self.pos += 1
+            while self._peek() not in (']', ''):
+                yield from self._walk(rest)
+            self.pos += 1
+        elif head != '*' and char == '{':
+            self.pos += 1
+            while self._peek() not in ('}', ''):
+                key = self._read_key()
+                self._peek()
+                if key == head:
+                    yield from self._walk(rest)
+                else:
+                    self._skip_value()
+            self.pos += 1
+        else:
+            self._skip_value()
+
+    def iter_items(self, path):
+        return self._walk(tuple(path))
+
+    def iter_keys(self):
+        """Chaves do objeto raiz, na ordem do arquivo (os valores são pulados sem decodificar)."""
+        if self._peek() != '{':
+            return
+        self.pos += 1
+        while self._peek() not in ('}', ''):
+            yield self._read_key()
+            self._peek()
+            self._skip_value()
+
+
+def iter_json_items(file_path, path, chunk_size=1 << 16):
+    with open(file_path, 'r', encoding='utf-8') as fp:
+        yield from JsonStreamReader(fp, chunk_size).iter_items(path)
+
+
+def iter_semgrep_findings(file_path):
+    """Achados do JSON do Semgrep (--json)."""
+    for result in iter_json_items(file_path, ('results', '*')):
+        start = result.get('start', {}).get('line', 1)
+        end = result.get('end', {}).get('line', start)
+        yield Finding(result.get('path', ''), start, end, result.get('check_id'))
+
+
+def iter_sarif_findings(file_path):
+    """Achados de um relatório SARIF 2.1 (ex.: semgrep --sarif)."""
+    for result in iter_json_items(file_path, ('runs', '*', 'results', '*')):
+        for location in result.get('locations', []):
+            physical = location.get('physicalLocation', {})
+            uri = physical.get('artifactLocation', {}).get('uri', '')
+            region = physical.get('region', {})
+            start = region.get('startLine', 1)
+            yield Finding(uri, start, region.get('endLine', start), result.get('ruleId'))
+
+
+def iter_sonar_findings(file_path):
+    """Achados do api/issues/search do SonarQube (sonarqube_issues.json)."""
+    for issue in iter_json_items(file_path, ('issues', '*')):
+        component = issue.get('component', '')
+        path = component.split(':', 1)[1] if ':' in component else component
+        text_range = issue.get('textRange') or {}
+        start = text_range.get('startLine', issue.get('line', 1))
+        yield Finding(path, start, text_range.get('endLine', start), issue.get('rule'))
+
+
+# Chaves de primeiro nível que identificam o formato do relatório
+REPORT_FORMAT_KEYS = {
+    'runs': 'sarif', '$schema': 'sarif',
+    'issues': 'sonar', 'components': 'sonar',
+    'results': 'semgrep',
+}
+
+
+def detect_report_format(file_path):
+    """
+    Identifica o formato ('sarif', 'sonar' ou 'semgrep') pela extensão ou pelas chaves do objeto raiz.
+
+    Só as chaves de primeiro nível contam (um "runs" dentro da mensagem de um
+    achado do Semgrep não torna o relatório SARIF); valores que vêm antes da
+    chave decisiva são pulados pelo JsonStreamReader, sem limite de tamanho.
+    """
+    if file_path.endswith(('.sarif', '.sarif.json')):
+        return 'sarif'
+    with open(file_path, 'r', encoding='utf-8') as fp:
+        for key in JsonStreamReader(fp).iter_keys():
+            if key in REPORT_FORMAT_KEYS:
+                return REPORT_FORMAT_KEYS[key]
+    return 'semgrep'
+
+
+REPORT_READERS = {
+    'semgrep': iter_semgrep_findings,
+    'sarif': iter_sarif_findings,
+    'sonar': iter_sonar_findings,
+}
+
+
+def iter_report_findings(file_path):
+    return REPORT_READERS[detect_report_format(file_path)](file_path)
+
+
+def parse_line_range(value):
+    """Converte a coluna Line ('151 - 173', '34' ou vazio) em (início, fim); vazio = arquivo inteiro."""
+    numbers = [] if pd.isna(value) else [int(n) for n in re.findall(r'\d+', str(value))]
+    if not numbers:
+        return 1, float('inf')
+    return min(numbers), max(numbers)
+
+
+class FindingMapper:
+    """
+    Associa achados às linhas do ground truth (IDs).
+
+    Achados em arquivos de snippet (ex.: code_snippets/VULN-01.ts) são
+    associados pelo nome do arquivo. Achados no código original são resolvidos
+    pelo caminho (coluna File) e pela sobreposição com a faixa da coluna Line,
+    via índice de intervalos.
+    """
+
+    def __init__(self, df_ground_truth):
+        self.ids = list(df_ground_truth['ID'])
+        self._id_set = set(self.ids)
+        lines = df_ground_truth['Line'] if 'Line' in df_ground_truth.columns else [None] * len(self.ids)
+        entries = []
+        for snippet_id, path, line in zip(self.ids, df_ground_truth['File'], lines):
+            start, end = parse_line_range(line)
+            entries.append((path, start, end, snippet_id))
+        self.index = FileIntervalIndex(entries)
+
+    def map(self, finding):
+        stem = os.path.splitext(os.path.basename(str(finding.path)))[0]
+        if stem in self._id_set:
+            return [stem]
+        file_index = self.index.index_for(finding.path)
+        if file_index is None:
+            return []
+        matched = file_index.overlapping(finding.start_line, finding.end_line)
+        if matched:
+            return matched
+        # Fora das faixas conhecidas: o achado ainda pertence ao arquivo
+        everything = file_index.overlapping(float('-inf'), float('inf'))
+        return everything if len(everything) == 1 else []
+
+    def detections(self, findings):
+        """Vetor binário (ordem do ground truth): 1 se algum achado foi associado ao ID."""
+        position = {snippet_id: i for i, snippet_id in enumerate(self.ids)}
+        detected = np.zeros(len(self.ids), dtype=np.int8)
+        for finding in findings:
+            for snippet_id in self.map(finding):
+                detected[position[snippet_id]] = 1
+        return detected
@@ -0,0 +1,143 @@
+# scripts/snippet_corpus.py
+
+import hashlib
+import json
+import os
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+# Extensões aceitas para os snippets, em ordem de preferência quando o ID não tem extensão
+SNIPPET_EXTENSIONS = tuple(
+    ext.strip() for ext in os.getenv('LLM_SNIPPET_EXTENSIONS', '.ts,.js,.tsx,.jsx,.mjs,.cjs').split(',') if ext.strip()
+)
+PREFETCH_WORKERS = int(os.getenv('LLM_PREFETCH_WORKERS', '8'))
+
+# Snippet carregado: conteúdo e estado do arquivo (sha256 do conteúdo, mtime e tamanho)
+Snippet = namedtuple('Snippet', ['id', 'path', 'code', 'sha256', 'mtime', 'size'])
+
+
+class SnippetCorpus:
+    """
+    Snippets do dataset, lidos uma única vez e compartilhados entre os modelos.
+
+    A pasta é varrida uma vez (inclusive subpastas) para resolver cada ID em
+    um arquivo: o próprio ID, se já tiver extensão (ex.: VULN-02.js), ou
+    <ID><ext> na ordem de SNIPPET_EXTENSIONS. load() lê e calcula o hash dos
+    arquivos em paralelo; o conteúdo fica em memória para todos os jobs do ID.
+
+    Com index_path, um índice JSON guarda sha256/mtime/tamanho de cada
+    snippet já analisado; changed() compara o estado atual com ele. Arquivos
+    com mtime e tamanho iguais aos do índice não são relidos.
+    """
+
+    def __init__(self, snippets_dir, extensions=SNIPPET_EXTENSIONS, index_path=None, workers=PREFETCH_WORKERS):
+        self.snippets_dir = snippets_dir
+        self.extensions = tuple(extensions)
+        self.index_path = index_path
+        self.workers = max(1, workers)
+        self.index = self._load_index()
+        self._snippets = {}
+        self._paths = None
+        self._lock = threading.Lock()
+
+    def _load_index(self):
+        if not self.index_path or not os.path.exists(self.index_path):
+            return {}
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def _scan(self):
+        """Mapa {nome relativo sem extensão e com extensão: caminho}, respeitando a ordem das extensões."""
+        paths = {}
+        priority = {ext: i for i, ext in enumerate(self.extensions)}
+        ranked = {}
+        for root, _, files in os.walk(self.snippets_dir):
+            for name in files:
+                stem, ext = os.path.splitext(name)
+                if ext not in priority:
+                    continue
+                path = os.path.join(root, name)
+                relative = os.path.relpath(path, self.snippets_dir).replace(os.sep, '/')
+                paths[relative] = path
+                key = relative[:-len(ext)]
+                if key not in ranked or priority[ext] < ranked[key]:
+                    ranked[key] = priority[ext]
+                    paths[key] = path
+        return paths
+
+    def resolve(self, snippet_id):
+        """Caminho do arquivo do snippet (None se não existir)."""
+        if self._paths is None:
+            with self._lock:
+                if self._paths is None:
+                    self._paths = self._scan()
+        return self._paths.get(str(snippet_id).replace(os.sep, '/'))
+
+    def _read(self, snippet_id, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        stat = os.stat(path)
+        return Snippet(snippet_id, path, data.decode('utf-8'), hashlib.sha256(data).hexdigest(),
+                       stat.st_mtime, stat.st_size)
+
+    def load(self, snippet_ids):
+        """Lê (em paralelo) os snippets ainda não carregados; retorna {ID: Snippet} dos encontrados."""
+        snippet_ids = list(snippet_ids)
+        pending = [(snippet_id, self.resolve(snippet_id)) for snippet_id in dict.fromkeys(snippet_ids)
+                   if snippet_id not in self._snippets]
+        pending = [(snippet_id, path) for snippet_id, path in pending if path is not None]
+        if pending:
+            with ThreadPoolExecutor(max_workers=min(self.workers, len(pending))) as executor:
+                for snippet in executor.map(lambda item: self._read(*item), pending):
+                    self._snippets[snippet.id] = snippet
+        return {snippet_id: self._snippets[snippet_id] for snippet_id in snippet_ids if snippet_id in self._snippets}
+
+    def get(self, snippet_id):
+        """Snippet carregado (lendo o arquivo se necessário); None se não existir."""
+        return self.load([snippet_id]).get(snippet_id)
+
+    def _state(self, snippet_id):
+        """Estado atual (sha256, mtime, tamanho) sem reler arquivos que não mudaram desde o índice."""
+        path = self.resolve(snippet_id)
+        if path is None:
+            return None
+        stat = os.stat(path)
+        entry = self.index.get(snippet_id)
+        if entry and entry.get('path') == path and entry.get('mtime') == stat.st_mtime \
+                and entry.get('size') == stat.st_size:
+            return entry
+        snippet = self._snippets.get(snippet_id) or self._read(snippet_id, path)
+        self._snippets[snippet_id] = snippet
+        return {'path': path, 'sha256': snippet.sha256, 'mtime': snippet.mtime, 'size': snippet.size}
+
+    def changed(self, snippet_ids):
+        """IDs novos ou com conteúdo diferente do índice (arquivos ausentes ficam de fora)."""
+        ids = list(dict.fromkeys(snippet_ids))
+        with ThreadPoolExecutor(max_workers=min(self.workers, max(len(ids), 1))) as executor:
+            states = dict(zip(ids, executor.map(self._state, ids)))
+        return {
+            snippet_id for snippet_id, state in states.items()
+            if state is not None and (self.index.get(snippet_id) or {}).get('sha256') != state['sha256']
+        }
+
+    def mark_analyzed(self, snippet_ids):
+        """Registra no índice o estado atual dos snippets (já carregados) analisados com sucesso."""
+        for snippet_id in snippet_ids:
+            snippet = self._snippets.get(snippet_id)
+            if snippet is not None:
+                self.index[snippet_id] = {
+                    'path': snippet.path, 'sha256': snippet.sha256, 'mtime': snippet.mtime, 'size': snippet.size,
+                }
+
+    def save_index(self):
+        if not self.index_path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.index_path)), exist_ok=True)
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.index, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.index_path)
@@ -1,45 +1,70 @@
 # scripts/validate_contextual_recall.py
+import argparse
+
 import pandas as pd
 
-# Vulnerabilidades contextuais alvo
-CONTEXTUAL_VULNS = ["VULN-04", "VULN-05", "VULN-06", "VULN-09", "VULN-10"]
+from metrics_slices import (DEFAULT_SLICES_PATH, load_slices_config, merge_detections, save_slice_metrics,
+                            slice_keys, slice_metrics)
+from results_store import ResultsStore
+
+# Recorte e grupo das vulnerabilidades contextuais (IDs definidos em dataset/metrics_slices.json)
+CONTEXTUAL_SLICE = "contexto"
+CONTEXTUAL_GROUP = "Contextual"
+
+def load_llm_results(run_id=None):
+    """Detecções dos LLMs: de uma execução do histórico colunar ou, sem run_id, do CSV (sem as respostas brutas)."""
+    if run_id:
+        store = ResultsStore()
+        return store.frame(store.latest_run() if run_id == "latest" else run_id, fields=("detected",))
+    return pd.read_csv("results/llm_detections_results.csv", usecols=lambda column: column == "ID" or column.startswith("Detected_"))
 
 def main():
-    # Carregar ground truth
-    truth = pd.read_csv("dataset/juice_shop_15_files.csv")
-    
-    # Filtrar apenas vulnerabilidades contextuais
-    contextual_truth = truth[truth["ID"].isin(CONTEXTUAL_VULNS)]
-    
-    # Carregar resultados LLM
-    llm_results = pd.read_csv("results/llm_detections_results.csv")
-    
-    # Juntar dados
-    merged = pd.merge(
-        contextual_truth[["ID", "Vulnerability"]], 
-        llm_results[["ID", "Detected_Deepseek", "Detected_CodeLlama"]],
-        on="ID"
+    parser = argparse.ArgumentParser(description="Recall dos LLMs nas vulnerabilidades contextuais")
+    parser.add_argument(
+        "--run", default=None, metavar="ID",
+        help="Usar uma execução do histórico colunar (results/store) em vez do CSV ('latest' = a mais recente)"
     )
-    
-    # Calcular True Positives para cada modelo
-    merged["DeepSeek_Correct"] = merged["Detected_Deepseek"] == 1
-    merged["CodeLlama_Correct"] = merged["Detected_CodeLlama"] == 1
-    
-    # Calcular recall
-    deepseek_recall = merged["DeepSeek_Correct"].mean()
-    codellama_recall = merged["CodeLlama_Correct"].mean()
-    
-    print("\n🔍 Resultados para Vulnerabilidades Contextuais:")
-    print(f"- Amostras analisadas: {len(merged)}")
-    print(f"- DeepSeek: {merged['DeepSeek_Correct'].sum()} detectadas | Recall: {deepseek_recall:.1%}")
-    print(f"- CodeLlama: {merged['CodeLlama_Correct'].sum()} detectadas | Recall: {codellama_recall:.1%}")
-    
+    parser.add_argument("--slices", default=DEFAULT_SLICES_PATH, help="Configuração dos recortes de métricas")
+    parser.add_argument("--slice", default=CONTEXTUAL_SLICE, help="Recorte exibido no terminal")
+    parser.add_argument("--group", default=CONTEXTUAL_GROUP, help="Grupo do recorte exibido no terminal")
+    args = parser.parse_args()
+
+    config = load_slices_config(args.slices)
+
+    # Carregar ground truth e resultados LLM; as detecções dos LLMs substituem as do ground truth
+    truth = pd.read_csv("dataset/juice_shop_15_files.csv")
+    llm_results = load_llm_results(args.run)
+    llm_tools = {name: column for name, column in config["tools"].items() if column in llm_results.columns}
+    merged = merge_detections(truth, llm_results, list(llm_tools.values()))
+
+    # Todas as métricas de todos os recortes e ferramentas em uma passada
+    tools = {name: column for name, column in config["tools"].items() if column in merged.columns}
+    df_slices = slice_metrics(merged, tools, config["slices"])
+    csv_path, json_path = save_slice_metrics(df_slices, "results")
+
+    selected = df_slices[(df_slices["Recorte"] == args.slice) & (df_slices["Grupo"] == args.group)]
+    if selected.empty:
+        print(f"⚠️ Grupo '{args.group}' não encontrado no recorte '{args.slice}'.")
+        return
+
+    title = "Vulnerabilidades Contextuais" if (args.slice, args.group) == (CONTEXTUAL_SLICE, CONTEXTUAL_GROUP) \
+        else f"{args.slice} = {args.group}"
+    print(f"\n🔍 Resultados para {title}:")
+    print(f"- Amostras analisadas: {int(selected['Amostras'].iloc[0])}")
+    for row in selected[selected["Ferramenta"].isin(llm_tools)].itertuples(index=False):
+        print(f"- {row.Ferramenta}: {row.Detectadas} detectadas | Recall: {row.Recall:.1%}")
+
     # Salvar relatório detalhado
-    merged.to_csv("results/contextual_validation_report.csv", index=False)
-    
+    in_group = slice_keys(merged, config["slices"][args.slice]) == args.group
+    detail = merged.loc[in_group, ["ID", "Vulnerability"] + list(llm_tools.values())].reset_index(drop=True)
+    for name, column in llm_tools.items():
+        detail[f"{name}_Correct"] = detail[column] == 1
+    detail.to_csv("results/contextual_validation_report.csv", index=False)
+
     # Exibir tabela resumo
     print("\nDetalhes por vulnerabilidade:")
-    print(merged[["ID", "Vulnerability", "Detected_Deepseek", "Detected_CodeLlama"]])
+    print(detail[["ID", "Vulnerability"] + list(llm_tools.values())])
+    print(f"\n📊 Métricas por recorte ({', '.join(config['slices'])}) salvas em:\n- {csv_path}\n- {json_path}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()